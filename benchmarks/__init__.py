@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmarks for mltools
+
+This package includes the following modules:
+
+``datasets``
+This module provides seeded synthetic datasets and scaled-up copies of the bundled datasets.
+
+``suite``
+This module provides the benchmarks, the runner measuring them and the comparison against a baseline.
+
+Run ``python -m benchmarks --help`` from the root of the repository for the command line runner.
+"""
+
+from .suite import BENCHMARKS, compare, load, measure, run, save
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmarks.__main__
+~~~~~~~~~~~~~~~~~~~
+
+Command line runner of the benchmark suite.
+
+Usage, from the root of the repository::
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --output results.json --baseline baseline.json --threshold 0.1
+
+Exits with status 1 when a metric regressed against the baseline by more than the threshold.
+"""
+import argparse
+import sys
+
+from .suite import BENCHMARKS, DEFAULT_OPTIONS, compare, load, run, save
+
+
+def _format(value):
+    """Method for formatting a metric value for the results table.
+
+    :rtype: :py:class:`str`
+    """
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return "{:.4g}".format(value)
+    return str(value)
+
+
+def main(arguments=None):
+    """Method for running the benchmark suite from the command line.
+
+    :param arguments: Command line arguments, sys.argv by default.
+    :type arguments: :py:obj:`None` or :py:class:`list`
+    :return: Exit status.
+    :rtype: :py:class:`int`
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmarks of mltools models and loaders.")
+    parser.add_argument("benchmarks", nargs="*",
+                        help="benchmarks to run, every benchmark by default: {}".format(", ".join(BENCHMARKS)))
+    parser.add_argument("--source", choices=("synthetic", "bundled"), default=DEFAULT_OPTIONS["source"],
+                        help="synthetic datasets, or the datasets bundled in data/ tiled --scale times")
+    for option in ("rows", "features", "cardinality", "scale", "iterations", "epochs", "max_depth", "trees", "repeats",
+                   "seed"):
+        parser.add_argument("--" + option.replace("_", "-"), type=int, default=DEFAULT_OPTIONS[option])
+    parser.add_argument("--output", help="path of the JSON results file")
+    parser.add_argument("--baseline", help="path of a JSON results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed relative regression against the baseline (default: %(default)s)")
+    arguments = parser.parse_args(arguments)
+    for name in arguments.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark \"{}\"".format(name))
+
+    options = {option: getattr(arguments, option) for option in DEFAULT_OPTIONS}
+    results = run(arguments.benchmarks or None, options)
+    if arguments.output:
+        save(results, arguments.output)
+
+    print("{:<18} {:>8} {:>12} {:>16} {:>14} {:>14}".format(
+        "benchmark", "rows", "fit (s)", "predict (rows/s)", "peak RSS (B)", "allocated (B)"))
+    for name, result in results["results"].items():
+        print("{:<18} {:>8} {:>12} {:>16} {:>14} {:>14}".format(
+            name, result["rows"], _format(result["fit_seconds"]), _format(result["predict_rows_per_second"]),
+            _format(result["peak_rss_bytes"]), _format(result["peak_allocated_bytes"])))
+
+    if not arguments.baseline:
+        return 0
+
+    regressions = 0
+    print("\n{:<18} {:<24} {:>12} {:>12} {:>8}".format("benchmark", "metric", "baseline", "current", "ratio"))
+    for name, metric, baseline_value, value, ratio, regressed in compare(
+            load(arguments.baseline), results, arguments.threshold):
+        regressions += regressed
+        print("{:<18} {:<24} {:>12} {:>12} {:>8.3f}{}".format(
+            name, metric, _format(baseline_value), _format(value), ratio, "  REGRESSION" if regressed else ""))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
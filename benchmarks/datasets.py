@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmarks.datasets
+~~~~~~~~~~~~~~~~~~~
+
+This module provides seeded synthetic datasets and scaled-up copies of the datasets bundled in ``data/``.
+
+``mltools`` is imported lazily so the import time benchmark starts from a fresh interpreter.
+"""
+from os import path
+
+from numpy import column_stack, savetxt, tile
+from numpy.random import default_rng
+
+DATA_DIRECTORY = path.join(path.dirname(path.dirname(path.abspath(__file__))), "data")
+
+# bundled dataset of every model as (path relative to DATA_DIRECTORY, label index, headers)
+BUNDLED_DATASETS = {
+    "tree": ("decision_tree/synthetic-1.csv", -1, False),
+    "regression": ("regression/winequality-red.csv", -1, True),
+    "neuralnetwork": ("neural_network/mnist_test_0_1.csv", 0, False),
+}
+
+
+def synthetic_classification(rows, features, cardinality, classes=2, noise=0.1, seed=0):
+    """Method for generating a categorical classification dataset.
+
+    Feature values are integers from 0 to cardinality - 1, the class label depends on the first two features with a
+    fraction of the labels replaced by random classes.
+
+    :param int rows: Number of data points.
+    :param int features: Number of features, at least 2.
+    :param int cardinality: Number of values each feature takes.
+    :param int classes: Number of class labels.
+    :param float noise: Fraction of random class labels.
+    :param int seed: Seed of the random values.
+    :return: Two arrays; x values with shape (rows, features) and y values with shape (1, rows).
+    :rtype: :py:class:`tuple`
+    """
+    random_state = default_rng(seed)
+    X = random_state.integers(0, cardinality, size=(rows, features))
+    y = (X[:, 0] + X[:, 1]) % classes
+    noisy = random_state.random(rows) < noise
+    y[noisy] = random_state.integers(0, classes, size=int(noisy.sum()))
+    return X, y.reshape(1, -1)
+
+
+def synthetic_regression(rows, features, noise=0.1, seed=0):
+    """Method for generating a linear regression dataset with gaussian features and noise.
+
+    :param int rows: Number of data points.
+    :param int features: Number of features.
+    :param float noise: Standard deviation of the noise added to the targets.
+    :param int seed: Seed of the random values.
+    :return: Two arrays; x values with shape (rows, features) and y values with shape (1, rows).
+    :rtype: :py:class:`tuple`
+    """
+    random_state = default_rng(seed)
+    X = random_state.normal(size=(rows, features))
+    y = X.dot(random_state.normal(size=features)) + noise * random_state.normal(size=rows)
+    return X, y.reshape(1, -1)
+
+
+def synthetic_binary(rows, features, seed=0):
+    """Method for generating a binary classification dataset with feature values between 0 and 1.
+
+    :param int rows: Number of data points.
+    :param int features: Number of features.
+    :param int seed: Seed of the random values.
+    :return: Two arrays; x values with shape (rows, features) and y values of 0 or 1 with shape (1, rows).
+    :rtype: :py:class:`tuple`
+    """
+    random_state = default_rng(seed)
+    X = random_state.random((rows, features))
+    scores = (X - 0.5).dot(random_state.normal(size=features))
+    return X, (scores > 0).astype(float).reshape(1, -1)
+
+
+def bundled(model, scale=1):
+    """Method for loading the bundled dataset of a model, tiled scale times.
+
+    :param str model: "tree", "regression" or "neuralnetwork".
+    :param int scale: Number of copies of the data points.
+    :return: Two arrays; x values and y values with shape (1, rows).
+    :rtype: :py:class:`tuple`
+    """
+    from mltools import parse_csv_2
+
+    file_path, label_index, headers = BUNDLED_DATASETS[model]
+    X, y = parse_csv_2(path.join(DATA_DIRECTORY, file_path), label_index, headers)
+    return tile(X, (scale, 1)), tile(y, (1, scale))
+
+
+def write_csv(file_path, X, y):
+    """Method for writing a dataset to a CSV file with the class label as the last column.
+
+    :param str file_path: Path of the CSV file.
+    :param X: Two dimensional array of feature values.
+    :type X: :py:class:`~numpy.ndarray`
+    :param y: Array of class labels with shape (1, rows).
+    :type y: :py:class:`~numpy.ndarray`
+    :return: None
+    """
+    savetxt(file_path, column_stack((X, y.reshape(-1))), delimiter=",", fmt="%.10g")
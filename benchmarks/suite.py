@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmarks.suite
+~~~~~~~~~~~~~~~~
+
+This module provides the benchmarks of every ``mltools`` model and loader, the runner measuring them and the comparison
+of results against a saved baseline.
+
+Every benchmark runs in a freshly spawned process, so its peak resident set size is not inflated by earlier
+benchmarks.
+"""
+import json
+import platform
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import cpu_count, environ, path, pathsep
+from subprocess import STDOUT, check_output
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from numpy import column_stack, __version__ as numpy_version
+
+from .datasets import bundled, synthetic_binary, synthetic_classification, synthetic_regression, write_csv
+
+try:
+    from resource import RUSAGE_SELF, getrusage
+except ImportError:
+    getrusage = None
+
+DEFAULT_OPTIONS = {
+    "source": "synthetic",
+    "rows": 10000,
+    "features": 20,
+    "cardinality": 8,
+    "scale": 10,
+    "iterations": 100,
+    "epochs": 5,
+    "max_depth": 3,
+    "trees": 10,
+    "repeats": 3,
+    "seed": 0,
+}
+
+# metrics compared against the baseline, True when larger values are better
+METRICS = {
+    "fit_seconds": False,
+    "predict_rows_per_second": True,
+    "peak_rss_bytes": False,
+    "peak_allocated_bytes": False,
+}
+
+
+# script of the import benchmark, importing the package and reporting the peak resident set size of the interpreter,
+# read from /proc where available since the peak reported by getrusage includes the parent process on Linux
+_IMPORT_SCRIPT = """
+import mltools
+import sys
+try:
+    with open("/proc/self/status") as fh:
+        peak = next(int(line.split()[1]) * 1024 for line in fh if line.startswith("VmHWM:"))
+except (OSError, StopIteration):
+    from resource import RUSAGE_SELF, getrusage
+    peak = getrusage(RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+print("peak rss:", peak, file=sys.stderr)
+"""
+
+
+def _import_benchmark(options):
+    """Method for setting up the benchmark of importing the ``mltools`` package in a fresh interpreter.
+
+    The import is timed by ``python -X importtime``, without the startup of the interpreter. The interpreter does not
+    import NumPy beforehand, so a package importing its dependencies eagerly again shows up as a regression. The peak
+    resident set size is the peak of the importing interpreter, not of the process running the benchmark.
+
+    :param dict options: Benchmark options.
+    :return: Tuple of the fit and predict callables and the number of data points.
+    :rtype: :py:class:`tuple`
+    """
+    root = path.dirname(path.dirname(path.abspath(__file__)))
+    environment = dict(environ, PYTHONPATH=pathsep.join(filter(None, (root, environ.get("PYTHONPATH")))))
+
+    def fit():
+        stderr = check_output([sys.executable, "-X", "importtime", "-c", _IMPORT_SCRIPT], env=environment,
+                              stderr=STDOUT, text=True)
+        measured = dict()
+        # lines read "import time: self [us] | cumulative [us] | module"
+        for line in stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "mltools":
+                measured["fit_seconds"] = int(fields[1]) / 1e6
+            elif line.startswith("peak rss:"):
+                measured["peak_rss_bytes"] = int(line.split()[-1])
+        return measured
+
+    return fit, None, 0
+
+
+def _tree_benchmark(options):
+    """Method for setting up the benchmark of building and compiling a decision tree.
+
+    Synthetic data points have categorical features, the bundled dataset has continuous features split on histogram
+    thresholds.
+
+    :param dict options: Benchmark options.
+    :return: Tuple of the fit and predict callables and the number of data points.
+    :rtype: :py:class:`tuple`
+    """
+    from mltools import EncodedDataset, Node
+
+    if options["source"] == "bundled":
+        X, y = bundled("tree", options["scale"])
+        continuous_features = list(range(X.shape[1]))
+    else:
+        X, y = synthetic_classification(options["rows"], options["features"], options["cardinality"],
+                                        seed=options["seed"])
+        continuous_features = []
+    data_list = column_stack((X, y.reshape(-1))).tolist()
+    model = dict()
+
+    def fit():
+        root = Node(EncodedDataset(data_list, continuous_features=continuous_features), set(range(X.shape[1])))
+        root.build_tree(max_depth=options["max_depth"])
+        model["tree"] = root.compile()
+
+    def predict():
+        model["tree"].predict_batch(X)
+
+    return fit, predict, len(X)
+
+
+def _forest_benchmark(options):
+    """Method for setting up the benchmark of growing a random forest of fully grown trees with every CPU.
+
+    :param dict options: Benchmark options.
+    :return: Tuple of the fit and predict callables and the number of data points.
+    :rtype: :py:class:`tuple`
+    """
+    from mltools import EncodedDataset, RandomForest
+
+    if options["source"] == "bundled":
+        X, y = bundled("tree", options["scale"])
+        continuous_features = list(range(X.shape[1]))
+    else:
+        X, y = synthetic_classification(options["rows"], options["features"], options["cardinality"],
+                                        seed=options["seed"])
+        continuous_features = []
+    dataset = EncodedDataset(column_stack((X, y.reshape(-1))).tolist(), continuous_features=continuous_features)
+    forest = RandomForest(dataset, set(range(X.shape[1])), number_trees=options["trees"])
+
+    def fit():
+        forest.build_forest(n_jobs=-1, seed=options["seed"])
+
+    def predict():
+        forest.predict_batch(X)
+
+    return fit, predict, len(X)
+
+
+def _regression_data(options):
+    """Method for loading the regression dataset of the benchmark options.
+
+    :param dict options: Benchmark options.
+    :return: Two arrays; x values and y values.
+    :rtype: :py:class:`tuple`
+    """
+    if options["source"] == "bundled":
+        return bundled("regression", options["scale"])
+    return synthetic_regression(options["rows"], options["features"], seed=options["seed"])
+
+
+def _regression_benchmark(training_type):
+    """Method for creating the setup of a regression benchmark with a given training type.
+
+    :param str training_type: Training type passed to :meth:`~mltools.regression.Regression.train`.
+    :return: Setup method of the benchmark.
+    :rtype: :py:class:`function`
+    """
+    def setup(options):
+        from mltools import Regression
+
+        X, y = _regression_data(options)
+        model = Regression(X, y)
+
+        def fit():
+            model.thetas = None
+            model.train(training_type, iterations=options["iterations"])
+
+        def predict():
+            model.predict_batch(X)
+
+        return fit, predict, len(X)
+
+    return setup
+
+
+def _neuralnetwork_benchmark(options):
+    """Method for setting up the benchmark of training a neural network with one hidden layer in mini-batches.
+
+    :param dict options: Benchmark options.
+    :return: Tuple of the fit and predict callables and the number of data points.
+    :rtype: :py:class:`tuple`
+    """
+    from mltools import NeuralNetwork
+
+    if options["source"] == "bundled":
+        X, Y = bundled("neuralnetwork", options["scale"])
+        X = X / 255
+    else:
+        X, Y = synthetic_binary(options["rows"], options["features"], seed=options["seed"])
+    model = dict()
+
+    def fit():
+        model["network"] = NeuralNetwork(X, Y, alpha=0.5, layers=(X.shape[1], 64, 1))
+        model["network"].train(options["epochs"], batch_size=32, shuffle=True, seed=options["seed"])
+
+    def predict():
+        model["network"].predict_batch(X)
+
+    return fit, predict, len(X)
+
+
+def _fileio_benchmark(loader):
+    """Method for creating the setup of a benchmark of loading a CSV file with a given loader.
+
+    The ``iter_csv`` benchmark consumes every chunk, the ``parse_csv_cached`` benchmark writes the cache during setup
+    and measures loading it and reading every value. :func:`~mltools.fileio.parse_csv_parallel` uses every CPU and
+    parses files smaller than 8 MiB with :func:`~mltools.fileio.parse_csv_2`, raise ``--rows`` or ``--scale`` to
+    measure its workers.
+
+    :param str loader: "parse_csv_2", "iter_csv", "parse_csv_cached" or "parse_csv_parallel".
+    :return: Setup method of the benchmark.
+    :rtype: :py:class:`function`
+    """
+    def setup(options):
+        from mltools import iter_csv, parse_csv_2, parse_csv_cached, parse_csv_parallel
+
+        if options["source"] == "bundled":
+            X, y = bundled("neuralnetwork", options["scale"])
+        else:
+            X, y = synthetic_regression(options["rows"], options["features"], seed=options["seed"])
+        file_path = path.join(options["work_directory"], "benchmark.csv")
+        write_csv(file_path, X, y)
+        if loader == "parse_csv_cached":
+            parse_csv_cached(file_path, -1)
+
+        def fit():
+            if loader == "iter_csv":
+                for _ in iter_csv(file_path, label_index=-1):
+                    pass
+            elif loader == "parse_csv_cached":
+                cached_X, cached_y = parse_csv_cached(file_path, -1)
+                cached_X.sum()
+                cached_y.sum()
+            elif loader == "parse_csv_parallel":
+                parse_csv_parallel(file_path, -1)
+            else:
+                parse_csv_2(file_path, -1)
+
+        return fit, None, len(X)
+
+    return setup
+
+
+# setup methods of the benchmarks by name
+BENCHMARKS = {
+    "import": _import_benchmark,
+    "tree": _tree_benchmark,
+    "forest": _forest_benchmark,
+    "regression_lstsq": _regression_benchmark("lstsq"),
+    "regression_gd": _regression_benchmark("linear"),
+    "neuralnetwork": _neuralnetwork_benchmark,
+    "fileio": _fileio_benchmark("parse_csv_2"),
+    "fileio_chunked": _fileio_benchmark("iter_csv"),
+    "fileio_cached": _fileio_benchmark("parse_csv_cached"),
+    "fileio_parallel": _fileio_benchmark("parse_csv_parallel"),
+}
+
+
+def _peak_rss():
+    """Method for reading the peak resident set size of the current process.
+
+    :return: Peak resident set size in bytes, None where the resource module is unavailable.
+    :rtype: :py:obj:`None` or :py:class:`int`
+    """
+    if getrusage is None:
+        return None
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other platforms kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(name, options):
+    """Method for measuring a single benchmark in the current process.
+
+    Fit and predict are timed over the requested repeats and the fastest run is reported. Fit callables measuring a
+    subprocess, such as the import benchmark, return a dictionary of the fit seconds and peak resident set size of the
+    subprocess. Otherwise the peak resident set size of the current process is read before a final run traced by
+    :mod:`tracemalloc`, which reports the peak of allocated memory.
+
+    :param str name: Name of the benchmark, see :data:`BENCHMARKS`.
+    :param dict options: Benchmark options, missing options take their :data:`DEFAULT_OPTIONS` value.
+    :return: Dictionary of the number of data points, fit seconds, predict throughput, peak resident set size and peak
+             allocated bytes.
+    :rtype: :py:class:`dict`
+    """
+    setup = BENCHMARKS[name]
+    options = dict(DEFAULT_OPTIONS, **options)
+
+    with TemporaryDirectory() as work_directory:
+        fit, predict, rows = setup(dict(options, work_directory=work_directory))
+
+        fit_times = []
+        predict_times = []
+        subprocess_peaks = []
+        for _ in range(options["repeats"]):
+            start = perf_counter()
+            measured = fit() or dict()
+            fit_times.append(measured.get("fit_seconds", perf_counter() - start))
+            if "peak_rss_bytes" in measured:
+                subprocess_peaks.append(measured["peak_rss_bytes"])
+            if predict is not None:
+                start = perf_counter()
+                predict()
+                predict_times.append(perf_counter() - start)
+
+        peak_rss = max(subprocess_peaks) if subprocess_peaks else _peak_rss()
+        tracemalloc.start()
+        try:
+            fit()
+            if predict is not None:
+                predict()
+            peak_allocated = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "fit_seconds": min(fit_times),
+        "predict_rows_per_second": rows / max(min(predict_times), 1e-9) if predict_times else None,
+        "peak_rss_bytes": peak_rss,
+        "peak_allocated_bytes": peak_allocated,
+    }
+
+
+def run(names=None, options=None):
+    """Method for running benchmarks, each in a freshly spawned process.
+
+    :param names: Names of the benchmarks to run, every benchmark by default.
+    :type names: :py:obj:`None` or :py:class:`list`
+    :param options: Benchmark options, missing options take their :data:`DEFAULT_OPTIONS` value.
+    :type options: :py:obj:`None` or :py:class:`dict`
+    :return: Dictionary of the run metadata and the results of every benchmark.
+    :rtype: :py:class:`dict`
+    """
+    import mltools
+
+    names = list(BENCHMARKS) if names is None else names
+    options = dict(DEFAULT_OPTIONS, **(options or dict()))
+    context = get_context("spawn")
+
+    results = dict()
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(measure, name, options).result()
+
+    return {
+        "metadata": {
+            "mltools": mltools.__version__,
+            "python": platform.python_version(),
+            "numpy": numpy_version,
+            "platform": platform.platform(),
+            "cpus": cpu_count(),
+            "options": options,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """Method for comparing benchmark results against a baseline.
+
+    A metric regresses when it is worse than the baseline by more than the threshold, times larger for times and memory
+    or times smaller for throughput.
+
+    :param dict baseline: Results of :func:`run` to compare against.
+    :param dict current: Results of :func:`run` to compare.
+    :param float threshold: Allowed relative change, 0.1 allows results 10% worse than the baseline.
+    :return: List of (benchmark, metric, baseline value, current value, ratio, regressed) tuples, ratio is current over
+             baseline.
+    :rtype: :py:class:`list`
+    """
+    comparisons = []
+    for name, result in current["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            continue
+
+        for metric, larger_is_better in METRICS.items():
+            baseline_value = baseline_result.get(metric)
+            value = result.get(metric)
+            if not baseline_value or value is None:
+                continue
+
+            ratio = value / baseline_value
+            regressed = ratio < 1 / (1 + threshold) if larger_is_better else ratio > 1 + threshold
+            comparisons.append((name, metric, baseline_value, value, ratio, regressed))
+
+    return comparisons
+
+
+def load(file_path):
+    """Method for loading benchmark results from a JSON file.
+
+    :param str file_path: Path of the JSON file.
+    :return: Benchmark results.
+    :rtype: :py:class:`dict`
+    """
+    with open(file_path) as fh:
+        return json.load(fh)
+
+
+def save(results, file_path):
+    """Method for saving benchmark results to a JSON file.
+
+    :param dict results: Results of :func:`run`.
+    :param str file_path: Path of the JSON file.
+    :return: None
+    """
+    with open(file_path, "w") as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+        fh.write("\n")
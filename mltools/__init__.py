@@ -4,21 +4,78 @@
 
 This package includes the following modules:
 
+``callbacks``
+This module provides hooks, phase timers and a sampling profiler for observing training.
+
+``ensemble``
+This module provides a random forest of decision trees grown on bootstrap samples of one encoded dataset.
+
 ``fileio``
 This module provides functions for parsing data files.
 
+``preprocessing``
+This module provides transformer classes for normalizing and discretizing feature values.
+
 ``regression``
 
+``serialization``
+This module provides functions for saving trained models to binary files and memory-mapping them back.
+
+``serving``
+This module provides classes for serving batched predictions of trained models.
+
 ``tree``
 This module provides functions and classes for implementing decision tree models.
 
+Submodules are imported on first access of one of their names, so importing the package does not import NumPy, SciPy
+or the neural network implementations.
 """
+from importlib import import_module as _import_module
+
+# public names of the package by the submodule defining them
+_EXPORTS = {
+    "fileio": ("parse_csv", "parse_csv_2", "parse_csv_cached", "parse_csv_parallel", "iter_csv"),
+    "tree": ("normalize", "equidistant_discretization", "equidensity_discretization", "EncodedDataset", "Node",
+             "CompiledTree"),
+    "preprocessing": ("MinMaxNormalizer", "EquidistantDiscretizer", "EquidensityDiscretizer"),
+    "regression": ("Regression", "cross_validate_path", "iter_batches"),
+    "serving": ("LatencyHistogram", "MicroBatcher", "Predictor"),
+    "serialization": ("load_model", "save_model"),
+    "ensemble": ("RandomForest",),
+    "neuralnetwork": ("NeuralNetwork",),
+    "math": ("mean_squared_error", "sigmoid", "sigmoid_and_derivative"),
+    "callbacks": ("Callback", "MetricsExporter", "SamplingProfiler"),
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
 
-from .fileio import parse_csv, parse_csv_2
-from .tree import normalize, equidistant_discretization, equidensity_discretization, Node
-from .regression import Regression
-from .neuralnetwork import NeuralNetwork
-from .math import mean_squared_error, sigmoid
+# submodules available as attributes of the package, as after the eager imports of earlier versions
+_SUBMODULES = tuple(_EXPORTS) + ("neuralnetwork2",)
 
+__all__ = sorted(_MODULES)
 
 __version__ = "0.3.1.alpha"
+
+
+def __getattr__(name):
+    """Method for importing a submodule, or the submodule defining a public name, on first access, see :pep:`562`.
+
+    :param str name: Name of the attribute.
+    :return: Submodule or value of the public name.
+    """
+    if name in _SUBMODULES:
+        return _import_module("." + name, __name__)
+    if name not in _MODULES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(_import_module("." + _MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Method for listing the attributes of the package, including the names and submodules not imported yet.
+
+    :rtype: :py:class:`list`
+    """
+    names = {name for name in globals() if not name.startswith("_") or name.startswith("__")}
+    return sorted(names | set(_MODULES) | set(_SUBMODULES))
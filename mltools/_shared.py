@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools._shared
+~~~~~~~~~~~~~~~
+
+This module provides helpers for sharing NumPy arrays between worker processes without pickling them.
+"""
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+
+from numpy import dtype as numpy_dtype, ndarray
+
+
+def resolve_n_jobs(n_jobs):
+    """Method for converting an ``n_jobs`` argument into a number of worker processes.
+
+    :param n_jobs: Requested number of processes, negative values count back from the number of CPUs (-1 is all CPUs).
+    :type n_jobs: :py:obj:`None` or :py:class:`int`
+    :return: Number of worker processes, at least 1.
+    :rtype: :py:class:`int`
+    """
+    if not n_jobs:
+        return 1
+    if n_jobs < 0:
+        return max(1, (cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+
+class SharedArray(object):
+    """NumPy array stored in a named shared memory block owned by the creating process.
+
+    Worker processes receive the small :attr:`spec` tuple instead of the array and map the same memory with
+    :func:`attach_array`.
+    """
+
+    def __init__(self, shape, dtype, order="C"):
+        """Initialization method for class SharedArray.
+
+        :param tuple shape: Shape of the array.
+        :param dtype: Data type of the array.
+        :param str order: Memory layout of the array, "C" or "F".
+        """
+        dtype = numpy_dtype(dtype)
+        size = dtype.itemsize
+        for dimension in shape:
+            size *= dimension
+
+        self.memory = SharedMemory(create=True, size=max(size, 1))
+        self.array = ndarray(shape, dtype=dtype, buffer=self.memory.buf, order=order)
+        self.spec = (self.memory.name, tuple(shape), dtype.str, order)
+
+    @classmethod
+    def copy_of(cls, source):
+        """Method for creating a shared array holding a copy of an existing array.
+
+        :param source: Array to copy into shared memory.
+        :type source: :py:class:`~numpy.ndarray`
+        :return: Shared copy of the array.
+        :rtype: :class:`SharedArray`
+        """
+        order = "F" if source.flags.f_contiguous and not source.flags.c_contiguous else "C"
+        shared = cls(source.shape, source.dtype, order)
+        shared.array[...] = source
+        return shared
+
+    def close(self):
+        """Method for releasing and removing the shared memory block.
+
+        :return: None
+        """
+        if self.memory is not None:
+            self.array = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_array(spec):
+    """Method for mapping a shared array created by another process.
+
+    The returned shared memory handle must be kept alive for as long as the array is used.
+
+    :param tuple spec: The :attr:`SharedArray.spec` of the shared array.
+    :return: Tuple of the shared memory handle and the array.
+    :rtype: :py:class:`tuple`
+    """
+    name, shape, dtype, order = spec
+    memory = SharedMemory(name=name)
+    return memory, ndarray(shape, dtype=numpy_dtype(dtype), buffer=memory.buf, order=order)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools._sparse
+~~~~~~~~~~~~~~~
+
+This module provides helpers for accepting SciPy sparse matrices wherever dense arrays are accepted.
+
+SciPy is an optional dependency, without it every matrix is treated as dense. SciPy is imported on first use only, a
+matrix cannot be sparse before the caller has imported ``scipy.sparse`` to create it.
+"""
+import sys
+
+from ._shared import SharedArray, attach_array
+
+
+def issparse(matrix):
+    """Method for checking whether a matrix is a SciPy sparse matrix, without importing SciPy.
+
+    :rtype: :py:class:`bool`
+    """
+    sparse = sys.modules.get("scipy.sparse")
+    return sparse is not None and sparse.issparse(matrix)
+
+
+def lsqr(*args, **kwargs):
+    """Method for solving sparse least squares problems with :func:`scipy.sparse.linalg.lsqr`.
+    """
+    from scipy.sparse.linalg import lsqr as sparse_lsqr
+
+    return sparse_lsqr(*args, **kwargs)
+
+
+def share_matrix(matrix):
+    """Method for copying a dense array or a CSR/CSC sparse matrix into shared memory.
+
+    :param matrix: Dense array or sparse matrix.
+    :return: Tuple of the list of shared arrays, which must be closed by the caller, and the spec to pass to
+             :func:`attach_matrix`.
+    :rtype: :py:class:`tuple`
+    """
+    if not issparse(matrix):
+        shared = SharedArray.copy_of(matrix)
+        return [shared], (None, shared.spec, None)
+
+    matrix_format = "csc" if matrix.format == "csc" else "csr"
+    matrix = matrix.asformat(matrix_format)
+    shared = [SharedArray.copy_of(component) for component in (matrix.data, matrix.indices, matrix.indptr)]
+    return shared, (matrix_format, [component.spec for component in shared], matrix.shape)
+
+
+def attach_matrix(spec):
+    """Method for mapping a matrix shared by :func:`share_matrix` in another process.
+
+    The returned shared memory handles must be kept alive for as long as the matrix is used.
+
+    :param tuple spec: Spec returned by :func:`share_matrix`.
+    :return: Tuple of the list of shared memory handles and the matrix.
+    :rtype: :py:class:`tuple`
+    """
+    matrix_format, specs, shape = spec
+    if matrix_format is None:
+        memory, array = attach_array(specs)
+        return [memory], array
+
+    from scipy.sparse import csc_matrix, csr_matrix
+
+    memories, components = zip(*(attach_array(component_spec) for component_spec in specs))
+    matrix_class = csc_matrix if matrix_format == "csc" else csr_matrix
+    return list(memories), matrix_class(tuple(components), shape=shape, copy=False)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools.callbacks
+~~~~~~~~~~~~~~~~~
+
+This module provides hooks for observing the training of every model.
+
+``Regression.train()``, ``Regression.fit_batches()``, ``NeuralNetwork.train()`` and ``Node.build_tree()`` accept a
+list of :class:`Callback` objects through their ``callbacks`` parameter. Trainers time their phases with
+:class:`PhaseTimers`. Without callbacks they use :data:`NULL_TIMERS` and never build event dictionaries, so the hooks
+cost a few empty method calls per batch and can be left in place in production.
+"""
+import json
+import sys
+import threading
+from collections import Counter, defaultdict
+from os import path
+from time import perf_counter, time
+
+
+class Callback(object):
+    """Base class of training callbacks, every event does nothing unless overridden.
+
+    Events receive the model being trained and a dictionary of event values. The "phases" value of epoch and end of
+    training events maps every timed phase, such as "load", "forward", "backward", "gradient", "update", "solve" and
+    "split_scoring", to its accumulated "seconds" and "count".
+    """
+
+    def on_train_begin(self, model, logs):
+        """Method called before training starts.
+
+        :param model: Model being trained.
+        :param dict logs: Event values, empty.
+        :return: None
+        """
+
+    def on_epoch(self, model, epoch, logs):
+        """Method called after every epoch, every iteration of full batch gradient descent or every tree of a forest.
+
+        :param model: Model being trained.
+        :param int epoch: Number of the epoch, starting at 0.
+        :param dict logs: Event values, "phases" and the "loss" where the trainer calculates it.
+        :return: None
+        """
+
+    def on_batch(self, model, batch, logs):
+        """Method called after every mini-batch update.
+
+        :param model: Model being trained.
+        :param int batch: Number of the batch, starting at 0 every epoch.
+        :param dict logs: Event values, the "size" of the batch and its "loss" before the update.
+        :return: None
+        """
+
+    def on_split(self, node, logs):
+        """Method called after a decision tree node is split into children nodes.
+
+        :param node: Node that was split.
+        :type node: :class:`~mltools.tree.Node`
+        :param dict logs: Event values, the "depth", splitting "feature", information "gain", number of "rows" and
+                          number of "children" of the node.
+        :return: None
+        """
+
+    def on_train_end(self, model, logs):
+        """Method called after training ends.
+
+        :param model: Model being trained.
+        :param dict logs: Event values, "phases".
+        :return: None
+        """
+
+
+class PhaseTimers(object):
+    """Accumulated wall time of the phases of a training run.
+
+    Trainers call :meth:`mark` before a sequence of phases and :meth:`lap` at the end of every phase, which adds the
+    time since the previous mark or lap to the phase.
+    """
+
+    def __init__(self):
+        """Initialization method for class PhaseTimers.
+        """
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._last = perf_counter()
+
+    def mark(self):
+        """Method for starting the next phase now.
+
+        :return: None
+        """
+        self._last = perf_counter()
+
+    def lap(self, phase):
+        """Method for adding the time since the previous mark or lap to a phase.
+
+        :param str phase: Name of the phase that just ended.
+        :return: None
+        """
+        now = perf_counter()
+        self.seconds[phase] += now - self._last
+        self.counts[phase] += 1
+        self._last = now
+
+    def summary(self):
+        """Method for summarizing the timed phases.
+
+        :return: Dictionary of phase names to dictionaries of their accumulated "seconds" and "count".
+        :rtype: :py:class:`dict`
+        """
+        return {phase: {"seconds": seconds, "count": self.counts[phase]} for phase, seconds in self.seconds.items()}
+
+
+class NullTimers(object):
+    """Phase timers that record nothing, used by trainers without callbacks.
+    """
+
+    def mark(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def summary(self):
+        return dict()
+
+
+NULL_TIMERS = NullTimers()
+
+
+class CallbackList(object):
+    """Dispatcher of training events to a list of callbacks, used by every trainer.
+
+    A callback list is false when it holds no callbacks, trainers check it before building the values of frequent
+    events. Its :attr:`timers` are :data:`NULL_TIMERS` without callbacks.
+    """
+
+    def __init__(self, callbacks=None):
+        """Initialization method for class CallbackList.
+
+        :param callbacks: Callbacks receiving the events.
+        :type callbacks: :py:obj:`None` or :py:class:`list`
+        """
+        self.callbacks = list(callbacks or ())
+        self.timers = PhaseTimers() if self.callbacks else NULL_TIMERS
+
+    def __bool__(self):
+        """Overrides truth testing for class CallbackList, True when it holds callbacks.
+        """
+        return bool(self.callbacks)
+
+    def on_train_begin(self, model):
+        """Method for dispatching the start of training.
+
+        :return: None
+        """
+        for callback in self.callbacks:
+            callback.on_train_begin(model, dict())
+
+    def on_epoch(self, model, epoch, logs=None):
+        """Method for dispatching the end of an epoch, adding the phase times to the event values.
+
+        :return: None
+        """
+        logs = dict(logs or (), phases=self.timers.summary())
+        for callback in self.callbacks:
+            callback.on_epoch(model, epoch, logs)
+
+    def on_batch(self, model, batch, logs):
+        """Method for dispatching the end of a mini-batch update.
+
+        :return: None
+        """
+        for callback in self.callbacks:
+            callback.on_batch(model, batch, logs)
+
+    def on_split(self, node, logs):
+        """Method for dispatching the split of a decision tree node.
+
+        :return: None
+        """
+        for callback in self.callbacks:
+            callback.on_split(node, logs)
+
+    def on_train_end(self, model, logs=None):
+        """Method for dispatching the end of training, adding the phase times to the event values.
+
+        :return: None
+        """
+        logs = dict(logs or (), phases=self.timers.summary())
+        for callback in self.callbacks:
+            callback.on_train_end(model, logs)
+
+
+class SamplingProfiler(Callback):
+    """Callback sampling the call stack of the training thread from a background thread.
+
+    Stacks are read with :func:`sys._current_frames` every ``interval`` seconds while training runs, so the training
+    code is not traced and only pays for the sampling thread taking the interpreter lock. The profiler can also be
+    started and stopped by hand around any code.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        """Initialization method for class SamplingProfiler.
+
+        :param float interval: Seconds between samples.
+        :param int max_depth: Largest number of frames kept per sample, counted from the innermost frame.
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def on_train_begin(self, model, logs):
+        self.start()
+
+    def on_train_end(self, model, logs):
+        self.stop()
+
+    def start(self, thread_id=None):
+        """Method for starting to sample a thread.
+
+        :param thread_id: Identifier of the sampled thread, the calling thread by default.
+        :type thread_id: :py:obj:`None` or :py:class:`int`
+        :return: None
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident() if thread_id is None else thread_id,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Method for stopping the sampling thread, the samples are kept.
+
+        :return: None
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self, thread_id):
+        """Method for recording the stack of a thread every interval until stopped.
+
+        :param int thread_id: Identifier of the sampled thread.
+        :return: None
+        """
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name, path.basename(code.co_filename), frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def top(self, number=10):
+        """Method for finding the lines most often executing when sampled.
+
+        :param int number: Number of lines returned.
+        :return: List of (line, fraction of samples) tuples, most frequent first.
+        :rtype: :py:class:`list`
+        """
+        lines = Counter()
+        for stack, count in self.samples.items():
+            lines[stack[-1]] += count
+        total = sum(lines.values())
+        return [(line, count / total) for line, count in lines.most_common(number)]
+
+    def collapsed(self):
+        """Method for formatting the samples as collapsed stacks, the input format of flame graph tools.
+
+        :return: One "outer;...;inner count" line per sampled stack.
+        :rtype: :py:class:`str`
+        """
+        return "\n".join("{} {}".format(";".join(stack), count) for stack, count in self.samples.most_common())
+
+
+def _json_value(value):
+    """Method for converting NumPy values into values the JSON encoder accepts.
+    """
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class MetricsExporter(Callback):
+    """Callback exporting training events as JSON records, one line per event, for a metrics collector.
+
+    Every record holds the "event" name, the "model" class name, the "time" of the event in seconds since the epoch and
+    the event values.
+    """
+
+    def __init__(self, sink, batches=False):
+        """Initialization method for class MetricsExporter.
+
+        :param sink: File-like object receiving JSON lines, or a callable receiving every record dictionary.
+        :param bool batches: Also export every mini-batch, which is frequent enough to slow training down.
+        """
+        self.sink = sink
+        self.batches = batches
+
+    def _export(self, event, model, logs, **values):
+        """Method for writing a single record to the sink.
+
+        :return: None
+        """
+        record = dict(logs, event=event, model=type(model).__name__, time=time(), **values)
+        if callable(self.sink):
+            self.sink(record)
+        else:
+            self.sink.write(json.dumps(record, default=_json_value) + "\n")
+
+    def on_epoch(self, model, epoch, logs):
+        self._export("epoch", model, logs, epoch=epoch)
+
+    def on_batch(self, model, batch, logs):
+        if self.batches:
+            self._export("batch", model, logs, batch=batch)
+
+    def on_split(self, node, logs):
+        self._export("split", node, logs)
+
+    def on_train_end(self, model, logs):
+        self._export("train_end", model, logs)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools.ensemble
+~~~~~~~~~~~~~~~~
+
+This module provides a random forest of decision trees built on :class:`~mltools.tree.Node`.
+
+Trees are grown on bootstrap samples drawn as arrays of row indexes into a single :class:`~mltools.tree.EncodedDataset`,
+which worker processes map from shared memory, so memory use stays close to one copy of the data however many trees
+are grown. Every tree is compiled once built and only the compiled trees are kept.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from numpy import argmax, bincount, empty, flatnonzero, fromiter, int64, object_, sort, zeros
+from numpy.random import SeedSequence, default_rng
+
+from . import tree
+from ._shared import resolve_n_jobs
+from .callbacks import CallbackList
+from .tree import CompiledTree, EncodedDataset, Node, _encode_features
+
+
+def _grow_tree(dataset, feature_index_set, class_label_index, bootstrap, limits, seed_sequence):
+    """Method for growing and compiling a single tree of a random forest.
+
+    :param dataset: Encoded dataset of the forest.
+    :type dataset: :class:`~mltools.tree.EncodedDataset`
+    :param set feature_index_set: Set of unique feature indexes.
+    :param int class_label_index: Index of class label value in data point (list).
+    :param bool bootstrap: Grow the tree on a bootstrap sample of the rows instead of every row.
+    :param dict limits: Keyword arguments of :meth:`~mltools.tree.Node.build_tree` limiting the growth of the tree.
+    :param seed_sequence: Seed of the bootstrap sample and of the candidate features of the tree.
+    :type seed_sequence: :py:class:`~numpy.random.SeedSequence`
+    :return: Compiled tree.
+    :rtype: :class:`~mltools.tree.CompiledTree`
+    """
+    sample_seed, feature_seed = seed_sequence.spawn(2)
+    indices = None
+    if bootstrap:
+        # sorted row indexes keep the gathers of the encoded dataset in memory order, repeated rows are counted twice
+        indices = sort(default_rng(sample_seed).integers(0, len(dataset), size=len(dataset)))
+
+    root = Node(dataset, feature_index_set, indices=indices)
+    root.build_tree(class_label_index=class_label_index, seed=feature_seed, **limits)
+    return CompiledTree(root, falsy_labels=True)
+
+
+def _grow_shared_tree(feature_index_set, class_label_index, bootstrap, limits, seed_sequence):
+    """Method for growing a tree of a random forest in a worker process, on the shared encoded dataset.
+
+    :return: Compiled tree.
+    :rtype: :class:`~mltools.tree.CompiledTree`
+    """
+    return _grow_tree(
+        tree._worker_state["dataset"], feature_index_set, class_label_index, bootstrap, limits, seed_sequence
+    )
+
+
+class RandomForest(object):
+    """Random forest of decision trees voting on the class label.
+
+    Every tree is grown on its own bootstrap sample of the rows and scores a random subset of the features at every
+    split. Trees only depend on the seed, not on the number of processes building them or how the processes are
+    started, ties between class labels go to the smallest label rather than depending on hashes.
+    """
+
+    def __init__(self, data_list, feature_index_set, number_trees=10, max_features="sqrt", bootstrap=True):
+        """Initialization method for class RandomForest.
+
+        :param data_list: List of data values where each data value is a list of feature values, or an already encoded
+                          dataset.
+        :type data_list: :py:class:`list` or :class:`~mltools.tree.EncodedDataset`
+        :param set feature_index_set: Set of unique feature indexes.
+        :param int number_trees: Number of trees of the forest.
+        :param max_features: Number of candidate features drawn at random for every split, see
+                             :meth:`~mltools.tree.Node.build_tree`.
+        :type max_features: :py:obj:`None` or :py:class:`int` or :py:class:`float` or :py:class:`str`
+        :param bool bootstrap: Grow every tree on a bootstrap sample of the rows instead of every row.
+        """
+        self.dataset = data_list if isinstance(data_list, EncodedDataset) else EncodedDataset(data_list)
+        self.feature_index_set = feature_index_set
+        self.number_trees = number_trees
+        self.max_features = max_features
+        self.bootstrap = bootstrap
+        self.trees = list()
+
+        # class labels voted on and the class label code of every label of every tree
+        self.class_labels = list()
+        self._tree_class_codes = list()
+
+    def __len__(self):
+        """Overrides len() method for class RandomForest.
+        """
+        return len(self.trees)
+
+    def build_forest(self, class_label_index=-1, n_jobs=None, max_depth=None, min_samples_split=2, min_gain=0.0,
+                     seed=None, callbacks=None):
+        """Method for growing the trees of the forest.
+
+        With multiple jobs the encoded dataset is copied once into shared memory that every worker maps, and workers
+        draw the bootstrap samples of their trees themselves, so only seeds and compiled trees are sent between
+        processes.
+
+        :param int class_label_index: Index of class label value in data point (list).
+        :param n_jobs: Number of processes growing trees, -1 uses every CPU.
+        :type n_jobs: :py:obj:`None` or :py:class:`int`
+        :param max_depth: Depth at which nodes become leaves, None grows the trees until the leaves are pure.
+        :type max_depth: :py:obj:`None` or :py:class:`int`
+        :param int min_samples_split: Minimum number of data points a node needs to be split.
+        :param float min_gain: Minimum information gain a split needs, nodes without such a split become leaves.
+        :param seed: Seed of the bootstrap samples and candidate features.
+        :type seed: :py:obj:`None` or :py:class:`int`
+        :param callbacks: Callbacks receiving an epoch event with the number of nodes of every grown tree.
+        :type callbacks: :py:obj:`None` or :py:class:`list`
+        :return: None
+        """
+        limits = dict(max_depth=max_depth, min_samples_split=min_samples_split, min_gain=min_gain,
+                      max_features=self.max_features)
+        tree_seeds = SeedSequence(seed).spawn(self.number_trees)
+        n_jobs = min(resolve_n_jobs(n_jobs), self.number_trees)
+        hooks = CallbackList(callbacks)
+        hooks.on_train_begin(self)
+
+        self.trees = list()
+        if n_jobs > 1:
+            shared_codes, codes_spec = tree._share_codes(self.dataset.codes)
+            try:
+                with ProcessPoolExecutor(
+                        max_workers=n_jobs, initializer=tree._initialize_worker,
+                        initargs=(codes_spec, self.dataset.values, self.dataset.thresholds)
+                ) as pool:
+                    number_seeds = len(tree_seeds)
+                    grown = pool.map(
+                        _grow_shared_tree, [self.feature_index_set] * number_seeds, [class_label_index] * number_seeds,
+                        [self.bootstrap] * number_seeds, [limits] * number_seeds, tree_seeds
+                    )
+                    for compiled_tree in grown:
+                        self._add_tree(compiled_tree, hooks)
+            finally:
+                for shared in shared_codes:
+                    shared.close()
+        else:
+            for tree_seed in tree_seeds:
+                hooks.timers.mark()
+                compiled_tree = _grow_tree(
+                    self.dataset, self.feature_index_set, class_label_index, self.bootstrap, limits, tree_seed
+                )
+                hooks.timers.lap("tree")
+                self._add_tree(compiled_tree, hooks)
+
+        self.class_labels = list(self.dataset.values[class_label_index])
+        lookup = {class_label: code for code, class_label in enumerate(self.class_labels)}
+        self._tree_class_codes = [
+            fromiter((lookup[class_label] for class_label in compiled_tree.labels), dtype=int64,
+                     count=len(compiled_tree.labels))
+            for compiled_tree in self.trees
+        ]
+
+        hooks.on_train_end(self)
+
+    def _add_tree(self, compiled_tree, hooks):
+        """Method for adding a grown tree to the forest.
+
+        :param compiled_tree: Grown tree.
+        :type compiled_tree: :class:`~mltools.tree.CompiledTree`
+        :param hooks: Callbacks receiving the epoch event of the tree.
+        :type hooks: :class:`~mltools.callbacks.CallbackList`
+        :return: None
+        """
+        self.trees.append(compiled_tree)
+        if hooks:
+            hooks.on_epoch(self, len(self.trees) - 1, {"nodes": len(compiled_tree)})
+
+    def vote_counts(self, data_values):
+        """Method for counting the votes of the trees for every class label of many data points at once.
+
+        The features used by any tree are encoded once and shared by every tree.
+
+        :param data_values: List of data points, two dimensional array or sparse matrix with one data point per row.
+        :return: Matrix of vote counts with one row per data point and one column per class label, in the order of
+                 :attr:`class_labels`.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        vocabularies = dict()
+        continuous_features = list()
+        for compiled_tree in self.trees:
+            vocabularies.update(compiled_tree.vocabularies)
+            continuous_features.extend(feature_index for feature_index in compiled_tree.continuous_features
+                                       if feature_index not in continuous_features)
+        encoded = _encode_features(data_values, vocabularies, continuous_features)
+
+        number_rows = encoded[1].shape[1]
+        number_classes = len(self.class_labels)
+        votes = zeros(number_rows * number_classes, dtype=int64)
+        for compiled_tree, class_codes in zip(self.trees, self._tree_class_codes):
+            label_positions = compiled_tree._route(*encoded)
+            voted = flatnonzero(label_positions >= 0)
+            votes += bincount(voted * number_classes + class_codes[label_positions[voted]],
+                              minlength=number_rows * number_classes)
+        return votes.reshape(number_rows, number_classes)
+
+    def predict_batch(self, data_values):
+        """Method to predict the class labels of many data points at once by majority vote of the trees.
+
+        Ties go to the class label first in :attr:`class_labels`.
+
+        :param data_values: List of data points, two dimensional array or sparse matrix with one data point per row.
+        :return: Array of predicted class labels, None where no tree predicts a class label.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        votes = self.vote_counts(data_values)
+        class_labels = empty(len(self.class_labels), dtype=object_)
+        for position, class_label in enumerate(self.class_labels):
+            class_labels[position] = class_label
+
+        predictions = empty(len(votes), dtype=object_)
+        voted = votes.any(axis=1)
+        predictions[voted] = class_labels[argmax(votes[voted], axis=1)]
+        return predictions
+
+    def predict(self, data_value):
+        """Method to predict the class label of a given data point by majority vote of the trees.
+
+        :param data_value: Data point, a list of feature values.
+        :return: Predicted class label, None where no tree predicts a class label.
+        """
+        return self.predict_batch([data_value])[0]
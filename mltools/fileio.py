@@ -7,8 +7,28 @@ mltools.fileio
 This module provides functions for parsing data files.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 from csv import reader
-from numpy import array, genfromtxt
+from itertools import accumulate, islice
+from json import dumps, loads
+from os import path, remove, replace, stat
+from struct import Struct
+from tempfile import mkstemp
+
+from ._shared import resolve_n_jobs
+
+from numpy import array, delete, dtype as numpy_dtype, empty, float64, genfromtxt, loadtxt, \
+    memmap, object_
+
+# binary cache file layout: magic, format version and header length, followed by a JSON header padded to a multiple
+# of _CACHE_ALIGNMENT bytes and the data matrix in column-major order
+_CACHE_MAGIC = b"MLTCACHE"
+_CACHE_VERSION = 1
+_CACHE_PREFIX = Struct("<8sII")
+_CACHE_ALIGNMENT = 64
+
+# files smaller than this are parsed by a single process, byte ranges are at least this large
+_PARALLEL_MIN_BYTES = 1 << 22
 
 
 def parse_csv(data_path, headers=False):
@@ -35,26 +55,406 @@ def parse_csv(data_path, headers=False):
     return data_list, feature_list
 
 
-def parse_csv_2(file_path, label_index=None, headers=False):
+def parse_csv_2(file_path, label_index=None, headers=False, dtype=float64):
     """Improved method for parsing data from CSV files.
 
     :param str file_path: Path to CSV data file.
     :param label_index: Index of class labels in data array.
     :type label_index: :py:obj:`None` or :py:class:`int`
     :param bool headers: Denotes the presences of value labels (headers) in data array.
+    :param dtype: Floating point type of the returned arrays, such as float32.
     :return Two arrays; x values and y values.
     :rtype: :py:class:`tuple`
     """
-    raw_data = genfromtxt(file_path, delimiter=",", skip_header=1 if headers else 0)
+    raw_data = genfromtxt(file_path, delimiter=",", skip_header=1 if headers else 0, dtype=dtype)
+
+    return _split_labels(raw_data, label_index)
+
+
+def _split_labels(raw_data, label_index):
+    """Method for separating the class label column from a two dimensional data array.
 
+    :param raw_data: Two dimensional array of parsed data values.
+    :type raw_data: :py:class:`~numpy.ndarray`
+    :param label_index: Index of class labels in data array.
+    :type label_index: :py:obj:`None` or :py:class:`int`
+    :return: Two arrays; x values and y values, where y values have shape (1, number of rows).
+    :rtype: :py:class:`tuple`
+    """
     if type(label_index) == int:
+        number_columns = raw_data.shape[1]
+        if not -number_columns <= label_index < number_columns:
+            raise ValueError(
+                "label_index {} is out of range for data with {} columns".format(label_index, number_columns)
+            )
+
         if label_index == 0:
             return raw_data[:, 1:], array([raw_data[:, 0]])
-        elif label_index == -1:
-            return raw_data[:, :len(raw_data[0]) - 1], array([raw_data[:, -1]])
+        elif label_index == -1 or label_index == number_columns - 1:
+            return raw_data[:, :number_columns - 1], array([raw_data[:, -1]])
         else:
-            # lazy handling of y values not being at the ends of the array
-            raise ValueError("")
+            return delete(raw_data, label_index, axis=1), array([raw_data[:, label_index]])
 
     else:
         return raw_data, None
+
+
+def _parse_lines(lines, label_index=None, dtype=float64):
+    """Method for parsing a list of CSV lines into typed arrays.
+
+    :param list lines: Lines of CSV text.
+    :param label_index: Index of class labels in data array.
+    :type label_index: :py:obj:`None` or :py:class:`int`
+    :param dtype: Data type of every column, or dictionary of column indexes to data types where missing columns are
+                  parsed as floats.
+    :return: Two arrays; x values and y values.
+    :rtype: :py:class:`tuple`
+    :raises ValueError: When a value cannot be parsed, or a value of an integer column is missing.
+    """
+    if isinstance(dtype, dict):
+        number_columns = lines[0].count(",") + 1
+        column_dtypes = [numpy_dtype(float64) for _ in range(number_columns)]
+        for column_index, column_dtype in dtype.items():
+            column_dtypes[column_index] = numpy_dtype(column_dtype)
+        line_dtype = [
+            ("f{}".format(column_index), column_dtype) for column_index, column_dtype in enumerate(column_dtypes)
+        ]
+    else:
+        line_dtype = dtype
+    # rows of structured types are single elements, any other rows are two dimensional even for a single row or column
+    ndmin = 1 if isinstance(dtype, dict) else 2
+
+    try:
+        raw_data = loadtxt(lines, delimiter=",", dtype=line_dtype, ndmin=ndmin)
+    except ValueError:
+        # the fast parser rejects missing values, which are filled with nan like parse_csv_2(), any other invalid value
+        # is raised
+        filled_lines, missing_columns = _fill_missing(lines)
+        if not missing_columns:
+            raise
+        integer_columns = [
+            column_index for column_index in sorted(missing_columns)
+            if numpy_dtype(line_dtype[column_index][1] if isinstance(dtype, dict) else line_dtype).kind in "biu"
+        ]
+        if integer_columns:
+            raise ValueError("Missing values in integer columns {}".format(integer_columns))
+        raw_data = loadtxt(filled_lines, delimiter=",", dtype=line_dtype, ndmin=ndmin)
+
+    if not isinstance(dtype, dict):
+        return _split_labels(raw_data, label_index)
+
+    # columns with different declared types are gathered into an object array, one typed column at a time
+    fields = raw_data.dtype.names
+    label_field = fields[label_index] if type(label_index) == int else None
+    feature_fields = [field for field in fields if field != label_field]
+    feature_dtypes = {raw_data.dtype[field] for field in feature_fields}
+
+    X = empty((len(raw_data), len(feature_fields)), dtype=feature_dtypes.pop() if len(feature_dtypes) == 1 else object_)
+    for column_index, field in enumerate(feature_fields):
+        X[:, column_index] = raw_data[field]
+
+    return X, array([raw_data[label_field]]) if label_field is not None else None
+
+
+def _fill_missing(lines):
+    """Method for replacing the empty fields of CSV lines with nan.
+
+    :param list lines: Lines of CSV text.
+    :return: Tuple of the list of filled lines and the set of indexes of the columns with empty fields.
+    :rtype: :py:class:`tuple`
+    """
+    filled_lines = list()
+    missing_columns = set()
+    for line in lines:
+        fields = line.split("#", 1)[0].rstrip("\r\n").split(",")
+        for column_index, field in enumerate(fields):
+            if not field.strip():
+                missing_columns.add(column_index)
+                fields[column_index] = "nan"
+        filled_lines.append(",".join(fields))
+    return filled_lines, missing_columns
+
+
+def iter_csv(file_path, chunk_size=65536, label_index=None, headers=False, dtype=float64):
+    """Method for reading a CSV file as a stream of fixed size chunks.
+
+    Only one chunk of the file is held in memory at a time. Chunks have the layout of :func:`parse_csv_2` results.
+
+    :param str file_path: Path to CSV data file.
+    :param int chunk_size: Number of rows per chunk, the final chunk may be smaller.
+    :param label_index: Index of class labels in data array.
+    :type label_index: :py:obj:`None` or :py:class:`int`
+    :param bool headers: Denotes the presences of value labels (headers) in data array.
+    :param dtype: Data type of every column, or dictionary of column indexes to data types where missing columns are
+                  parsed as floats. x values of columns with different types are returned as an object array.
+                  Missing values are parsed as nan, which integer columns cannot hold.
+    :return: Generator of tuples of two arrays; x values and y values (None without label_index).
+    :rtype: :py:class:`generator`
+    :raises ValueError: When a value cannot be parsed, or a value of an integer column is missing.
+    """
+    with open(file_path, "r") as fh:
+        if headers:
+            next(fh, None)
+
+        while True:
+            lines = list(islice(fh, chunk_size))
+            if not lines:
+                break
+
+            lines = [line for line in lines if _is_data_line(line)]
+            if lines:
+                yield _parse_lines(lines, label_index, dtype)
+
+
+def _is_data_line(line):
+    """Method for checking whether a line of CSV text holds data, rather than being blank or a comment.
+
+    :param str line: Line of CSV text.
+    :rtype: :py:class:`bool`
+    """
+    return bool(line.split("#", 1)[0].strip())
+
+
+def parse_csv_cached(file_path, label_index=None, headers=False, dtype=float64, cache_path=None, mmap_mode="r"):
+    """Method for parsing data from CSV files through a binary cache file.
+
+    The first call parses the CSV file in chunks and writes the values to a column-major binary cache file, feature
+    columns first and the class label column last. Later calls memory-map the cache file, so the returned arrays are
+    views of the file that are loaded on demand. The cache is rebuilt when the size or modification time of the CSV
+    file changes, or when it was written with different parsing options.
+
+    :param str file_path: Path to CSV data file.
+    :param label_index: Index of class labels in data array.
+    :type label_index: :py:obj:`None` or :py:class:`int`
+    :param bool headers: Denotes the presences of value labels (headers) in data array.
+    :param dtype: Data type of the values.
+    :param cache_path: Path to the cache file, defaults to the CSV file path with a ".mlcache" suffix.
+    :type cache_path: :py:obj:`None` or :py:class:`str`
+    :param str mmap_mode: Memory-map mode of the returned arrays, "r" for read-only or "c" for copy-on-write.
+    :return Two arrays; x values and y values, as returned by :func:`parse_csv_2`.
+    :rtype: :py:class:`tuple`
+    """
+    cache_path = cache_path if cache_path else file_path + ".mlcache"
+    source = stat(file_path)
+    header = {
+        "source_size": source.st_size,
+        "source_mtime_ns": source.st_mtime_ns,
+        "label_index": label_index,
+        "headers": headers,
+        "dtype": numpy_dtype(dtype).str,
+    }
+
+    data = _read_cache(cache_path, header, mmap_mode)
+    if data is None:
+        _write_cache(file_path, cache_path, header)
+        data = _read_cache(cache_path, header, mmap_mode)
+
+    if type(label_index) == int:
+        return data[:, :-1], data[:, -1].reshape(1, -1)
+    return data, None
+
+
+def _read_cache(cache_path, header, mmap_mode="r"):
+    """Method for memory-mapping the data matrix of a binary cache file.
+
+    :param str cache_path: Path to the cache file.
+    :param dict header: Expected source file state and parsing options of the cache.
+    :param str mmap_mode: Memory-map mode of the returned array.
+    :return: Data matrix, or None when the cache file is missing or stale.
+    :rtype: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    """
+    if not path.exists(cache_path):
+        return None
+
+    with open(cache_path, "rb") as fh:
+        prefix = fh.read(_CACHE_PREFIX.size)
+        if len(prefix) < _CACHE_PREFIX.size:
+            return None
+        magic, version, header_length = _CACHE_PREFIX.unpack(prefix)
+        if magic != _CACHE_MAGIC or version != _CACHE_VERSION:
+            return None
+        try:
+            cache_header = loads(fh.read(header_length).decode("utf-8"))
+        except ValueError:
+            return None
+
+    if any(cache_header.get(key) != value for key, value in header.items()):
+        return None
+
+    shape = tuple(cache_header["shape"])
+    if path.getsize(cache_path) < cache_header["offset"] + shape[0] * shape[1] * numpy_dtype(header["dtype"]).itemsize:
+        return None
+    if not shape[0] * shape[1]:
+        return empty(shape, dtype=cache_header["dtype"], order="F")
+    return memmap(
+        cache_path, dtype=cache_header["dtype"], mode=mmap_mode, offset=cache_header["offset"], shape=shape, order="F"
+    )
+
+
+def _write_cache(file_path, cache_path, header):
+    """Method for parsing a CSV file into a binary cache file.
+
+    The file is parsed twice in chunks, once to count the rows and once to fill the memory-mapped data matrix, so the
+    parsed values never have to fit in memory at once. The cache file replaces any previous one atomically.
+
+    :param str file_path: Path to CSV data file.
+    :param str cache_path: Path to the cache file.
+    :param dict header: Source file state and parsing options of the cache.
+    :return: None
+    """
+    number_rows = 0
+    number_columns = 0
+    with open(file_path, "r") as fh:
+        if header["headers"]:
+            next(fh, None)
+        for line in fh:
+            if _is_data_line(line):
+                number_columns = number_columns or line.count(",") + 1
+                number_rows += 1
+
+    prefix_size = _CACHE_PREFIX.size
+    header = dict(header, shape=[number_rows, number_columns], offset=0)
+    header_length = len(dumps(header).encode("utf-8")) + 32
+    header["offset"] = -(-(prefix_size + header_length) // _CACHE_ALIGNMENT) * _CACHE_ALIGNMENT
+    header_bytes = dumps(header).encode("utf-8").ljust(header["offset"] - prefix_size)
+
+    descriptor, temporary_path = mkstemp(dir=path.dirname(path.abspath(cache_path)), suffix=".tmp")
+    try:
+        with open(descriptor, "wb") as fh:
+            fh.write(_CACHE_PREFIX.pack(_CACHE_MAGIC, _CACHE_VERSION, len(header_bytes)))
+            fh.write(header_bytes)
+            fh.truncate(header["offset"] + number_rows * number_columns * numpy_dtype(header["dtype"]).itemsize)
+
+        if number_rows * number_columns:
+            data = memmap(temporary_path, dtype=header["dtype"], mode="r+", offset=header["offset"],
+                          shape=(number_rows, number_columns), order="F")
+            start = 0
+            for X, y in iter_csv(file_path, label_index=header["label_index"], headers=header["headers"],
+                                 dtype=header["dtype"]):
+                data[start:start + len(X), :X.shape[1]] = X
+                if y is not None:
+                    data[start:start + len(X), -1] = y[0]
+                start += len(X)
+            data.flush()
+            del data
+
+        replace(temporary_path, cache_path)
+    except BaseException:
+        remove(temporary_path)
+        raise
+
+
+def parse_csv_parallel(file_path, label_index=None, headers=False, n_jobs=-1, dtype=float64):
+    """Method for parsing data from large CSV files with a pool of worker processes.
+
+    The file is divided into byte ranges that start and end on line boundaries. Workers first count the data rows of
+    each range, which gives the row every range starts at, and then parse their ranges straight into a preallocated
+    memory-mapped array backed by a temporary file. Results are identical to :func:`parse_csv_2`, missing and invalid
+    values are nan.
+
+    :param str file_path: Path to CSV data file.
+    :param label_index: Index of class labels in data array.
+    :type label_index: :py:obj:`None` or :py:class:`int`
+    :param bool headers: Denotes the presences of value labels (headers) in data array.
+    :param n_jobs: Number of worker processes, -1 uses every CPU.
+    :type n_jobs: :py:obj:`None` or :py:class:`int`
+    :param dtype: Floating point type of the returned arrays, such as float32.
+    :return Two arrays; x values and y values.
+    :rtype: :py:class:`tuple`
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    file_size = path.getsize(file_path)
+    if n_jobs == 1 or file_size < 2 * _PARALLEL_MIN_BYTES:
+        return parse_csv_2(file_path, label_index, headers, dtype)
+
+    # byte ranges aligned to the start of the line following each boundary
+    with open(file_path, "rb") as fh:
+        if headers:
+            fh.readline()
+        data_start = fh.tell()
+
+        first_line = b""
+        while first_line is not None and not _is_data_line(first_line.decode("utf-8")):
+            first_line = fh.readline() or None
+        if first_line is None:
+            return parse_csv_2(file_path, label_index, headers, dtype)
+        number_columns = first_line.decode("utf-8").count(",") + 1
+
+        range_size = max(_PARALLEL_MIN_BYTES, (file_size - data_start) // (4 * n_jobs) + 1)
+        boundaries = [data_start]
+        while boundaries[-1] < file_size:
+            fh.seek(min(boundaries[-1] + range_size, file_size))
+            fh.readline()
+            boundaries.append(min(fh.tell(), file_size))
+    byte_ranges = list(zip(boundaries[:-1], boundaries[1:]))
+
+    descriptor, output_path = mkstemp(suffix=".mltools")
+    try:
+        # the descriptor is closed and the file removed however the workers fail
+        with open(descriptor, "wb") as fh, ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            row_counts = list(pool.map(_count_rows, [file_path] * len(byte_ranges), byte_ranges))
+            number_rows = sum(row_counts)
+            fh.truncate(max(number_rows * number_columns * numpy_dtype(dtype).itemsize, 1))
+
+            output = (output_path, (number_rows, number_columns), dtype)
+            list(pool.map(
+                _parse_range, [file_path] * len(byte_ranges), byte_ranges, [output] * len(byte_ranges),
+                accumulate([0] + row_counts[:-1])
+            ))
+
+        raw_data = memmap(output_path, dtype=dtype, mode="r+", shape=(number_rows, number_columns))
+    finally:
+        try:
+            # the mapping stays valid after the file is removed
+            remove(output_path)
+        except OSError:
+            pass
+
+    return _split_labels(raw_data, label_index)
+
+
+def _read_range(file_path, byte_range):
+    """Method for reading the data lines within a byte range of a CSV file.
+
+    :param str file_path: Path to CSV data file.
+    :param tuple byte_range: Start and end byte offsets, both on line boundaries.
+    :return: List of data lines.
+    :rtype: :py:class:`list`
+    """
+    start, end = byte_range
+    with open(file_path, "rb") as fh:
+        fh.seek(start)
+        text = fh.read(end - start).decode("utf-8")
+
+    return [line for line in text.split("\n") if _is_data_line(line)]
+
+
+def _count_rows(file_path, byte_range):
+    """Method for counting the data rows within a byte range of a CSV file in a worker process.
+
+    :rtype: :py:class:`int`
+    """
+    return len(_read_range(file_path, byte_range))
+
+
+def _parse_range(file_path, byte_range, output, row_start):
+    """Method for parsing the data rows within a byte range of a CSV file into the output file in a worker process.
+
+    :param tuple output: Path, shape and type of the memory-mapped output array.
+    :param int row_start: Row of the output array holding the first data row of the range.
+    :return: None
+    """
+    lines = _read_range(file_path, byte_range)
+    if not lines:
+        return
+
+    output_path, shape, dtype = output
+    try:
+        values = _parse_lines(lines, dtype=dtype)[0]
+    except ValueError:
+        # invalid values are nan like in parse_csv_2(), whose slower parser is only used for ranges holding them
+        values = genfromtxt(lines, delimiter=",", dtype=dtype, ndmin=2)
+
+    raw_data = memmap(output_path, dtype=dtype, mode="r+", shape=shape)
+    raw_data[row_start:row_start + len(lines)] = values
+    raw_data.flush()
@@ -1,20 +1,104 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
+mltools.math
+~~~~~~~~~~~~
 
+This module provides array kernels for mathematical operations relevant to machine learning.
+
+Kernels accept an ``out`` buffer so inner training loops can reuse their arrays instead of allocating new ones.
 """
-from numpy import exp
+from numpy import absolute, add, asarray, divide, einsum, empty_like, exp, float64, floating, issubdtype, negative, \
+    subtract
+
+
+def _output_buffer(values, out):
+    """Method for choosing the buffer a kernel writes its results into.
+
+    :param values: Input values of the kernel.
+    :type values: :py:class:`~numpy.ndarray`
+    :param out: Buffer given by the caller.
+    :type out: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    :return: The given buffer, or a new floating point array shaped like values.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    if out is not None:
+        return out
+    return empty_like(values, dtype=values.dtype if issubdtype(values.dtype, floating) else float64)
 
 
-def mean_squared_error(hypothesis, actual, derivative=False, num_values=None):
+def mean_squared_error(hypothesis, actual, derivative=False, num_values=None, out=None):
     """Method for calculating the mean squared error of input value(s).
 
+    MSE = 1/n sum((hypothesis - actual)^2)
+
+    Derivative:
+        dMSE/dhypothesis = 2/n (hypothesis - actual)
+
+    The squared errors are accumulated in float64, also for float32 input.
+
+    :param hypothesis: Predicted value(s).
+    :type hypothesis: :py:class:`float` or :py:class:`~numpy.ndarray`
+    :param actual: Actual value(s), broadcastable to the shape of hypothesis.
+    :type actual: :py:class:`float` or :py:class:`~numpy.ndarray`
+    :param bool derivative: Denotes that the gradient with respect to the hypothesis should be calculated.
+    :param num_values: Number of values the error is averaged over, every value of hypothesis by default.
+    :type num_values: :py:obj:`None` or :py:class:`int`
+    :param out: Buffer receiving the residuals, or the gradient when derivative is True.
+    :type out: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    :return: Returns the mean squared error, or the gradient array when derivative is True.
+    :rtype: :py:class:`float` or :py:class:`~numpy.ndarray`
     """
-    num_values = num_values if num_values else len(hypothesis)
-    return 1 / num_values * sum((hypothesis - actual) ** 2)
+    hypothesis = asarray(hypothesis)
+    residual = subtract(hypothesis, actual, out=_output_buffer(hypothesis, out))
+    num_values = num_values if num_values else residual.size
+
+    if derivative:
+        residual *= 2 / num_values
+        return residual
 
+    flat_residual = residual.reshape(-1)
+    return einsum("i,i->", flat_residual, flat_residual, dtype=float64) / num_values
 
-def sigmoid(input_value, derivative=False):
+
+def sigmoid_and_derivative(input_value, out=None, derivative_out=None):
+    """Method for calculating the sigmoid and its derivative from a single exponential.
+
+    With e = e^(-|in|), which never overflows:
+
+        g(-|in|) = e / (1 + e)
+        g(|in|) = 1 - g(-|in|)
+        g'(in) = e / (1 + e)^2
+
+    :param input_value: Value(s) for the sigmoid to be calculated for.
+    :type input_value: :py:class:`float` or :py:class:`int` or :py:class:`~numpy.ndarray`
+    :param out: Buffer receiving the sigmoid values, may be the input array itself.
+    :type out: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    :param derivative_out: Buffer receiving the derivatives, must not share memory with out.
+    :type derivative_out: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    :return: Tuple of the sigmoid value(s) and the derivative value(s).
+    :rtype: :py:class:`tuple`
+    """
+    values = asarray(input_value)
+    out = _output_buffer(values, out)
+    derivative_out = _output_buffer(out, derivative_out)
+    # the sign is taken before out, which may be the input array, is overwritten
+    positives = values >= 0
+
+    absolute(values, out=out)
+    negative(out, out=out)
+    exp(out, out=out)
+    add(out, 1, out=derivative_out)
+    divide(out, derivative_out, out=out)
+    divide(out, derivative_out, out=derivative_out)
+    subtract(1, out, out=out, where=positives)
+
+    if out.ndim == 0:
+        return out[()], derivative_out[()]
+    return out, derivative_out
+
+
+def sigmoid(input_value, derivative=False, out=None):
     """Method for calculating the sigmoid of an input value.
 
     g(in) = 1 / (1 + e^(-in))
@@ -22,15 +106,18 @@ def sigmoid(input_value, derivative=False):
     Derivative:
         g'(in) = g(in)*(1-g(in))
 
-    :param input_value: Value(s) for mean squared error to be calculated for.
+    Calculated piecewise by :func:`sigmoid_and_derivative`, so large inputs of either sign do not overflow.
+
+    :param input_value: Value(s) for the sigmoid to be calculated for.
     :type input_value: :py:class:`float` or :py:class:`int` or
                        :py:class:`~numpy.ndarray`
     :param bool derivative: Denotes that the derivative of the sigmoid function should be calculated.
+    :param out: Buffer receiving the calculated value(s), may be the input array itself.
+    :type out: :py:obj:`None` or :py:class:`~numpy.ndarray`
     :return: Returns the calculated sigmoid value(s).
     :rtype: :py:class:`float` or :py:class:`int` or
             :py:class:`~numpy.ndarray`
     """
     if derivative:
-        sig = sigmoid(input_value)
-        return sig * (1 - sig)
-    return 1 / (1 + exp(input_value))
+        return sigmoid_and_derivative(input_value, derivative_out=out)[1]
+    return sigmoid_and_derivative(input_value, out=out)[0]
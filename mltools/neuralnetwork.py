@@ -1,116 +1,534 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
+mltools.neuralnetwork
+~~~~~~~~~~~~~~~~~~~~~
+
+This module provides a class for training feed-forward neural network models.
 """
-from numpy import array, dot
-from numpy.random import uniform
-import mltools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Barrier
+
+from numpy import arange, asarray, dot, empty, float64, int64, maximum, multiply, sign, subtract, take, tanh
+from numpy.random import SeedSequence, default_rng, uniform
+
+from ._shared import SharedArray, attach_array, resolve_n_jobs
+from .callbacks import CallbackList
+from .math import mean_squared_error, sigmoid, sigmoid_and_derivative
+
+
+def _sigmoid(values, derivatives=None):
+    """Method for replacing layer inputs with their sigmoid in place.
+
+        g(in) = 1 / (1 + e^(-in))
+        g'(in) = g(in)*(1-g(in))
+
+    :param values: Layer inputs, replaced by the layer outputs.
+    :type values: :py:class:`~numpy.ndarray`
+    :param derivatives: Buffer receiving the derivatives, calculated from the same exponentials as the outputs.
+    :type derivatives: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    """
+    if derivatives is None:
+        sigmoid(values, out=values)
+    else:
+        sigmoid_and_derivative(values, out=values, derivative_out=derivatives)
+
+
+def _tanh(values, derivatives=None):
+    """Method for replacing layer inputs with their hyperbolic tangent in place, with derivatives 1 - g(in)^2.
+    """
+    tanh(values, out=values)
+    if derivatives is not None:
+        multiply(values, values, out=derivatives)
+        subtract(1, derivatives, out=derivatives)
+
+
+def _relu(values, derivatives=None):
+    """Method for replacing layer inputs with their rectified linear value in place, with derivatives 1 for positive
+    outputs else 0.
+    """
+    maximum(values, 0, out=values)
+    if derivatives is not None:
+        sign(values, out=derivatives)
+
+
+def _identity(values, derivatives=None):
+    """Method for leaving layer inputs unchanged, with derivatives always 1.
+    """
+    if derivatives is not None:
+        derivatives.fill(1)
+
+
+# activation functions by name, each replaces layer inputs with outputs in place and optionally fills the derivatives
+ACTIVATIONS = {
+    "sigmoid": _sigmoid,
+    "tanh": _tanh,
+    "relu": _relu,
+    "identity": _identity,
+}
 
 
 class NeuralNetwork(object):
     """Feed-Forward Neural Network model class object.
+
+    The network is built from a list of layer sizes, starting with the number of input nodes and ending with the number
+    of output nodes. Weights and biases of every layer live in a single flat :attr:`parameters` array, with
+    :attr:`weights` and :attr:`bias` holding per layer views into it, so the parameters can be saved, averaged or sent
+    between processes as one array. Layer outputs, deltas and gradients are written into buffers that are reused by
+    every training step.
     """
 
-    def __init__(self, X, Y, alpha=0.1, weight_range=(-1, 1), bias_range=(-1, 1)):
+    def __init__(self, X, Y, alpha=0.1, weight_range=(-1, 1), bias_range=(-1, 1), layers=(784, 128, 64, 10, 1),
+                 activations="sigmoid", parameters=None, dtype=float64):
         """Initializer for Neural Network model class.
+
+        :param X: Two dimensional array with one data point per row.
+        :type X: :py:class:`~numpy.ndarray`
+        :param Y: Array of actual values with shape (output nodes, number of data points).
+        :type Y: :py:class:`~numpy.ndarray`
+        :param float alpha: Learning rate.
+        :param tuple weight_range: Range of the uniformly drawn initial weights.
+        :param tuple bias_range: Range of the uniformly drawn initial biases.
+        :param layers: Number of nodes of every layer, from the input layer to the output layer.
+        :type layers: :py:class:`list` or :py:class:`tuple`
+        :param activations: Name of the activation function of every layer after the input layer, or a list of names
+                            with one per layer, see :data:`ACTIVATIONS`.
+        :type activations: :py:class:`str` or :py:class:`list`
+        :param parameters: Flat array holding the initial weights and biases, used in place instead of drawing them.
+        :type parameters: :py:obj:`None` or :py:class:`~numpy.ndarray`
+        :param dtype: Floating point type of the parameters and every calculation, such as float32 to halve memory
+                      traffic. Ignored when parameters are given, which keep their own type.
         """
         self.X = X
         self.Y = Y
         self.alpha = alpha
+        self.layers = tuple(layers)
 
-        # initialize weight and bias matrices
-        # for now, defaults to a neural network based on nmist dataset; with 784 input nodes, 128 first-layer,
-        # hidden-layer nodes, 64 second-layer, 10 hidden-layer nodes, and 1 output node.
-        self.weights = dict()
-        # update to use uniform method for creating ndarrays
-        self.weights["layer_1"] = uniform(*weight_range, size=(784, 128))
-        self.weights["layer_2"] = uniform(*weight_range, size=(128, 64))
-        self.weights["layer_3"] = uniform(*weight_range, size=(64, 10))
-        self.weights["layer_4"] = uniform(*weight_range, size=(10, 1))  # output layer
-
-        self.bias = dict()
-        # creates (x, 1) sized arrays.
-        self.bias["layer_1"] = uniform(*bias_range, size=(self.weights["layer_1"].shape[1], 1))
-        self.bias["layer_2"] = uniform(*bias_range, size=(self.weights["layer_2"].shape[1], 1))
-        self.bias["layer_3"] = uniform(*bias_range, size=(self.weights["layer_3"].shape[1], 1))
-        self.bias["layer_4"] = uniform(*bias_range, size=(self.weights["layer_4"].shape[1], 1))  # output layer
-
-    def _calculate(self, input_value):
-        """Method for predicting class label from trained model.
-        in = W dot x
+        if isinstance(activations, str):
+            activations = [activations] * (len(self.layers) - 1)
+        self.activations = list(activations)
+        if len(self.activations) != len(self.layers) - 1:
+            raise ValueError("{} activations given for {} layers".format(len(self.activations), len(self.layers) - 1))
+        for activation in self.activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError("Unknown activation function \"{}\"".format(activation))
+
+        # every layer stores its (input nodes, output nodes) weight matrix followed by its (output nodes, 1) biases
+        self._layer_names = ["layer_{}".format(position) for position in range(1, len(self.layers))]
+        self._shapes = list(zip(self.layers[:-1], self.layers[1:]))
+        size = sum(number_inputs * number_outputs + number_outputs for number_inputs, number_outputs in self._shapes)
+
+        if parameters is not None:
+            if parameters.shape != (size,):
+                raise ValueError("parameters must be a flat array of {} values for layers {}".format(size, self.layers))
+            self.parameters = parameters
+            self.weights, self.bias = self._views(self.parameters)
+        else:
+            # initialize weight and bias matrices
+            initial_weights = [uniform(*weight_range, size=shape) for shape in self._shapes]
+            initial_bias = [uniform(*bias_range, size=(number_outputs, 1)) for _, number_outputs in self._shapes]
+
+            self.parameters = empty(size, dtype=dtype)
+            self.weights, self.bias = self._views(self.parameters)
+            for layer, weights, bias in zip(self._layer_names, initial_weights, initial_bias):
+                self.weights[layer][...] = weights
+                self.bias[layer][...] = bias
+
+        # mean gradients of the last batch, in the layout of the parameters
+        self.gradients = empty(size, dtype=self.parameters.dtype)
+        self._weight_gradients, self._bias_gradients = self._views(self.gradients)
+        self._step = empty(size, dtype=self.parameters.dtype)
+        self._buffers = dict()
+
+    def _views(self, flat):
+        """Method for dividing a flat array in the layout of the parameters into per layer weight and bias views.
+
+        :param flat: Flat array in the layout of :attr:`parameters`.
+        :type flat: :py:class:`~numpy.ndarray`
+        :return: Tuple of the dictionaries of weight and bias views, keyed "layer_1" to "layer_n".
+        :rtype: :py:class:`tuple`
+        """
+        weights = dict()
+        bias = dict()
+        offset = 0
+        for layer, (number_inputs, number_outputs) in zip(self._layer_names, self._shapes):
+            weights[layer] = flat[offset:offset + number_inputs * number_outputs].reshape(number_inputs, number_outputs)
+            offset += number_inputs * number_outputs
+            bias[layer] = flat[offset:offset + number_outputs].reshape(number_outputs, 1)
+            offset += number_outputs
+
+        return weights, bias
+
+    def _batch_buffers(self, batch_size):
+        """Method for retrieving the buffers used by training steps on batches of a given size.
+
+        :param int batch_size: Number of data points in the batch.
+        :return: Dictionary of the input, target, layer output, delta and derivative buffers.
+        :rtype: :py:class:`dict`
+        """
+        if batch_size not in self._buffers:
+            dtype = self.parameters.dtype
+            self._buffers[batch_size] = {
+                "inputs": empty((batch_size, self.layers[0]), dtype=dtype),
+                "targets": empty((self.layers[-1], batch_size), dtype=dtype),
+                "outputs": [empty((number_nodes, batch_size), dtype=dtype) for number_nodes in self.layers[1:]],
+                "deltas": [empty((number_nodes, batch_size), dtype=dtype) for number_nodes in self.layers[1:]],
+                "derivatives": [empty((number_nodes, batch_size), dtype=dtype) for number_nodes in self.layers[1:]],
+            }
+        return self._buffers[batch_size]
+
+    def _calculate(self, input_value, outputs=None, derivatives=None):
+        """Method for calculating the outputs of every layer for a batch of data points.
+
+        in = W.T dot a + b
         a = g(in)
-        :param input_value:
+
+        :param input_value: Two dimensional array with one data point per row.
         :type input_value: :py:class:`~numpy.ndarray`
+        :param outputs: Buffers receiving the outputs of each layer, new arrays are created when not provided.
+        :type outputs: :py:obj:`None` or :py:class:`list`
+        :param derivatives: Buffers receiving the activation derivatives of each layer, skipped when not provided.
+        :type derivatives: :py:obj:`None` or :py:class:`list`
+        :return: List of the outputs of each layer after the input layer, with one column per data point.
+        :rtype: :py:class:`list`
         """
-        outputs = dict()
-        outputs["layer_1"] = dot(self.weights["layer_1"], input_value.T) + self.bias["layer_1"]
-        outputs["sig_layer_1"] = mltools.sigmoid(outputs["layer_1"])
-        outputs["layer_2"] = self.weights["layer_2"].dot(outputs["sig_layer_1"]) + self.bias["layer_2"]
-        outputs["sig_layer_2"] = mltools.sigmoid(outputs["layer_2"])
-        outputs["layer_3"] = self.weights["layer_3"].dot(outputs["sig_layer_2"]) + self.bias["layer_3"]
-        outputs["sig_layer_3"] = mltools.sigmoid(outputs["layer_3"])
-        outputs["layer_4"] = self.weights["layer_4"].dot(outputs["sig_layer_3"]) + self.bias["layer_4"]
-        outputs["sig_layer_4"] = mltools.sigmoid(outputs["layer_4"])
+        if outputs is None:
+            outputs = [empty((number_nodes, len(input_value)), dtype=self.parameters.dtype)
+                       for number_nodes in self.layers[1:]]
+
+        if derivatives is None:
+            derivatives = [None] * len(outputs)
+
+        activation = input_value.T
+        for position, layer in enumerate(self._layer_names):
+            output = outputs[position]
+            dot(self.weights[layer].T, activation, out=output)
+            output += self.bias[layer]
+            ACTIVATIONS[self.activations[position]](output, derivatives[position])
+            activation = output
 
         return outputs
 
     def predict(self, input_value):
         """Method for predicting class label from trained model.
-        :param input_value:
+
+        :param input_value: Two dimensional array with one data point per row.
         :type input_value: :py:class:`~numpy.ndarray`
+        :return: Array of outputs with one column per data point.
+        :rtype: :py:class:`~numpy.ndarray`
         """
-        return self._calculate(input_value)["sig_layer_4"]
+        return self._calculate(asarray(input_value, dtype=self.parameters.dtype))[-1]
+
+    def predict_batch(self, data_values):
+        """Method for predicting the outputs of many data points at once, with one row per data point.
 
-    def train(self, iterations=25, verbose=False):
+        :param data_values: Two dimensional array with one data point per row.
+        :type data_values: :py:class:`~numpy.ndarray`
+        :return: Array of outputs with one row per data point, or one value per data point for a single output node.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        outputs = self.predict(data_values)
+        return outputs[0] if self.layers[-1] == 1 else outputs.T
+
+    def train(self, iterations=25, verbose=False, batch_size=1, shuffle=False, seed=None, n_jobs=None, hogwild=False,
+              callbacks=None):
         """Method to train Neural Network on a given dataset.
+
         Updates weight values according to:
+
             w.j = w.j + alpha * error * g'(in) * x.j
+
             where:
                 in = w.dot(x) + b
-                g'(in) = g(in)*(1-g(in))
                 error = actual - hypothesis
+
         Updates biases parameters according to:
-            b = b * alpha * error * g'(in)
+
+            b = b + alpha * error * g'(in)
+
+        Updates are averaged over mini-batches of data points, whose forward and backward passes run as matrix products
+        over the whole batch. A batch size of 1 updates the parameters after every data point.
+
+        With more than one job the data points are divided into one shard per worker process, and the parameters are
+        kept in shared memory. By default every update averages the gradients of one batch from every shard, which
+        gives the same parameters on every run with the same seed and number of jobs. With ``hogwild`` the workers
+        update the shared parameters as soon as their own batch is done, without waiting for each other or locking.
+
+        :param int iterations: Number of epochs.
+        :param bool verbose: Print the epoch number.
+        :param int batch_size: Number of data points per update, per worker when training with multiple jobs.
+        :param bool shuffle: Visit the data points in a new random order every epoch.
+        :param seed: Seed of the random order.
+        :type seed: :py:obj:`None` or :py:class:`int`
+        :param n_jobs: Number of worker processes, -1 uses every CPU. None or 1 trains in the calling process.
+        :type n_jobs: :py:obj:`None` or :py:class:`int`
+        :param bool hogwild: Apply the gradients of every worker without synchronization.
+        :param callbacks: Callbacks receiving training events. Workers of multiple jobs send no epoch or batch events.
+        :type callbacks: :py:obj:`None` or :py:class:`list`
+        """
+        hooks = CallbackList(callbacks)
+        hooks.on_train_begin(self)
+
+        X = asarray(self.X, dtype=self.parameters.dtype)
+        Y = asarray(self.Y, dtype=self.parameters.dtype).reshape(self.layers[-1], -1)
+
+        n_jobs = min(resolve_n_jobs(n_jobs), len(X))
+        if n_jobs > 1:
+            hooks.timers.mark()
+            self._train_parallel(X, Y, iterations, verbose, batch_size, shuffle, seed, n_jobs, hogwild)
+            hooks.timers.lap("parallel")
+        else:
+            self._train_serial(X, Y, iterations, verbose, batch_size, shuffle, seed, hooks)
+
+        hooks.on_train_end(self)
+
+    def _train_serial(self, X, Y, iterations, verbose, batch_size, shuffle, seed, hooks):
+        """Method for training in the calling process with the arguments of :meth:`train`.
+
+        :param hooks: Callbacks receiving training events.
+        :type hooks: :class:`~mltools.callbacks.CallbackList`
+        :return: None
         """
+        timers = hooks.timers
+        random_state = default_rng(seed)
+        order = arange(len(X))
+
         # perform iterative training
         for i in range(iterations):
 
             if verbose:
                 print("Epoch {}".format(i + 1))
 
-            # perform calculations for each data point
-            for count, data_point in enumerate(self.X):
-
-                # calculate node outputs for each layer
-                layer_outputs = self._calculate(array([data_point]))
-
-                # perform bias and weight updates
-                updates = dict()
-
-                # delta = (actual - hypothesis) * g'(in)
-                delta = (self.Y[0][count] - layer_outputs["sig_layer_4"]) * mltools.sigmoid(layer_outputs["layer_4"], True)
-                updates["l4b"] = self.bias["layer_4"] + self.alpha * delta
-                # change to sig_layer_(n-1)
-                updates["l4w"] = self.weights["layer_4"] + self.alpha * layer_outputs["sig_layer_3"] * delta
-
-                # delta = self.weights["layer_4"].dot(delta) * mltools.sigmoid(layer_outputs["layer_3"], True)
-                delta = delta.dot(self.weights["layer_4"]) * mltools.sigmoid(layer_outputs["layer_3"], True)
-                updates["l3b"] = self.bias["layer_3"] + self.alpha * delta
-                updates["l3w"] = self.weights["layer_3"] + self.alpha * delta.dot(layer_outputs["sig_layer_3"])
-
-                delta = delta.dot(self.weights["layer_3"]) * mltools.sigmoid(layer_outputs["layer_2"], True).T
-                updates["l2b"] = self.bias["layer_2"] + self.alpha * delta
-                updates["l2w"] = self.weights["layer_2"] + self.alpha * layer_outputs["sig_layer_2"] * delta
-
-                delta = self.weights["layer_2"].T.dot(delta) * mltools.sigmoid(layer_outputs["layer_1"], True)
-                updates["l1b"] = self.bias["layer_1"] + self.alpha * delta
-                updates["l1w"] = self.weights["layer_1"] + self.alpha * layer_outputs["sig_layer_1"] * delta
-
-                self.bias["layer_4"] = updates["l4b"]
-                self.weights["layer_4"] = updates["l4w"]
-                self.bias["layer_3"] = updates["l3b"]
-                self.weights["layer_3"] = updates["l3w"]
-                self.bias["layer_2"] = updates["l2b"]
-                self.weights["layer_2"] = updates["l2w"]
-                self.bias["layer_1"] = updates["l1b"]
-                self.weights["layer_1"] = updates["l1w"]
+            if shuffle:
+                order = random_state.permutation(len(X))
+
+            # perform calculations for each batch of data points
+            for batch, start in enumerate(range(0, len(order), batch_size)):
+                timers.mark()
+                buffers = self._load_batch(X, Y, order[start:start + batch_size])
+                timers.lap("load")
+                self._calculate(buffers["inputs"], buffers["outputs"], buffers["derivatives"])
+                timers.lap("forward")
+                self._backpropagate(buffers)
+                timers.lap("backward")
+                self._apply_gradients()
+                timers.lap("update")
+
+                if hooks:
+                    hooks.on_batch(self, batch, {
+                        "size": len(buffers["inputs"]),
+                        "loss": mean_squared_error(buffers["outputs"][-1], buffers["targets"]),
+                    })
+
+            if hooks:
+                hooks.on_epoch(self, i)
+
+    def _train_parallel(self, X, Y, iterations, verbose, batch_size, shuffle, seed, n_jobs, hogwild):
+        """Method for training on shards of the data points in a pool of worker processes.
+
+        The data points, the parameters, one gradient slot per worker and the batch sizes of the current step are
+        shared with the workers through shared memory. The trained parameters are copied back into
+        :attr:`parameters`.
+
+        :param X: Two dimensional array with one data point per row, in the type of the parameters.
+        :type X: :py:class:`~numpy.ndarray`
+        :param Y: Array of actual values with shape (output nodes, number of data points).
+        :type Y: :py:class:`~numpy.ndarray`
+        :param int n_jobs: Number of worker processes, at most the number of data points.
+        :return: None
+        """
+        # worker shards differ in size by at most one data point, every epoch takes the steps of the largest shard
+        bounds = [len(X) * rank // n_jobs for rank in range(n_jobs + 1)]
+        largest_shard = -(-len(X) // n_jobs)
+        steps_per_epoch = -(-largest_shard // batch_size)
+        config = {
+            "alpha": self.alpha, "layers": self.layers, "activations": self.activations, "iterations": iterations,
+            "verbose": verbose, "batch_size": batch_size, "shuffle": shuffle, "hogwild": hogwild,
+            "steps_per_epoch": steps_per_epoch,
+        }
+
+        shared = [
+            SharedArray.copy_of(X), SharedArray.copy_of(Y), SharedArray.copy_of(self.parameters),
+            SharedArray((n_jobs, len(self.parameters)), self.parameters.dtype), SharedArray((n_jobs,), int64),
+        ]
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=n_jobs, initializer=_initialize_worker,
+                    initargs=([array.spec for array in shared], Barrier(n_jobs), config)
+            ) as pool:
+                list(pool.map(_train_shard, range(n_jobs), bounds[:-1], bounds[1:], SeedSequence(seed).spawn(n_jobs)))
+
+            self.parameters[...] = shared[2].array
+        finally:
+            for array in shared:
+                array.close()
+
+    def _load_batch(self, X, Y, batch):
+        """Method for copying the data points of a batch into the buffers of its batch size.
+
+        :param batch: Indexes of the data points in the batch.
+        :type batch: :py:class:`~numpy.ndarray`
+        :return: Batch buffers from :meth:`_batch_buffers` holding the batch's inputs and targets.
+        :rtype: :py:class:`dict`
+        """
+        buffers = self._batch_buffers(len(batch))
+        take(X, batch, axis=0, out=buffers["inputs"])
+        take(Y, batch, axis=1, out=buffers["targets"])
+        return buffers
+
+    def _calculate_gradients(self, buffers):
+        """Method for calculating the mean gradients of a batch of data points into :attr:`gradients`.
+
+        Gradients point in the direction that reduces the error, so they are added to the parameters.
+
+        :param dict buffers: Batch buffers from :meth:`_batch_buffers` holding the batch's inputs and targets.
+        :return: None
+        """
+        # calculate node outputs and activation derivatives for each layer
+        self._calculate(buffers["inputs"], buffers["outputs"], buffers["derivatives"])
+        self._backpropagate(buffers)
+
+    def _backpropagate(self, buffers):
+        """Method for calculating the mean gradients of a batch from its layer outputs into :attr:`gradients`.
+
+        :param dict buffers: Batch buffers from :meth:`_batch_buffers` holding the batch's inputs, targets, layer
+                             outputs and activation derivatives.
+        :return: None
+        """
+        inputs = buffers["inputs"]
+        outputs = buffers["outputs"]
+        deltas = buffers["deltas"]
+        derivatives = buffers["derivatives"]
+
+        # delta = (actual - hypothesis) * g'(in)
+        subtract(buffers["targets"], outputs[-1], out=deltas[-1])
+        for position in range(len(self._layer_names) - 1, -1, -1):
+            layer = self._layer_names[position]
+            deltas[position] *= derivatives[position]
+
+            layer_input = outputs[position - 1] if position else inputs.T
+            dot(layer_input, deltas[position].T, out=self._weight_gradients[layer])
+            deltas[position].sum(axis=1, keepdims=True, out=self._bias_gradients[layer])
+
+            # deltas of every layer are calculated with the weights from before the update
+            if position:
+                dot(self.weights[layer], deltas[position], out=deltas[position - 1])
+
+        self.gradients /= len(inputs)
+
+    def _apply_gradients(self):
+        """Method for updating the weights and biases with the learning rate times :attr:`gradients`.
+
+        :return: None
+        """
+        multiply(self.gradients, self.alpha, out=self._step)
+        self.parameters += self._step
+
+
+_worker_state = dict()
+
+
+def _initialize_worker(specs, barrier, config):
+    """Method for building a network over the shared data points and parameters in a training worker process.
+
+    :param list specs: Shared array specs of the data points, the actual values, the parameters, the gradient slots and
+                       the batch sizes.
+    :param barrier: Barrier synchronizing the steps of every worker.
+    :param dict config: Training options of the network.
+    :return: None
+    """
+    memories = []
+    arrays = []
+    for spec in specs:
+        memory, array = attach_array(spec)
+        memories.append(memory)
+        arrays.append(array)
+    X, Y, parameters, gradient_slots, batch_sizes = arrays
+
+    _worker_state.update(
+        memories=memories, barrier=barrier, config=config, gradient_slots=gradient_slots, batch_sizes=batch_sizes,
+        network=NeuralNetwork(
+            X, Y, config["alpha"], layers=config["layers"], activations=config["activations"], parameters=parameters
+        ),
+    )
+
+
+def _train_shard(rank, start, stop, seed_sequence):
+    """Method for training on one shard of the data points in a worker process.
+
+    A failing worker breaks the barrier, so the other workers stop instead of waiting for it.
+
+    :param int rank: Position of the worker, from 0 to the number of workers - 1.
+    :param int start: Index of the first data point of the shard.
+    :param int stop: Index after the last data point of the shard.
+    :param seed_sequence: Seed of the worker's random order.
+    :type seed_sequence: :py:class:`~numpy.random.SeedSequence`
+    :return: None
+    """
+    config = _worker_state["config"]
+    network = _worker_state["network"]
+    random_state = default_rng(seed_sequence)
+    shard = arange(start, stop)
+
+    try:
+        if not config["hogwild"]:
+            # the worker's gradients are written straight into its slot, and it reduces one part of every slot
+            gradient_slots = _worker_state["gradient_slots"]
+            network.gradients = gradient_slots[rank]
+            network._weight_gradients, network._bias_gradients = network._views(network.gradients)
+
+            number_workers, size = gradient_slots.shape
+            part = slice(size * rank // number_workers, size * (rank + 1) // number_workers)
+            reduced = network._step[part]
+            scratch = empty(len(reduced), dtype=reduced.dtype)
+
+        for i in range(config["iterations"]):
+
+            if config["verbose"] and rank == 0:
+                print("Epoch {}".format(i + 1))
+
+            order = random_state.permutation(shard) if config["shuffle"] else shard
+            batch_size = config["batch_size"]
+            for step in range(config["steps_per_epoch"]):
+                batch = order[step * batch_size:(step + 1) * batch_size]
+                if len(batch):
+                    network._calculate_gradients(network._load_batch(network.X, network.Y, batch))
+
+                if config["hogwild"]:
+                    if len(batch):
+                        network._apply_gradients()
+                else:
+                    _worker_state["batch_sizes"][rank] = len(batch)
+                    _all_reduce(part, reduced, scratch)
+    except BaseException:
+        _worker_state["barrier"].abort()
+        raise
+
+
+def _all_reduce(part, reduced, scratch):
+    """Method for applying the average gradient of every worker's batch to the shared parameters.
+
+    Once every worker has written its gradients, each worker sums its own contiguous part of the gradient slots in
+    worker order and updates that part of the parameters, so the result does not depend on the timing of the workers.
+
+    :param slice part: Part of the parameters reduced by this worker.
+    :param reduced: Buffer receiving the update of the part.
+    :type reduced: :py:class:`~numpy.ndarray`
+    :param scratch: Buffer of the same size as reduced.
+    :type scratch: :py:class:`~numpy.ndarray`
+    :return: None
+    """
+    barrier = _worker_state["barrier"]
+    batch_sizes = _worker_state["batch_sizes"]
+    network = _worker_state["network"]
+
+    barrier.wait()
+    reduced.fill(0)
+    for slot, batch_size in zip(_worker_state["gradient_slots"], batch_sizes):
+        if batch_size:
+            # slots hold batch means, weighting them by batch size gives the mean over every batch of the step
+            multiply(slot[part], int(batch_size), out=scratch)
+            reduced += scratch
+    reduced *= network.alpha / int(batch_sizes.sum())
+    network.parameters[part] += reduced
+    barrier.wait()
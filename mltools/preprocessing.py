@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools.preprocessing
+~~~~~~~~~~~~~~~~~~~~~
+
+This module provides transformer classes for normalizing and discretizing feature values.
+
+Transformers learn their parameters (minimum and maximum values or bin edges) from data once with ``fit()`` and apply
+them to whole columns with ``transform()``, which never modifies its input. The learned parameters can be reused on
+held-out or streaming data without being recomputed.
+"""
+from numpy import arange, asarray, divide, empty, float64, fmax, fmin, min_scalar_type, nanmax, nanmin, nanquantile, \
+    searchsorted, subtract, unique
+
+
+def _as_columns(values):
+    """Method for viewing a one or two dimensional array as a matrix with one column per feature.
+
+    :param values: Array of feature values.
+    :type values: :py:class:`~numpy.ndarray`
+    :return: Two dimensional view of the array.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    return values.reshape(len(values), -1)
+
+
+class MinMaxNormalizer(object):
+    """Transformer scaling each feature column to the range [0, 1] of its training values.
+    """
+
+    def __init__(self):
+        """Initialization method for class MinMaxNormalizer.
+        """
+        self.minimum = None
+        self.maximum = None
+
+    def partial_fit(self, X):
+        """Method for updating the learned minimum and maximum values with a batch of data.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :return: The transformer.
+        :rtype: :class:`MinMaxNormalizer`
+        """
+        X = asarray(X, dtype=float64)
+        minimum = nanmin(X, axis=0)
+        maximum = nanmax(X, axis=0)
+
+        if self.minimum is None:
+            self.minimum, self.maximum = minimum, maximum
+        else:
+            self.minimum, self.maximum = fmin(self.minimum, minimum), fmax(self.maximum, maximum)
+
+        return self
+
+    def fit(self, X):
+        """Method for learning the minimum and maximum value of each feature.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :return: The transformer.
+        :rtype: :class:`MinMaxNormalizer`
+        """
+        self.minimum = None
+        return self.partial_fit(X)
+
+    def transform(self, X, out=None):
+        """Method for scaling feature values with the learned minimum and maximum values.
+
+        Features with a single training value are shifted to 0 instead of being scaled.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :param out: Floating point array receiving the result, may be X itself.
+        :type out: :py:obj:`None` or :py:class:`~numpy.ndarray`
+        :return: Array of normalized values.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        value_range = asarray(self.maximum - self.minimum, dtype=float64)
+        value_range[value_range == 0] = 1
+
+        out = subtract(asarray(X, dtype=float64), self.minimum, out=out)
+        return divide(out, value_range, out=out)
+
+    def fit_transform(self, X, out=None):
+        """Method for learning the minimum and maximum values and then scaling the feature values.
+
+        :return: Array of normalized values.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        return self.fit(X).transform(X, out=out)
+
+
+class _Discretizer(object):
+    """Base class for transformers replacing feature values with the index of the bin they fall in.
+
+    Subclasses learn the interior bin edges of each column in :attr:`bin_edges`, ``number_bins - 1`` edges give
+    ``number_bins`` bins.
+    """
+
+    def __init__(self, number_bins=2, right=False):
+        """Initialization method for discretizer classes.
+
+        :param int number_bins: Number of bins to divide each feature into.
+        :param bool right: Bins include their right edge instead of their left edge, see :func:`numpy.digitize`.
+        """
+        self.number_bins = number_bins
+        self.right = right
+        self.bin_edges = None
+
+    def fit(self, X):
+        """Method for learning the bin edges of each feature.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :return: The transformer.
+        """
+        self.bin_edges = [self._fit_edges(column) for column in _as_columns(asarray(X, dtype=float64)).T]
+        return self
+
+    def _fit_edges(self, column):
+        """Method for calculating the interior bin edges of a single feature.
+
+        :param column: Array of feature values.
+        :type column: :py:class:`~numpy.ndarray`
+        :return: Sorted array of bin edges.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        raise NotImplementedError
+
+    def transform(self, X, out=None):
+        """Method for replacing feature values with their bin index.
+
+        Values below the first or above the last edge fall in the first or last bin.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :param out: Contiguous array receiving the bin indexes, defaults to the smallest unsigned integer type that
+                    holds every bin index.
+        :type out: :py:obj:`None` or :py:class:`~numpy.ndarray`
+        :return: Array of bin indexes with the shape of X.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        X = asarray(X, dtype=float64)
+        if out is None:
+            largest_bin = max((len(edges) for edges in self.bin_edges), default=0)
+            out = empty(X.shape, dtype=min_scalar_type(largest_bin))
+
+        columns = _as_columns(X)
+        bins = _as_columns(out)
+        side = "left" if self.right else "right"
+        for column_index, edges in enumerate(self.bin_edges):
+            bins[:, column_index] = searchsorted(edges, columns[:, column_index], side=side)
+
+        return out
+
+    def fit_transform(self, X, out=None):
+        """Method for learning the bin edges and then replacing feature values with their bin index.
+
+        :return: Array of bin indexes with the shape of X.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        return self.fit(X).transform(X, out=out)
+
+
+class EquidistantDiscretizer(_Discretizer):
+    """Transformer dividing the training range of each feature into bins of equal width.
+    """
+
+    def __init__(self, number_bins=2, right=False):
+        """Initialization method for class EquidistantDiscretizer.
+
+        :param int number_bins: Number of bins to divide each feature into.
+        :param bool right: Bins include their right edge instead of their left edge, see :func:`numpy.digitize`.
+        """
+        super(EquidistantDiscretizer, self).__init__(number_bins, right)
+        self.normalizer = MinMaxNormalizer()
+
+    def partial_fit(self, X):
+        """Method for updating the bin edges with a batch of data, widening the range of each feature as needed.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :return: The transformer.
+        :rtype: :class:`EquidistantDiscretizer`
+        """
+        self.normalizer.partial_fit(X)
+        minimums = asarray(self.normalizer.minimum).reshape(-1)
+        maximums = asarray(self.normalizer.maximum).reshape(-1)
+        fractions = arange(1, self.number_bins) / self.number_bins
+        self.bin_edges = [minimum + (maximum - minimum) * fractions for minimum, maximum in zip(minimums, maximums)]
+        return self
+
+    def fit(self, X):
+        """Method for learning the bin edges of each feature.
+
+        :param X: One or two dimensional array of feature values, with one feature per column.
+        :type X: :py:class:`~numpy.ndarray`
+        :return: The transformer.
+        :rtype: :class:`EquidistantDiscretizer`
+        """
+        self.normalizer = MinMaxNormalizer()
+        return self.partial_fit(X)
+
+
+class EquidensityDiscretizer(_Discretizer):
+    """Transformer dividing each feature into bins holding equal numbers of training values.
+
+    Bin edges are the quantiles of the training values, repeated quantiles are merged so heavily repeated values can
+    give fewer bins than requested.
+    """
+
+    def _fit_edges(self, column):
+        """Method for calculating the quantile bin edges of a single feature.
+
+        :param column: Array of feature values.
+        :type column: :py:class:`~numpy.ndarray`
+        :return: Sorted array of unique bin edges.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        return unique(nanquantile(column, arange(1, self.number_bins) / self.number_bins))
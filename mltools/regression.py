@@ -1,4 +1,185 @@
-from numpy import sum
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools.regression
+~~~~~~~~~~~~~~~~~~
+
+This module provides a class for training linear regression models.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from time import perf_counter
+from warnings import warn
+
+from numpy import arange, argsort, array_split, asarray, concatenate, divide, einsum, empty, exp, eye, finfo, float64, \
+    floating, issubdtype, mean, ravel, sqrt, sum, vstack, zeros, zeros_like
+from numpy.linalg import LinAlgError, cholesky, cond, lstsq, norm, qr, solve, svd
+from numpy.random import default_rng
+
+from ._shared import SharedArray, attach_array, resolve_n_jobs
+from .callbacks import NULL_TIMERS, CallbackList
+from ._sparse import attach_matrix, issparse, lsqr, share_matrix
+
+# training types solving the least squares problem directly instead of running gradient descent
+DIRECT_TRAINING_TYPES = ("normal", "qr", "cholesky", "lstsq")
+
+# largest condition number of the solved system for which a direct solve is trusted in float64, scaled by the machine
+# epsilon for other floating point types
+_MAX_CONDITION = 1e12
+
+# number of optimizer steps between printed losses
+_LOG_INTERVAL = 100
+
+# added to the denominator of Adam updates to avoid division by zero
+_ADAM_EPSILON = 1e-8
+
+# shared dataset of a cross validation worker process, set by _initialize_worker()
+_worker_state = dict()
+
+
+def _float_type(array):
+    """Method for choosing the floating point type of calculations on an array.
+
+    :return: The type of the array when it is a floating point type, float64 otherwise.
+    :rtype: :py:class:`~numpy.dtype`
+    """
+    return array.dtype if issubdtype(array.dtype, floating) else float64
+
+
+def _condition_limit(dtype):
+    """Method for calculating the largest condition number of a direct solve trusted for a floating point type.
+
+    :rtype: :py:class:`float`
+    """
+    return _MAX_CONDITION * finfo(float64).eps / finfo(dtype).eps
+
+
+def iter_batches(X, Y, batch_size=32, shuffle=False, seed=None):
+    """Method for iterating over a dataset in mini-batches of consecutive data points.
+
+    Batches are slices of X and Y, so memory-mapped arrays are read one batch at a time.
+
+    :param X: Two dimensional array of feature values.
+    :type X: :py:class:`~numpy.ndarray`
+    :param Y: Array of target values, with shape (1, number of points) or (number of points,).
+    :type Y: :py:class:`~numpy.ndarray`
+    :param int batch_size: Number of data points per batch.
+    :param bool shuffle: Visit the batches in random order, the points within a batch stay consecutive.
+    :param seed: Seed of the random batch order.
+    :type seed: :py:obj:`None` or :py:class:`int`
+    :return: Generator of feature and target value batches.
+    :rtype: :py:class:`generator`
+    """
+    y = Y.reshape(-1)
+    starts = arange(0, len(y), batch_size)
+    if shuffle:
+        default_rng(seed).shuffle(starts)
+
+    for start in starts:
+        yield X[start:start + batch_size], y[start:start + batch_size]
+
+
+def cross_validate_path(X, Y, lams, alphas=(0.0005,), folds=5, training_type="lstsq", iterations=10000, tol=None,
+                        n_jobs=None, seed=None):
+    """Method for scoring a grid of regularization strengths and learning rates with k-fold cross validation.
+
+    Every fold and learning rate fits a warm-started :meth:`Regression.regularization_path` over all lams, so each task
+    of the process pool covers a whole path. X and Y are shared with the workers through shared memory instead of
+    being pickled for every task.
+
+    :param X: Two dimensional array or CSR/CSC sparse matrix of feature values.
+    :type X: :py:class:`~numpy.ndarray` or :py:class:`~scipy.sparse.spmatrix`
+    :param Y: Array of target values, with shape (1, number of points) or (number of points,).
+    :type Y: :py:class:`~numpy.ndarray`
+    :param lams: Sequence of L2 regularization strengths.
+    :param alphas: Sequence of learning rates, only used by gradient descent training types. Direct training types
+                   fit one path per fold, whose scores are returned for every alpha.
+    :param int folds: Number of cross validation folds.
+    :param str training_type: Training type of the regularization paths, see :meth:`Regression.regularization_path`.
+    :param int iterations: Maximum number of gradient descent iterations per lam.
+    :param tol: Convergence tolerance of gradient descent.
+    :type tol: :py:obj:`None` or :py:class:`float`
+    :param n_jobs: Number of worker processes, -1 uses every CPU.
+    :type n_jobs: :py:obj:`None` or :py:class:`int`
+    :param seed: Seed of the random assignment of data points to folds.
+    :type seed: :py:obj:`None` or :py:class:`int`
+    :return: Array of mean validation mean squared errors, one row per alpha and one column per lam.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    X = X.tocsr() if issparse(X) else asarray(X)
+    X = X.astype(_float_type(X), copy=False)
+    y = asarray(Y, dtype=X.dtype).reshape(-1)
+    alphas = tuple(alphas)
+    # direct solves do not depend on the learning rate, so the paths of the first alpha score every alpha
+    fitted_alphas = alphas[:1] if training_type in DIRECT_TRAINING_TYPES else alphas
+    order = default_rng(seed).permutation(len(y))
+    tasks = [
+        (fold, folds, alpha, lams, training_type, iterations, tol) for alpha in fitted_alphas for fold in range(folds)
+    ]
+
+    n_jobs = min(resolve_n_jobs(n_jobs), len(tasks))
+    if n_jobs == 1:
+        scores = [_fold_scores(X, y, order, *task) for task in tasks]
+    else:
+        shared_X, X_spec = share_matrix(X)
+        try:
+            with SharedArray.copy_of(y) as shared_y, SharedArray.copy_of(order) as shared_order, ProcessPoolExecutor(
+                    max_workers=n_jobs, initializer=_initialize_worker,
+                    initargs=(X_spec, shared_y.spec, shared_order.spec)
+            ) as pool:
+                scores = list(pool.map(_score_fold, tasks))
+        finally:
+            for shared in shared_X:
+                shared.close()
+
+    scores = mean(asarray(scores).reshape(len(fitted_alphas), folds, -1), axis=1)
+    if len(fitted_alphas) < len(alphas):
+        scores = scores.repeat(len(alphas), axis=0)
+    return scores
+
+
+def _initialize_worker(X_spec, y_spec, order_spec):
+    """Method for mapping the shared dataset in a cross validation worker process.
+
+    :param tuple X_spec: Shared matrix spec of the feature values, see :func:`~mltools._sparse.share_matrix`.
+    :param tuple y_spec: Shared array spec of the target values.
+    :param tuple order_spec: Shared array spec of the permutation assigning data points to folds.
+    :return: None
+    """
+    memories, _worker_state["X"] = attach_matrix(X_spec)
+    for name, spec in (("y", y_spec), ("order", order_spec)):
+        memory, _worker_state[name] = attach_array(spec)
+        memories.append(memory)
+    _worker_state["memories"] = memories
+
+
+def _score_fold(task):
+    """Method for scoring a regularization path on one fold in a cross validation worker process.
+
+    :param tuple task: Arguments of :func:`_fold_scores` after the shared arrays.
+    :return: Array of validation mean squared errors, one per lam.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    return _fold_scores(_worker_state["X"], _worker_state["y"], _worker_state["order"], *task)
+
+
+def _fold_scores(X, y, order, fold, folds, alpha, lams, training_type, iterations, tol):
+    """Method for fitting a regularization path on all but one fold and scoring it on the held-out fold.
+
+    :param int fold: Index of the held-out fold.
+    :param int folds: Number of folds.
+    :return: Array of validation mean squared errors, one per lam.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    fold_indices = array_split(order, folds)
+    validation = fold_indices[fold]
+    training = concatenate(fold_indices[:fold] + fold_indices[fold + 1:])
+
+    model = Regression(X[training], y[training], alpha=alpha)
+    path = model.regularization_path(lams, training_type, iterations, tol)
+
+    residuals = X[validation].dot(path.T) - y[validation, None]
+    return mean(residuals ** 2, axis=0)
 
 
 class Regression(object):
@@ -6,40 +187,298 @@ class Regression(object):
 
     """
 
-    def __init__(self, X, Y, thetas=None, alpha=0.0005, lam=None):
+    def __init__(self, X, Y, thetas=None, alpha=0.0005, lam=None, batch_size=32, optimizer="sgd", momentum=0.0,
+                 schedule="constant", decay=0.0, betas=(0.9, 0.999), dtype=None):
         """Initialization method for Regression class.
 
+        Calculations run in the floating point type of X, losses are accumulated in float64.
+
+        :param float alpha: Learning rate, the initial learning rate of mini-batch training.
+        :param lam: L2 regularization strength.
+        :type lam: :py:obj:`None` or :py:class:`float`
+        :param int batch_size: Number of data points per mini-batch of "sgd" training.
+        :param str optimizer: Mini-batch optimizer, "sgd" (with optional momentum) or "adam".
+        :param float momentum: Momentum of the "sgd" optimizer, 0 disables momentum.
+        :param schedule: Learning rate schedule, "constant", "inverse" (alpha / (1 + decay t)), "exponential"
+                         (alpha e^(-decay t)) or a function of the step number t returning the learning rate.
+        :type schedule: :py:class:`str` or :py:class:`callable`
+        :param float decay: Decay rate of the learning rate schedule.
+        :param tuple betas: Exponential decay rates of the first and second moment estimates of the "adam" optimizer.
+        :param dtype: Floating point type X, Y and thetas are converted to, such as float32 to halve memory traffic.
+        :type dtype: :py:obj:`None` or :py:class:`~numpy.dtype`
         """
+        if dtype is not None:
+            X = X.astype(dtype, copy=False)
+            Y = asarray(Y, dtype=dtype)
+            thetas = None if thetas is None else asarray(thetas, dtype=dtype)
+
         self.X = X
         self.Y = Y
         self.thetas = thetas
         self.alpha = alpha
         self.lam = lam
+        self.batch_size = batch_size
+        self.optimizer = optimizer
+        self.momentum = momentum
+        self.schedule = schedule
+        self.decay = decay
+        self.betas = betas
+
+        # loss and elapsed wall time of every iteration of the last training run
+        self.history = {"loss": [], "time": []}
+        self._history_start = None
 
-    def train(self, training_type="linear", iterations=10000, verbose=False):
+        # mini-batch optimizer state
+        self._steps = 0
+        self._velocity = None
+        self._moments = None
+
+    def train(self, training_type="linear", iterations=10000, verbose=False, tol=None, stop_on="loss", callbacks=None):
         """Method for training the model on the self provided dataset for i iterations.
 
+        Training types "linear" and "regularized" run gradient descent for the given number of iterations, or until
+        converged when tol is set. Training types "normal", "qr", "cholesky" and "lstsq" solve the least squares
+        problem, L2 regularized when lam is set, exactly in a single step. Direct solves of ill-conditioned problems
+        fall back to gradient descent with a warning. Training type "sgd" runs the given number of mini-batch
+        optimizer steps, cycling through the dataset in order.
+
+        The loss and the elapsed wall time of every iteration or step are recorded in :attr:`history`.
+
+        :param str training_type: "linear", "regularized", "normal", "qr", "cholesky", "lstsq" or "sgd".
+        :param int iterations: Maximum number of gradient descent iterations or number of mini-batch steps.
+        :param bool verbose: Print the mean squared error during training.
+        :param tol: Convergence tolerance of gradient descent, None always runs every iteration.
+        :type tol: :py:obj:`None` or :py:class:`float`
+        :param str stop_on: Stop gradient descent once the relative change of the loss ("loss") or the norm of the
+                            gradient ("gradient") falls to tol.
+        :param callbacks: Callbacks receiving training events, every gradient descent iteration is an epoch.
+        :type callbacks: :py:obj:`None` or :py:class:`list`
+        :return: None
+        :raises ValueError: When training type "sgd" is used on a dataset without data points.
         """
-        for i, _ in enumerate(range(iterations)):
+        hooks = CallbackList(callbacks)
+        hooks.on_train_begin(self)
+        self._train(training_type, iterations, verbose, tol, stop_on, hooks)
+        hooks.on_train_end(self, {"loss": self.history["loss"][-1]} if self.history["loss"] else None)
 
-            # standard linear regression
-            if training_type == "linear":
-                self.thetas = self._linear_train()
-                mse = self.mean_squared_error()
+    def _train(self, training_type, iterations, verbose, tol, stop_on, hooks):
+        """Method for training the model with the arguments of :meth:`train`, dispatching events to hooks.
 
-                if verbose and (i + 1) % 100 == 0:
-                    print("MSE at {:>7}: {}".format(i + 1, mse))
+        :param hooks: Callbacks receiving training events.
+        :type hooks: :class:`~mltools.callbacks.CallbackList`
+        :return: None
+        """
+        timers = hooks.timers
+        self._reset_history()
+        if self.thetas is None:
+            self.thetas = zeros(self.X.shape[1], dtype=_float_type(self.X))
 
-            # L2 regularized linear regression
-            elif training_type == "regularized":
-                self.thetas = self._regularized_linear_train()
-                mse = self.reg_mean_squared_error()
+        if training_type in DIRECT_TRAINING_TYPES:
+            timers.mark()
+            thetas = self._direct_train(training_type)
+            timers.lap("solve")
+            if thetas is not None:
+                self.thetas = thetas
+                self._record(self._loss_gradient(self.X, ravel(self.Y), self.lam)[1])
+                if verbose:
+                    print("MSE: {}".format(self.mean_squared_error()))
+                return
 
-                if verbose and (i+1) % 100 == 0:
-                    print("MSE at {:>7}: {}".format(i+1, mse))
+            training_type = "regularized" if self.lam else "linear"
+            warn(
+                "least squares problem is too ill-conditioned for a direct solve, falling back to {} gradient "
+                "descent".format(training_type), RuntimeWarning
+            )
 
-            else:
-                print("Unknown training type \"{}\"".format(training_type))
+        elif training_type == "sgd":
+            # every epoch of an empty dataset is empty, so cycling through them would never yield a batch
+            if not self.X.shape[0]:
+                raise ValueError("Cannot train with training type \"sgd\" on a dataset without data points")
+            epochs = (iter_batches(self.X, self.Y, self.batch_size) for _ in repeat(None))
+            self._fit_batches(islice(chain.from_iterable(epochs), iterations), 1, verbose, hooks)
+            return
+
+        # standard linear regression, or L2 regularized linear regression
+        if training_type not in ("linear", "regularized"):
+            print("Unknown training type \"{}\"".format(training_type))
+            return
+        lam = self.lam if training_type == "regularized" else None
+        y = ravel(self.Y)
+
+        # compensated summation of the updates, near the minimum the updates fall below the precision of float32
+        # thetas and would otherwise be rounded away, stalling gradient descent short of the minimum
+        compensation = zeros_like(self.thetas)
+        previous_loss = None
+        for i in range(iterations):
+            timers.mark()
+            gradient, loss = self._loss_gradient(self.X, y, lam)
+            timers.lap("gradient")
+            step = -self.alpha * gradient - compensation
+            thetas = self.thetas + step
+            compensation = (thetas - self.thetas) - step
+            self.thetas = thetas
+            timers.lap("update")
+            self._record(loss)
+
+            if hooks:
+                hooks.on_epoch(self, i, {"loss": loss})
+
+            if verbose and (i + 1) % _LOG_INTERVAL == 0:
+                print("MSE at {:>7}: {}".format(i + 1, loss))
+
+            if tol is not None:
+                if stop_on == "gradient":
+                    if norm(gradient) <= tol:
+                        break
+                elif stop_on == "loss":
+                    if previous_loss is not None and abs(previous_loss - loss) <= tol * previous_loss:
+                        break
+                    previous_loss = loss
+                else:
+                    raise ValueError("Unknown stopping criterion \"{}\"".format(stop_on))
+
+    def regularization_path(self, lams, training_type="lstsq", iterations=10000, tol=None):
+        """Method for fitting the model for a sequence of L2 regularization strengths.
+
+        The strengths are fit from largest to smallest. Direct training types factor X once with a singular value
+        decomposition and solve every strength from it, or solve sparse X with LSQR for every strength. Other
+        training types ("regularized" or "sgd") start each fit from the thetas of the previous, larger strength.
+        Afterwards the model holds the smallest strength and its thetas.
+
+        :param lams: Sequence of L2 regularization strengths.
+        :param str training_type: "normal", "qr", "cholesky", "lstsq", "regularized" or "sgd".
+        :param int iterations: Maximum number of gradient descent iterations or number of mini-batch steps per lam.
+        :param tol: Convergence tolerance of gradient descent.
+        :type tol: :py:obj:`None` or :py:class:`float`
+        :return: Array of thetas, one row per lam in the given order.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        lams = asarray(lams, dtype=float64)
+        order = argsort(-lams, kind="stable")
+        path = empty((len(lams), self.X.shape[1]), dtype=_float_type(self.X))
+
+        if training_type in DIRECT_TRAINING_TYPES and not issparse(self.X):
+            u, singular_values, vt = svd(self.X, full_matrices=False)
+            projected = u.T.dot(ravel(self.Y))
+            # singular values this small are treated as zero by unregularized solves, like lstsq
+            cutoff = singular_values.max(initial=0) * max(self.X.shape) * finfo(singular_values.dtype).eps
+
+            for index in order:
+                ridge = self.X.shape[0] * float(lams[index])
+                if ridge:
+                    factors = singular_values / (singular_values ** 2 + ridge)
+                else:
+                    factors = zeros_like(singular_values)
+                    divide(1, singular_values, out=factors, where=singular_values > cutoff)
+                path[index] = vt.T.dot(factors * projected)
+
+        else:
+            for index in order:
+                self.lam = float(lams[index])
+                self.train(training_type, iterations, tol=tol)
+                path[index] = self.thetas
+
+        if len(lams):
+            self.lam = float(lams[order[-1]])
+            self.thetas = path[order[-1]].copy()
+        return path
+
+    def partial_fit(self, X, Y):
+        """Method for updating the model with a single mini-batch optimizer step.
+
+        The optimizer state (step number, momentum velocity and Adam moments) carries over between calls, so batches
+        can be streamed from data that never fits in memory at once.
+
+        :param X: Two dimensional array of feature values of the batch.
+        :type X: :py:class:`~numpy.ndarray`
+        :param Y: Array of target values of the batch, with shape (1, batch size) or (batch size,).
+        :type Y: :py:class:`~numpy.ndarray`
+        :return: Loss of the batch before the update, computed from the same residuals as the gradient.
+        :rtype: :py:class:`float`
+        """
+        return self._step(X, Y, NULL_TIMERS)
+
+    def _step(self, X, Y, timers):
+        """Method for taking a single mini-batch optimizer step, timing its phases.
+
+        :param timers: Phase timers, the time since their last mark or lap is added to the "gradient" phase.
+        :return: Loss of the batch before the update.
+        :rtype: :py:class:`float`
+        """
+        if self.thetas is None:
+            self.thetas = zeros(X.shape[1], dtype=_float_type(X))
+
+        gradient, loss = self._loss_gradient(X, ravel(Y), self.lam)
+        timers.lap("gradient")
+        self._update(gradient)
+        timers.lap("update")
+        return loss
+
+    def fit_batches(self, batches, epochs=1, verbose=False, callbacks=None):
+        """Method for training the model on a stream of mini-batches.
+
+        :param batches: Iterable of (X, Y) batches, such as :func:`iter_batches` or :func:`~mltools.fileio.iter_csv`,
+                        or a function returning a new iterable for every epoch. A plain generator is consumed by the
+                        first epoch.
+        :type batches: :py:class:`iterable` or :py:class:`callable`
+        :param int epochs: Number of passes over the batches.
+        :param bool verbose: Print the mean loss of the last batches every 100 steps.
+        :param callbacks: Callbacks receiving training events, time spent reading batches is the "load" phase.
+        :type callbacks: :py:obj:`None` or :py:class:`list`
+        :return: None
+        """
+        hooks = CallbackList(callbacks)
+        hooks.on_train_begin(self)
+        self._fit_batches(batches, epochs, verbose, hooks)
+        hooks.on_train_end(self, {"loss": self.history["loss"][-1]} if self.history["loss"] else None)
+
+    def _fit_batches(self, batches, epochs, verbose, hooks):
+        """Method for training the model on a stream of mini-batches with the arguments of :meth:`fit_batches`.
+
+        :param hooks: Callbacks receiving training events.
+        :type hooks: :class:`~mltools.callbacks.CallbackList`
+        :return: None
+        """
+        timers = hooks.timers
+        self._reset_history()
+        for epoch in range(epochs):
+            total_loss = 0.0
+            number_losses = 0
+            epoch_loss = 0.0
+            number_batches = 0
+            timers.mark()
+            for X, Y in batches() if callable(batches) else batches:
+                timers.lap("load")
+                loss = self._step(X, Y, timers)
+                self._record(loss)
+                epoch_loss += loss
+                number_batches += 1
+
+                if hooks:
+                    hooks.on_batch(self, number_batches - 1, {"size": X.shape[0], "loss": loss})
+
+                if verbose:
+                    total_loss += loss
+                    number_losses += 1
+                    if self._steps % _LOG_INTERVAL == 0:
+                        print("Loss at {:>7}: {}".format(self._steps, total_loss / number_losses))
+                        total_loss = 0.0
+                        number_losses = 0
+                timers.mark()
+
+            if hooks:
+                hooks.on_epoch(self, epoch, {"loss": epoch_loss / number_batches if number_batches else None})
+
+    def predict_batch(self, data_values):
+        """Method for predicting the values of many data points at once.
+
+        :param data_values: Two dimensional array or sparse matrix with one data point per row.
+        :return: Array of predicted values with one value per data point.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        if not issparse(data_values):
+            data_values = asarray(data_values, dtype=self.thetas.dtype)
+        return data_values.dot(self.thetas)
 
     def mean_squared_error(self):
         """Method for calculating the mean squared error of the function.
@@ -52,23 +491,169 @@ class Regression(object):
             thetas = [[0, 0]],
 
         """
-        return 1/self.X.shape[0] * sum((self.X.dot(self.thetas) - self.Y)**2)
+        return 1/self.X.shape[0] * sum((self.X.dot(self.thetas) - self.Y)**2, dtype=float64)
 
     def reg_mean_squared_error(self):
         """Method for calculating the L2 regularized mean squared error of the function.
 
         """
-        return 1/self.X.shape[0] * sum((self.X.dot(self.thetas) - self.Y)**2) + self.lam * sum(self.thetas)
+        return 1/self.X.shape[0] * sum((self.X.dot(self.thetas) - self.Y)**2, dtype=float64) + \
+            self.lam * sum(self.thetas**2, dtype=float64)
 
-    def _linear_train(self):
-        """Method for training model based on linear regression.
+    def _direct_train(self, training_type):
+        """Method for solving the, optionally L2 regularized, least squares problem directly.
 
+        Solves (X^T X + m lam I) thetas = X^T y, the minimum of the regularized mean squared error, where m is the
+        number of data points. The "qr" and "lstsq" solvers work on X stacked on sqrt(m lam) I instead of forming X^T X.
+        Every training type solves sparse X iteratively with LSQR, which only multiplies by X and X^T.
+
+        :param str training_type: "normal", "qr", "cholesky" or "lstsq".
+        :return: Solved thetas, or None when the system is too ill-conditioned to be solved directly.
+        :rtype: :py:obj:`None` or :py:class:`~numpy.ndarray`
         """
-        # return self.thetas - self.alpha * 1 / self.X.shape[0] * sum((self.thetas * self.X - self.Y) * self.X, axis=0)
-        return self.thetas - self.alpha * 1/self.X.shape[0] * sum((self.X.dot(self.thetas) - self.Y).dot(self.X), axis=0)
+        X = self.X
+        y = ravel(self.Y)
+        number_points, number_features = X.shape
+        ridge = number_points * self.lam if self.lam else 0
+
+        if issparse(X):
+            return self._sparse_solve(ridge, self.thetas)
+
+        if training_type in ("qr", "lstsq"):
+            if ridge:
+                X = vstack((X, float(sqrt(ridge)) * eye(number_features, dtype=X.dtype)))
+                y = concatenate((y, zeros(number_features, dtype=y.dtype)))
 
-    def _regularized_linear_train(self):
-        """Method for training model based on linear regression with L2 regularization.
+            if training_type == "lstsq":
+                return lstsq(X, y, rcond=None)[0]
 
+            q, r = qr(X)
+            if cond(r) > _condition_limit(r.dtype):
+                return None
+            return solve(r, q.T.dot(y))
+
+        gram = X.T.dot(X)
+        gram.flat[::number_features + 1] += ridge
+        if cond(gram) > _condition_limit(gram.dtype):
+            return None
+
+        if training_type == "normal":
+            return solve(gram, X.T.dot(y))
+
+        try:
+            lower = cholesky(gram)
+        except LinAlgError:
+            return None
+        return solve(lower.T, solve(lower, X.T.dot(y)))
+
+    def _sparse_solve(self, ridge, thetas=None):
+        """Method for solving the L2 regularized least squares problem of a sparse X with LSQR.
+
+        :param float ridge: Number of data points times the L2 regularization strength.
+        :param thetas: Starting thetas of the iterations.
+        :type thetas: :py:obj:`None` or :py:class:`~numpy.ndarray`
+        :return: Solved thetas, or None when the system is too ill-conditioned or LSQR did not converge.
+        :rtype: :py:obj:`None` or :py:class:`~numpy.ndarray`
+        """
+        # LSQR damps the step away from its starting point, so only unregularized solves can be warm-started
+        result = lsqr(self.X, ravel(self.Y), damp=sqrt(ridge), atol=1e-12, btol=1e-12, x0=None if ridge else thetas)
+        thetas, stop_reason, condition = result[0].astype(_float_type(self.X), copy=False), result[1], result[6]
+        if stop_reason == 7 or condition > _condition_limit(thetas.dtype):
+            return None
+        return thetas
+
+    def _loss_gradient(self, X, y, lam=None):
+        """Method for calculating the loss and its gradient from a single residual pass.
+
+        The loss is the mean squared error plus lam times the squared norm of thetas, the returned gradient is half of
+        its gradient.
+
+        :param X: Two dimensional array of feature values.
+        :type X: :py:class:`~numpy.ndarray`
+        :param y: One dimensional array of target values.
+        :type y: :py:class:`~numpy.ndarray`
+        :param lam: L2 regularization strength.
+        :type lam: :py:obj:`None` or :py:class:`float`
+        :return: Tuple of the gradient and the loss, both at the current thetas.
+        :rtype: :py:class:`tuple`
+        """
+        residual = X.dot(self.thetas) - y
+        # X^T r rather than r X, so sparse X is multiplied over its non-zero entries only
+        gradient = X.T.dot(residual) / len(y)
+        loss = einsum("i,i->", residual, residual, dtype=float64) / len(y)
+
+        if lam:
+            gradient += lam * self.thetas
+            loss += lam * einsum("i,i->", self.thetas, self.thetas, dtype=float64)
+
+        return gradient, loss
+
+    def _reset_history(self):
+        """Method for starting a new training history.
+
+        :return: None
         """
-        return self.thetas - self.alpha * 1 / self.X.shape[0] * sum((self.X.dot(self.thetas) - self.Y).dot(self.X), axis=0) + self.lam * self.thetas
\ No newline at end of file
+        self.history = {"loss": [], "time": []}
+        self._history_start = perf_counter()
+
+    def _record(self, loss):
+        """Method for appending the loss of an iteration and the elapsed wall time to the training history.
+
+        :param float loss: Loss of the iteration.
+        :return: None
+        """
+        self.history["loss"].append(float(loss))
+        self.history["time"].append(perf_counter() - self._history_start)
+
+    def _learning_rate(self):
+        """Method for calculating the learning rate of the current mini-batch step.
+
+        :return: Learning rate.
+        :rtype: :py:class:`float`
+        """
+        if callable(self.schedule):
+            return self.schedule(self._steps)
+        elif self.schedule == "constant":
+            return self.alpha
+        elif self.schedule == "inverse":
+            return self.alpha / (1 + self.decay * self._steps)
+        elif self.schedule == "exponential":
+            return self.alpha * float(exp(-self.decay * self._steps))
+        raise ValueError("Unknown learning rate schedule \"{}\"".format(self.schedule))
+
+    def _update(self, gradient):
+        """Method for updating thetas with a mini-batch gradient.
+
+        :param gradient: Gradient of the loss with respect to thetas.
+        :type gradient: :py:class:`~numpy.ndarray`
+        :return: None
+        """
+        rate = self._learning_rate()
+        self._steps += 1
+
+        if self.optimizer == "adam":
+            if self._moments is None:
+                self._moments = (zeros(len(gradient), dtype=gradient.dtype), zeros(len(gradient), dtype=gradient.dtype))
+            beta_1, beta_2 = self.betas
+            first, second = self._moments
+            first *= beta_1
+            first += (1 - beta_1) * gradient
+            second *= beta_2
+            second += (1 - beta_2) * gradient ** 2
+
+            first_corrected = first / (1 - beta_1 ** self._steps)
+            second_corrected = second / (1 - beta_2 ** self._steps)
+            self.thetas = self.thetas - rate * first_corrected / (sqrt(second_corrected) + _ADAM_EPSILON)
+
+        elif self.optimizer == "sgd":
+            if self.momentum:
+                if self._velocity is None:
+                    self._velocity = zeros(len(gradient), dtype=gradient.dtype)
+                self._velocity *= self.momentum
+                self._velocity -= rate * gradient
+                self.thetas = self.thetas + self._velocity
+            else:
+                self.thetas = self.thetas - rate * gradient
+
+        else:
+            raise ValueError("Unknown optimizer \"{}\"".format(self.optimizer))
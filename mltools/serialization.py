@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools.serialization
+~~~~~~~~~~~~~~~~~~~~~
+
+This module provides functions for saving trained models to a compact binary file and loading them back.
+
+Model files store only the parameters of a model: the flat arrays of a compiled decision tree, the thetas of a
+regression model or the flat parameters of a neural network, and never the training data. Loading memory-maps the file,
+so worker processes loading the same model share one copy of its parameters in the page cache and start without
+reading the whole file.
+"""
+from importlib import import_module
+from json import dumps, loads
+from os import path, remove, replace
+from struct import Struct
+from tempfile import mkstemp
+
+from numpy import dtype as numpy_dtype, fromfile, memmap, uint8
+
+from .neuralnetwork import NeuralNetwork
+from .regression import Regression
+from .tree import CompiledTree, Node
+
+# model file layout: magic, format version and header length, followed by a JSON header padded to a multiple of
+# _MODEL_ALIGNMENT bytes and the arrays of the model, each starting on a multiple of _MODEL_ALIGNMENT bytes
+_MODEL_MAGIC = b"MLTMODEL"
+_MODEL_VERSION = 1
+_MODEL_PREFIX = Struct("<8sII")
+_MODEL_ALIGNMENT = 64
+
+_TREE_ARRAYS = ("feature", "child_offset", "label", "threshold", "is_threshold", "children")
+_NETWORK_MODULES = ("mltools.neuralnetwork", "mltools.neuralnetwork2")
+
+
+def _align(offset):
+    """Method for rounding an offset up to the next multiple of the array alignment.
+
+    :param int offset: Offset in bytes.
+    :rtype: :py:class:`int`
+    """
+    return -(-offset // _MODEL_ALIGNMENT) * _MODEL_ALIGNMENT
+
+
+def _plain_values(values):
+    """Method for converting class labels or feature values into values stored in the JSON header.
+
+    :param values: Class labels or feature values.
+    :return: List of strings, numbers, booleans and None.
+    :rtype: :py:class:`list`
+    """
+    plain = list()
+    for value in values:
+        value = value.item() if hasattr(value, "item") else value
+        if value is not None and not isinstance(value, (str, int, float, bool)):
+            raise TypeError("Cannot save value {!r}, labels and feature values must be strings or numbers".format(
+                value))
+        plain.append(value)
+    return plain
+
+
+def _model_parts(model):
+    """Method for dividing a model into its header values and its arrays.
+
+    :param model: Decision tree, regression model or neural network.
+    :return: Tuple of the header dictionary and the dictionary of arrays.
+    :rtype: :py:class:`tuple`
+    """
+    if isinstance(model, Node):
+        model = model.compile()
+
+    if isinstance(model, CompiledTree):
+        header = {
+            "model": "tree",
+            "labels": _plain_values(model.labels),
+            "vocabularies": [[feature_index, _plain_values(values)] for feature_index, values in
+                             model.vocabularies.items()],
+            "continuous_features": [int(feature_index) for feature_index in model.continuous_features],
+        }
+        return header, {name: getattr(model, name) for name in _TREE_ARRAYS}
+
+    if isinstance(model, Regression):
+        if model.thetas is None:
+            raise ValueError("Cannot save an untrained regression model")
+        return {"model": "regression"}, {"thetas": model.thetas}
+
+    if isinstance(model, NeuralNetwork):
+        header = {
+            "model": "neuralnetwork",
+            # subclasses defined outside of the package are loaded as the base class, which predicts the same
+            "module": type(model).__module__ if type(model).__module__ in _NETWORK_MODULES else _NETWORK_MODULES[0],
+            "layers": list(model.layers),
+            "activations": model.activations,
+            "alpha": model.alpha,
+        }
+        return header, {"parameters": model.parameters}
+
+    raise TypeError("Cannot save model of type {}".format(type(model).__name__))
+
+
+def save_model(model, file_path):
+    """Method for saving the parameters of a trained model to a binary model file.
+
+    Decision trees are compiled and saved as :class:`~mltools.tree.CompiledTree`. Class labels and categorical feature
+    values of trees are stored in the header and must be strings, numbers or booleans. The model file replaces any
+    previous one atomically, so processes loading it never see a partially written model.
+
+    :param model: Decision tree, regression model or neural network.
+    :type model: :class:`~mltools.tree.Node`, :class:`~mltools.tree.CompiledTree`,
+                 :class:`~mltools.regression.Regression` or :class:`~mltools.neuralnetwork.NeuralNetwork`
+    :param str file_path: Path to the model file.
+    :return: None
+    """
+    header, arrays = _model_parts(model)
+
+    specs = dict()
+    offset = 0
+    for name, values in arrays.items():
+        specs[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+        offset = _align(offset + values.nbytes)
+
+    # array offsets are relative to the end of the header, which is padded to the alignment
+    header = dict(header, arrays=specs)
+    header_bytes = dumps(header).encode("utf-8")
+    header_bytes = header_bytes.ljust(_align(_MODEL_PREFIX.size + len(header_bytes)) - _MODEL_PREFIX.size)
+
+    descriptor, temporary_path = mkstemp(dir=path.dirname(path.abspath(file_path)), suffix=".tmp")
+    try:
+        with open(descriptor, "wb") as fh:
+            fh.write(_MODEL_PREFIX.pack(_MODEL_MAGIC, _MODEL_VERSION, len(header_bytes)))
+            fh.write(header_bytes)
+            start = fh.tell()
+            for name, values in arrays.items():
+                fh.seek(start + specs[name]["offset"])
+                fh.write(values.tobytes(order="C"))
+            fh.truncate(start + offset)
+
+        replace(temporary_path, file_path)
+    except BaseException:
+        remove(temporary_path)
+        raise
+
+
+def load_model(file_path, mmap_mode="r"):
+    """Method for loading a model saved with :func:`save_model`.
+
+    The arrays of the model are views of the memory-mapped file, read on demand. Read-only models predict as usual,
+    load with mmap_mode "c" to train a loaded model further without changing the file.
+
+    :param str file_path: Path to the model file.
+    :param mmap_mode: Memory-map mode of the arrays, "r" for read-only, "c" for copy-on-write or None to read the
+                      arrays into memory.
+    :type mmap_mode: :py:obj:`None` or :py:class:`str`
+    :return: Loaded model.
+    :rtype: :class:`~mltools.tree.CompiledTree`, :class:`~mltools.regression.Regression` or
+            :class:`~mltools.neuralnetwork.NeuralNetwork`
+    """
+    with open(file_path, "rb") as fh:
+        prefix = fh.read(_MODEL_PREFIX.size)
+        if len(prefix) < _MODEL_PREFIX.size or prefix[:len(_MODEL_MAGIC)] != _MODEL_MAGIC:
+            raise ValueError("{} is not a model file".format(file_path))
+        _, version, header_length = _MODEL_PREFIX.unpack(prefix)
+        if version > _MODEL_VERSION:
+            raise ValueError("{} was saved in model format version {}, the newest supported version is {}".format(
+                file_path, version, _MODEL_VERSION))
+        header = loads(fh.read(header_length).decode("utf-8"))
+
+    start = _MODEL_PREFIX.size + header_length
+    data = fromfile(file_path, dtype=uint8) if mmap_mode is None else memmap(file_path, dtype=uint8, mode=mmap_mode)
+    arrays = dict()
+    for name, spec in header["arrays"].items():
+        dtype = numpy_dtype(spec["dtype"])
+        size = dtype.itemsize
+        for dimension in spec["shape"]:
+            size *= dimension
+        begin = start + spec["offset"]
+        if len(data) < begin + size:
+            raise ValueError("{} is truncated".format(file_path))
+        arrays[name] = data[begin:begin + size].view(dtype).reshape(spec["shape"])
+
+    if header["model"] == "tree":
+        return CompiledTree.from_arrays(arrays, header["labels"], header["vocabularies"], header["continuous_features"])
+    if header["model"] == "regression":
+        return Regression(None, None, thetas=arrays["thetas"])
+    if header["model"] == "neuralnetwork":
+        if header["module"] not in _NETWORK_MODULES:
+            raise ValueError("Unknown neural network module \"{}\"".format(header["module"]))
+        network_class = import_module(header["module"]).NeuralNetwork
+        return network_class(None, None, alpha=header["alpha"], layers=header["layers"],
+                             activations=header["activations"], parameters=arrays["parameters"])
+    raise ValueError("Unknown model type \"{}\"".format(header["model"]))
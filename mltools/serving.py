@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mltools.serving
+~~~~~~~~~~~~~~~
+
+This module provides classes for serving predictions of trained models under load.
+
+:class:`Predictor` gives decision trees, regression models and neural networks a common batched interface, and
+:class:`MicroBatcher` collects concurrent asyncio requests into batches so each batch costs a single vectorized call.
+"""
+import asyncio
+from math import log2
+from time import perf_counter
+
+from numpy import cumsum, searchsorted, zeros
+
+from .tree import Node
+
+# latency histogram buckets start at one microsecond and grow by a factor of 2^(1/_BUCKETS_PER_DOUBLING)
+_MINIMUM_LATENCY = 1e-6
+_BUCKETS_PER_DOUBLING = 8
+_NUMBER_BUCKETS = 40 * _BUCKETS_PER_DOUBLING
+
+
+class Predictor(object):
+    """Batched prediction interface over a trained model.
+
+    Any model with a ``predict_batch`` method taking one data point per row can be served, which includes
+    :class:`~mltools.tree.Node`, :class:`~mltools.tree.CompiledTree`, :class:`~mltools.regression.Regression` and
+    :class:`~mltools.neuralnetwork.NeuralNetwork`. Decision trees are compiled once instead of on every call.
+    """
+
+    def __init__(self, model):
+        """Initialization method for class Predictor.
+
+        :param model: Trained model with a ``predict_batch`` method.
+        """
+        if not hasattr(model, "predict_batch"):
+            raise TypeError("{} models have no predict_batch method".format(type(model).__name__))
+        self.model = model.compile() if isinstance(model, Node) else model
+
+    def predict_batch(self, data_values):
+        """Method for predicting many data points with a single call to the model.
+
+        :param data_values: List of data points, or two dimensional array with one data point per row.
+        :return: Array of predictions with one entry per data point.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        return self.model.predict_batch(data_values)
+
+    def predict(self, data_value):
+        """Method for predicting a single data point.
+
+        :param data_value: Data point.
+        :return: Prediction of the data point.
+        """
+        return self.predict_batch([data_value])[0]
+
+
+class LatencyHistogram(object):
+    """Histogram of latencies with logarithmically spaced buckets.
+
+    Buckets are 2^(1/8) wide from one microsecond, so percentiles are reported within about 9% of the recorded
+    latencies.
+    """
+
+    def __init__(self):
+        """Initialization method for class LatencyHistogram.
+        """
+        self.counts = zeros(_NUMBER_BUCKETS, dtype=int)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds, count=1):
+        """Method for adding a latency to the histogram.
+
+        :param float seconds: Latency in seconds.
+        :param int count: Number of times the latency occurred.
+        :return: None
+        """
+        bucket = int(log2(seconds / _MINIMUM_LATENCY) * _BUCKETS_PER_DOUBLING) + 1 if seconds > _MINIMUM_LATENCY else 0
+        self.counts[min(bucket, _NUMBER_BUCKETS - 1)] += count
+        self.count += count
+        self.total += seconds * count
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, percent):
+        """Method for estimating a percentile of the recorded latencies.
+
+        :param float percent: Percentile between 0 and 100.
+        :return: Upper edge of the bucket holding the percentile in seconds, at most the largest recorded latency.
+        :rtype: :py:class:`float`
+        """
+        if not self.count:
+            return 0.0
+        bucket = int(searchsorted(cumsum(self.counts), percent / 100 * self.count))
+        return min(_MINIMUM_LATENCY * 2 ** (bucket / _BUCKETS_PER_DOUBLING), self.maximum)
+
+    def summary(self):
+        """Method for summarizing the recorded latencies.
+
+        :return: Dictionary of the count, mean, 50th, 90th and 99th percentiles and maximum, latencies in seconds.
+        :rtype: :py:class:`dict`
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.maximum,
+        }
+
+
+class MicroBatcher(object):
+    """Asyncio front end collecting concurrent prediction requests into batches.
+
+    A batch is predicted once it holds ``max_batch_size`` data points or ``max_delay`` milliseconds after its first
+    request arrived, whichever comes first. Predictions run in an executor so the event loop keeps accepting requests.
+    The time requests spend waiting for their batch and the time batches take to compute are recorded in
+    :attr:`queue_wait` and :attr:`compute`.
+
+    Usage::
+
+        async with MicroBatcher(Predictor(model), max_batch_size=64, max_delay=2) as batcher:
+            prediction = await batcher.predict(data_value)
+    """
+
+    def __init__(self, predictor, max_batch_size=64, max_delay=5, executor=None):
+        """Initialization method for class MicroBatcher.
+
+        :param predictor: Predictor, or any object with a ``predict_batch`` method.
+        :param int max_batch_size: Largest number of data points predicted in one batch.
+        :param float max_delay: Longest time in milliseconds a batch waits for more requests.
+        :param executor: Executor running the predictions, None uses the event loop's default thread pool.
+        :type executor: :py:obj:`None` or :py:class:`concurrent.futures.Executor`
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.executor = executor
+        self.queue_wait = LatencyHistogram()
+        self.compute = LatencyHistogram()
+        self.batch_sizes = zeros(max_batch_size + 1, dtype=int)
+        self._queue = None
+        self._task = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def predict(self, data_value):
+        """Method for predicting a single data point as part of the next batch.
+
+        :param data_value: Data point.
+        :return: Prediction of the data point.
+        """
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((data_value, future, perf_counter()))
+        return await future
+
+    async def close(self):
+        """Method for stopping the batching task, requests still waiting for a batch are cancelled.
+
+        :return: None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            while not self._queue.empty():
+                self._queue.get_nowait()[1].cancel()
+            self._task = None
+
+    def stats(self):
+        """Method for summarizing the queue wait and compute latencies and the batch sizes.
+
+        :return: Dictionary of the queue wait and compute latency summaries and the mean batch size.
+        :rtype: :py:class:`dict`
+        """
+        number_batches = int(self.batch_sizes.sum())
+        return {
+            "queue_wait": self.queue_wait.summary(),
+            "compute": self.compute.summary(),
+            "batches": number_batches,
+            "mean_batch_size": self.queue_wait.count / number_batches if number_batches else 0.0,
+        }
+
+    async def _collect(self):
+        """Method for collecting requests into batches and predicting them until cancelled.
+
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay / 1000
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    future.cancel()
+                raise
+
+            await self._predict(loop, batch)
+
+    async def _predict(self, loop, batch):
+        """Method for predicting a batch of requests with a single call and resolving their futures.
+
+        :param loop: Running event loop.
+        :param list batch: List of (data point, future, arrival time) tuples.
+        :return: None
+        """
+        data_values, futures, arrival_times = zip(*batch)
+        start = perf_counter()
+        for arrival_time in arrival_times:
+            self.queue_wait.record(start - arrival_time)
+        self.batch_sizes[len(batch)] += 1
+
+        try:
+            predictions = await loop.run_in_executor(self.executor, self.predictor.predict_batch, list(data_values))
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            self.compute.record(perf_counter() - start)
+
+        for future, prediction in zip(futures, predictions):
+            if not future.done():
+                future.set_result(prediction)
@@ -7,69 +7,710 @@ mltools.tree
 
 This module provides functions and classes for implementing decision tree models.
 """
-from copy import deepcopy
-from math import log2
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+
+from numpy import arange, argmax, argsort, array, asarray, bincount, concatenate, count_nonzero, cumsum, diff, empty, \
+    float64, flatnonzero, fromiter, full, inf, int32, int64, integer, isfinite, log2, maximum, min_scalar_type, \
+    multiply, object_, repeat, searchsorted, split, union1d, unique, zeros
+from numpy.random import SeedSequence, default_rng
+
+from ._shared import SharedArray, attach_array, resolve_n_jobs
+from .callbacks import CallbackList
+from ._sparse import issparse
+from .preprocessing import EquidensityDiscretizer, MinMaxNormalizer
+
+# gains closer than this are treated as equal, so ties resolve to the first feature in iteration order
+_TIE_TOLERANCE = 1e-12
+
+# upper bound on the number of encoded values gathered into a single contingency table pass
+_BLOCK_ELEMENTS = 1 << 22
+
+# nodes with fewer rows than this are not worth the inter-process overhead of a parallel build
+_PARALLEL_MIN_SAMPLES = 20000
+
+# callbacks of nodes split without any, such as the nodes split by worker processes
+_NO_CALLBACKS = CallbackList()
+
+# per worker process state for parallel tree building, see _initialize_worker()
+_worker_state = dict()
 
 
 def normalize(data_list, feature_index):
     """Method for normalizing the feature data values in a list of data entries given the index of the feature value in
     the data entry
 
+    Values are replaced in place, use :class:`~mltools.preprocessing.MinMaxNormalizer` to keep the original values and
+    reuse the minimum and maximum values on other data.
+
     :param data_list: List of data entries where each data entry is a list of feature.
     :type data_list: list
     :param feature_index: Index of feature value in each data entry.
     :type feature_index: int
-    :return: None
+    :return: Tuple of the minimum and maximum feature value.
     """
-    feature_value_list = [float(value[feature_index]) for value in data_list]
-    maximum = max(feature_value_list)
-    minimum = min(feature_value_list)
+    column = fromiter((float(data[feature_index]) for data in data_list), dtype=float64, count=len(data_list))
+    normalizer = MinMaxNormalizer().fit(column)
+    if normalizer.maximum == normalizer.minimum:
+        raise ZeroDivisionError("float division by zero")
 
-    for data in data_list:
-        data[feature_index] = (float(data[feature_index]) - minimum) / (maximum - minimum)
+    for data, value in zip(data_list, normalizer.transform(column).tolist()):
+        data[feature_index] = value
 
-    return minimum, maximum
+    return float(normalizer.minimum), float(normalizer.maximum)
 
 
 def equidistant_discretization(data_list, feature_index, number_bins=2):
     """Method for discretizing raw data based on equidistant bins.
 
+    Values are expected to be normalized, values outside of [0, 1) are placed in the last bin. Values are replaced in
+    place, use :class:`~mltools.preprocessing.EquidistantDiscretizer` to keep the original values and reuse the bins on
+    other data.
+
     :param list data_list: List of data entries where each data entry is a list of feature.
     :param int feature_index: Index of feature value in each data entry.
     :param int number_bins: Number of bins to divide data into.
     :return: None
     """
-    for data in data_list:
-        for x in range(number_bins):
-            if x * (1/number_bins) <= data[feature_index] < (x + 1) * (1/number_bins):
-                data[feature_index] = x
-                break
-            if x == number_bins - 1:
-                data[feature_index] = x
-                break
+    column = fromiter((data[feature_index] for data in data_list), dtype=float64, count=len(data_list))
+    bin_edges = arange(number_bins + 1) * (1 / number_bins)
+
+    bins = searchsorted(bin_edges, column, side="right") - 1
+    bins[(bins < 0) | (bins >= number_bins)] = number_bins - 1
+
+    for data, bin_number in zip(data_list, bins.tolist()):
+        data[feature_index] = bin_number
 
 
 def equidensity_discretization(data_list, feature_index, number_bins=2):
     """Method for discretizing raw data based on equal density bins.
 
+    Data entries are ranked by their feature value and consecutive runs of ceil(len(data_list) / number_bins) entries
+    share a bin. Values are replaced in place, use :class:`~mltools.preprocessing.EquidensityDiscretizer` to keep the
+    original values and reuse the bins on other data.
+
     :param list data_list: List of data entries where each data entry is a list of feature.
     :param int feature_index: Index of feature value in each data entry.
     :param int number_bins: Number of bins to divide data into.
     :return: None
     """
+    order = sorted(range(len(data_list)), key=lambda index: data_list[index][feature_index])
+    bins = arange(len(data_list)) // ceil(len(data_list) / number_bins)
+
+    for index, bin_number in zip(order, bins.tolist()):
+        data_list[index][feature_index] = bin_number
+
+
+def entropy(counts, axis=-1):
+    """Method for calculating the shannon entropy of label counts along an axis.
+
+        D(x) = -Sum[P(x)log2(P(x))]
+
+    :param counts: Array of label counts.
+    :type counts: :py:class:`~numpy.ndarray`
+    :param int axis: Axis holding the counts of each label.
+    :return: Entropy of the label counts, with the label axis removed.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    probabilities = counts / maximum(counts.sum(axis=axis, keepdims=True), 1)
+    logs = log2(probabilities, out=zeros(probabilities.shape), where=probabilities > 0)
+    return -(probabilities * logs).sum(axis=axis)
+
+
+def relative_entropy(counts, background, maximum_value, axis=-1):
+    """Method for calculating the relative entropy (Kullback-Leibler divergence) of label counts along an axis.
+
+    :param counts: Array of label counts.
+    :type counts: :py:class:`~numpy.ndarray`
+    :param background: Array of background frequencies indexed by label code.
+    :type background: :py:class:`~numpy.ndarray`
+    :param maximum_value: Maximum divergence used to scale the result.
+    :param int axis: Axis holding the counts of each label.
+    :return: One minus the scaled divergence of the label counts, with the label axis removed.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    probabilities = counts / maximum(counts.sum(axis=axis, keepdims=True), 1)
+    logs = log2(probabilities / background, out=zeros(probabilities.shape), where=probabilities > 0)
+    return 1 - (probabilities * logs).sum(axis=axis) / maximum_value
+
+
+def contingency_tables(feature_codes, class_codes, number_values, number_classes):
+    """Method for counting the co-occurrences of feature values and class labels for several features in one pass.
+
+    :param feature_codes: Matrix of encoded feature values with one column per feature.
+    :type feature_codes: :py:class:`~numpy.ndarray`
+    :param class_codes: Array of encoded class labels with one value per row of feature_codes.
+    :type class_codes: :py:class:`~numpy.ndarray`
+    :param int number_values: Number of codes any of the features can take.
+    :param int number_classes: Number of codes the class label can take.
+    :return: Array of shape (features, number_values, number_classes) holding the counts.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    number_features = feature_codes.shape[1]
+    table_size = number_values * number_classes
+
+    flat_codes = multiply(feature_codes, number_classes, dtype=int64)
+    flat_codes += class_codes[:, None]
+    flat_codes += arange(number_features, dtype=int64) * table_size
+
+    tables = bincount(flat_codes.ravel(), minlength=number_features * table_size)
+    return tables.reshape(number_features, number_values, number_classes)
+
+
+def split_gains(tables, background=None, maximum_value=2):
+    """Method for scoring the splits described by a stack of contingency tables.
+
+    :param tables: Array of shape (features, number_values, number_classes) from :func:`contingency_tables`.
+    :type tables: :py:class:`~numpy.ndarray`
+    :param background: Array of background frequencies indexed by label code, relative gains are only calculated when
+                       provided.
+    :type background: :py:obj:`None` or :py:class:`~numpy.ndarray`
+    :param maximum_value: Maximum divergence used to scale relative entropies.
+    :return: Tuple of information gain and relative entropy gain for each feature, the latter is None without
+             background frequencies.
+    :rtype: :py:class:`tuple`
+    """
+    class_counts = tables[0].sum(axis=0)
+    weights = tables.sum(axis=2) / max(class_counts.sum(), 1)
+
+    gains = entropy(class_counts) - (weights * entropy(tables)).sum(axis=1)
+
+    relative_gains = None
+    if background is not None:
+        relative_gains = relative_entropy(class_counts, background, maximum_value) - \
+            (weights * relative_entropy(tables, background, maximum_value)).sum(axis=1)
+
+    return gains, relative_gains
 
-    bin_size = len(data_list) / number_bins
-    count = 0
-    bin_number = 0
-    for data in sorted(data_list, key=lambda x: x[feature_index]):
-        if count < bin_size:
-            data[feature_index] = bin_number
+
+def threshold_split_gains(tables):
+    """Method for scoring the best binary threshold split described by each of a stack of histogram tables.
+
+    The value axis of the tables holds ordered histogram bins, a threshold after bin b sends bins 0 to b to the left
+    child and the remaining bins to the right child. Cumulative histograms give the class counts of every left child at
+    once.
+
+    :param tables: Array of shape (features, number_bins, number_classes) from :func:`contingency_tables`.
+    :type tables: :py:class:`~numpy.ndarray`
+    :return: Tuple of the best information gain and the bin ending the left child of the best threshold for each
+             feature, gains are -inf for features without a threshold leaving data in both children.
+    :rtype: :py:class:`tuple`
+    """
+    number_features, number_bins, _ = tables.shape
+    if number_bins < 2:
+        return full(number_features, -inf), zeros(number_features, dtype=int64)
+
+    class_counts = tables.sum(axis=1, keepdims=True)
+    left_counts = cumsum(tables, axis=1)[:, :-1]
+    right_counts = class_counts - left_counts
+
+    left_totals = left_counts.sum(axis=2)
+    right_totals = right_counts.sum(axis=2)
+    total = max(class_counts[0].sum(), 1)
+
+    gains = entropy(class_counts[0, 0]) - \
+        (left_totals * entropy(left_counts) + right_totals * entropy(right_counts)) / total
+    gains[(left_totals == 0) | (right_totals == 0)] = -inf
+
+    best_bins = gains.argmax(axis=1)
+    return gains[arange(number_features), best_bins], best_bins
+
+
+def _match_rows(sorted_indices, order, rows):
+    """Method for finding the positions of row indexes within an array of row indexes that may repeat.
+
+    :param sorted_indices: Sorted array of row indexes.
+    :type sorted_indices: :py:class:`~numpy.ndarray`
+    :param order: Positions of the sorted row indexes in the original array, see :func:`numpy.argsort`.
+    :type order: :py:class:`~numpy.ndarray`
+    :param rows: Array of row indexes to look up.
+    :type rows: :py:class:`~numpy.ndarray`
+    :return: Tuple of positions in rows and the matching positions in the original array, one pair per match.
+    :rtype: :py:class:`tuple`
+    """
+    left = searchsorted(sorted_indices, rows, side="left")
+    counts = searchsorted(sorted_indices, rows, side="right") - left
+
+    matched = repeat(arange(len(rows)), counts)
+    offsets = arange(len(matched)) - repeat(cumsum(counts) - counts, counts)
+    return matched, order[repeat(left, counts) + offsets]
+
+
+def sparse_contingency_tables(sparse_codes, indices, feature_indexes, class_codes, number_values, number_classes):
+    """Method for counting the co-occurrences of feature values and class labels from the non-zero entries only.
+
+    Rows without an entry for a feature hold its value 0, their counts are the class counts of all rows minus the counts
+    of the non-zero entries.
+
+    :param sparse_codes: Sparse encoded matrix of a dataset created with :meth:`EncodedDataset.from_sparse`.
+    :type sparse_codes: :class:`SparseCodes`
+    :param indices: Row indexes of the rows to count, which may repeat.
+    :type indices: :py:class:`~numpy.ndarray`
+    :param list feature_indexes: Indexes of the features.
+    :param class_codes: Array of encoded class labels with one value per row index.
+    :type class_codes: :py:class:`~numpy.ndarray`
+    :param int number_values: Number of codes any of the features can take.
+    :param int number_classes: Number of codes the class label can take.
+    :return: Array of shape (features, number_values, number_classes) holding the counts.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    features = asarray(feature_indexes, dtype=int64)
+    starts = sparse_codes.indptr[features]
+    lengths = sparse_codes.indptr[features + 1] - starts
+    entries = repeat(starts - (cumsum(lengths) - lengths), lengths) + arange(lengths.sum())
+    entry_features = repeat(arange(len(features)), lengths)
+
+    order = argsort(indices, kind="stable")
+    matched, positions = _match_rows(indices[order], order, sparse_codes.rows[entries])
+
+    flat_codes = multiply(entry_features[matched], number_values, dtype=int64)
+    flat_codes += sparse_codes.data[entries[matched]]
+    flat_codes *= number_classes
+    flat_codes += class_codes[positions]
+
+    table_size = number_values * number_classes
+    tables = bincount(flat_codes, minlength=len(features) * table_size).reshape(len(features), number_values,
+                                                                                number_classes)
+
+    zero_codes = sparse_codes.zero_codes[features]
+    implicit = flatnonzero(zero_codes >= 0)
+    class_counts = bincount(class_codes, minlength=number_classes)
+    tables[implicit, zero_codes[implicit]] += class_counts - tables[implicit].sum(axis=1)
+    return tables
+
+
+def _feature_gains(dataset, indices, feature_indexes, class_label_index=-1):
+    """Method for calculating the information gain of splitting a set of rows on each of the given features.
+
+    Features are scored in blocks so the gathered feature codes stay bounded in size. Sparse datasets are counted from
+    their non-zero entries.
+
+    :param dataset: Encoded dataset holding the rows.
+    :type dataset: :class:`EncodedDataset`
+    :param indices: Row indexes of the rows to split.
+    :type indices: :py:class:`~numpy.ndarray`
+    :param list feature_indexes: Indexes of the candidate features.
+    :param int class_label_index: Index of class label value in data point (list).
+    :return: Tuple of arrays holding the information gain of each feature and the bin ending the left child of the best
+             threshold of each continuous feature (-1 for categorical features), in the order of feature_indexes.
+    :rtype: :py:class:`tuple`
+    """
+    if not len(indices):
+        return zeros(len(feature_indexes)), full(len(feature_indexes), -1, dtype=int64)
+
+    class_codes = dataset.codes[indices, class_label_index]
+    number_classes = len(dataset.values[class_label_index])
+    sparse = isinstance(dataset.codes, SparseCodes)
+    if sparse:
+        largest_values = max(len(dataset.values[feature_index]) for feature_index in feature_indexes)
+        block_size = max(1, _BLOCK_ELEMENTS // (largest_values * number_classes))
+    else:
+        block_size = max(1, _BLOCK_ELEMENTS // len(indices))
+
+    gains = list()
+    split_bins = list()
+    for start in range(0, len(feature_indexes), block_size):
+        block_features = feature_indexes[start:start + block_size]
+        number_values = max(len(dataset.values[feature_index]) for feature_index in block_features)
+        if sparse:
+            tables = sparse_contingency_tables(
+                dataset.codes, indices, block_features, class_codes, number_values, number_classes
+            )
         else:
-            count = 0
-            bin_number += 1
-            data[feature_index] = bin_number
+            feature_codes = dataset.codes[indices[:, None], block_features]
+            tables = contingency_tables(feature_codes, class_codes, number_values, number_classes)
+        block_gains = split_gains(tables)[0]
+        block_bins = full(len(block_features), -1, dtype=int64)
+
+        # continuous features are split on the best threshold between their histogram bins
+        continuous = [position for position, feature_index in enumerate(block_features)
+                      if feature_index in dataset.thresholds]
+        if continuous:
+            block_gains[continuous], block_bins[continuous] = threshold_split_gains(tables[continuous])
+
+        gains.append(block_gains)
+        split_bins.append(block_bins)
+
+    return concatenate(gains), concatenate(split_bins)
+
+
+def _resolve_max_features(max_features, number_features):
+    """Method for converting a ``max_features`` argument into the number of candidate features scored per split.
+
+    :param max_features: Number of features, fraction of the features, "sqrt" or "log2" of the number of features, or
+                         None for every feature.
+    :type max_features: :py:obj:`None` or :py:class:`int` or :py:class:`float` or :py:class:`str`
+    :param int number_features: Number of features of the tree.
+    :return: Number of candidate features, at least 1, or None for every feature.
+    :rtype: :py:obj:`None` or :py:class:`int`
+    """
+    if max_features is None:
+        return None
+    if max_features == "sqrt":
+        return max(1, int(number_features ** 0.5))
+    if max_features == "log2":
+        return max(1, int(log2(max(number_features, 1))))
+    if isinstance(max_features, float) and 0 < max_features <= 1:
+        return max(1, int(max_features * number_features))
+    if isinstance(max_features, (int, integer)) and max_features >= 1:
+        return int(max_features)
+    raise ValueError("max_features must be a positive int, a fraction, \"sqrt\", \"log2\" or None, not {!r}".format(
+        max_features))
+
+
+def _share_codes(codes):
+    """Method for copying an encoded matrix, dense or sparse, into shared memory.
+
+    :param codes: Encoded matrix of a dataset.
+    :type codes: :py:class:`~numpy.ndarray` or :class:`SparseCodes`
+    :return: Tuple of the list of shared arrays, which must be closed by the caller, and the spec to pass to the
+             workers.
+    :rtype: :py:class:`tuple`
+    """
+    if isinstance(codes, SparseCodes):
+        shared = [SharedArray.copy_of(component) for component in codes.components()]
+        return shared, (True, [component.spec for component in shared])
+
+    shared = SharedArray.copy_of(codes)
+    return [shared], (False, [shared.spec])
+
+
+def _initialize_worker(codes_spec, values, thresholds):
+    """Method for mapping the shared encoded dataset in a tree building worker process.
+
+    :param tuple codes_spec: Spec of the shared encoded matrix, see :func:`_share_codes`.
+    :param list values: List holding the sorted unique values of each column.
+    :param dict thresholds: Dictionary of continuous feature indexes to histogram bin thresholds.
+    :return: None
+    """
+    sparse, specs = codes_spec
+    memories, components = zip(*(attach_array(spec) for spec in specs))
+    codes = SparseCodes(*components) if sparse else components[0]
+    _worker_state["memory"] = memories
+    _worker_state["dataset"] = EncodedDataset.from_codes(codes, values, thresholds)
+
+
+def _score_features(indices, feature_indexes, class_label_index):
+    """Method for scoring candidate features in a tree building worker process.
+
+    :return: Tuple of information gains and threshold bins in the order of feature_indexes.
+    :rtype: :py:class:`tuple`
+    """
+    return _feature_gains(_worker_state["dataset"], indices, feature_indexes, class_label_index)
+
+
+def _build_subtree(indices, feature_index_set, depth, class_label_index, background_frequencies, maximum_value,
+                   limits, random_seed):
+    """Method for building a subtree in a tree building worker process.
+
+    :param dict limits: Keyword arguments of :meth:`Node.build_tree` limiting the growth of the tree.
+    :param random_seed: Seed of the feature subsamples of the subtree, see :attr:`Node.random_seed`.
+    :return: Structure of the subtree, see :meth:`Node._structure`.
+    :rtype: :py:class:`tuple`
+    """
+    node = Node(
+        _worker_state["dataset"], feature_index_set, background_frequencies=background_frequencies,
+        maximum_value=maximum_value, indices=indices
+    )
+    node.build_tree(depth, class_label_index, seed=random_seed, **limits)
+    return node._structure()
+
+
+class SparseCodes(object):
+    """Encoded feature matrix holding only the codes of non-zero feature values, column by column.
+
+    The codes of each feature column are stored like a compressed sparse column matrix, rows without an entry hold the
+    code of value 0. The class label codes are stored densely as the last column. Indexing with a (rows, column) pair
+    returns dense codes like the encoded matrix of :class:`EncodedDataset`.
+    """
+
+    def __init__(self, indptr, rows, data, zero_codes, labels):
+        """Initialization method for class SparseCodes.
+
+        :param indptr: Array of the start of each feature's entries in rows and data, followed by the number of entries.
+        :type indptr: :py:class:`~numpy.ndarray`
+        :param rows: Array of the sorted row indexes of each feature's entries.
+        :type rows: :py:class:`~numpy.ndarray`
+        :param data: Array of the codes of each feature's entries.
+        :type data: :py:class:`~numpy.ndarray`
+        :param zero_codes: Array of the code of value 0 of each feature, -1 for features with an entry in every row.
+        :type zero_codes: :py:class:`~numpy.ndarray`
+        :param labels: Array of class label codes.
+        :type labels: :py:class:`~numpy.ndarray`
+        """
+        self.indptr = indptr
+        self.rows = rows
+        self.data = data
+        self.zero_codes = zero_codes
+        self.labels = labels
+        self.shape = (len(labels), len(indptr))
+        self.dtype = data.dtype
+
+    def __getitem__(self, key):
+        """Overrides indexing for class SparseCodes, returning the dense codes of a column for a row or rows.
+        """
+        row_indexes, column_index = key
+        if column_index < 0:
+            column_index += self.shape[1]
+        if column_index == self.shape[1] - 1:
+            return self.labels[row_indexes]
+
+        if isinstance(row_indexes, (int, integer)):
+            return self.column(column_index, array([row_indexes]))[0]
+        return self.column(column_index, asarray(row_indexes))
+
+    def column(self, feature_index, indices):
+        """Method for gathering the dense codes of a feature for the given rows.
+
+        :param int feature_index: Index of the feature.
+        :param indices: Row indexes, which may repeat.
+        :type indices: :py:class:`~numpy.ndarray`
+        :return: Array of codes, one per row index.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        start, end = self.indptr[feature_index], self.indptr[feature_index + 1]
+        order = argsort(indices, kind="stable")
+        matched, positions = _match_rows(indices[order], order, self.rows[start:end])
+
+        column = full(len(indices), max(self.zero_codes[feature_index], 0), dtype=self.dtype)
+        column[positions] = self.data[start:end][matched]
+        return column
+
+    def components(self):
+        """Method for listing the arrays the sparse codes are made of, in the order of the initialization arguments.
+
+        :rtype: :py:class:`list`
+        """
+        return [self.indptr, self.rows, self.data, self.zero_codes, self.labels]
+
+
+class EncodedDataset(object):
+    """Integer encoded copy of a list of data entries.
+
+    Every column is encoded once into a contiguous column of an integer matrix, where each code is the position of the
+    original value in the sorted list of unique values for that column. Decision tree nodes reference rows of the
+    matrix through index arrays, so the data is never copied while the tree is built. The matrix uses the smallest
+    unsigned integer type able to hold every code.
+
+    Continuous features are binned into at most max_bins quantile bins instead, and are split by the tree on thresholds
+    between bins rather than on every value.
+
+    Datasets encoded from sparse matrices with :meth:`from_sparse` keep only the codes of the non-zero values, as
+    :class:`SparseCodes`.
+    """
+
+    def __init__(self, data_list, continuous_features=(), max_bins=255):
+        """Initialization method for class EncodedDataset.
+
+        :param list data_list: List of data entries where each data entry is a list of feature values.
+        :param continuous_features: Indexes of the features holding continuous values.
+        :type continuous_features: :py:class:`set` or :py:class:`list` or :py:class:`tuple`
+        :param int max_bins: Maximum number of histogram bins per continuous feature.
+        """
+        self.data_list = data_list
+        number_rows = len(data_list)
+        number_columns = len(data_list[0]) if number_rows else 0
+
+        self.values = list()
+        self.thresholds = dict()
+        continuous_columns = dict()
+        for column_index in range(number_columns):
+            if column_index in continuous_features:
+                column = fromiter(
+                    (data_entry[column_index] for data_entry in data_list), dtype=float64, count=number_rows
+                )
+                # bin b holds the values above threshold b - 1 up to and including threshold b
+                discretizer = EquidensityDiscretizer(max_bins, right=True).fit(column)
+                self.thresholds[column_index] = discretizer.bin_edges[0]
+                self.values.append(list(range(len(self.thresholds[column_index]) + 1)))
+                continuous_columns[column_index] = discretizer.transform(column)
+            else:
+                self.values.append(sorted({data_entry[column_index] for data_entry in data_list}))
+
+        largest_code = max((len(column_values) - 1 for column_values in self.values), default=0)
+        self.codes = empty((number_rows, number_columns), dtype=min_scalar_type(largest_code), order="F")
+        for column_index, column_values in enumerate(self.values):
+            if column_index in continuous_columns:
+                self.codes[:, column_index] = continuous_columns[column_index]
+            else:
+                lookup = {value: code for code, value in enumerate(column_values)}
+                self.codes[:, column_index] = fromiter(
+                    (lookup[data_entry[column_index]] for data_entry in data_list), dtype=int64, count=number_rows
+                )
+
+    def __len__(self):
+        """Overrides len() method for class EncodedDataset.
+        """
+        return self.codes.shape[0]
+
+    @classmethod
+    def from_chunks(cls, chunks, continuous_features=(), max_bins=255):
+        """Method for encoding a dataset streamed in chunks, such as the chunks of :func:`~mltools.fileio.iter_csv`.
+
+        Only the encoded chunks are kept in memory, the dataset is created without the original data entries. Histogram
+        bins of continuous features are learned from the first chunk.
+
+        :param chunks: Iterable of tuples of two arrays; x values and y values (or None). The class label becomes the
+                       last column of the dataset.
+        :param continuous_features: Indexes of the columns holding continuous values.
+        :type continuous_features: :py:class:`set` or :py:class:`list` or :py:class:`tuple`
+        :param int max_bins: Maximum number of histogram bins per continuous feature.
+        :return: Encoded dataset.
+        :rtype: :class:`EncodedDataset`
+        """
+        vocabularies = None
+        discretizers = dict()
+        chunk_codes = list()
+        for X, y in chunks:
+            columns = [X[:, column_index] for column_index in range(X.shape[1])]
+            if y is not None:
+                columns.append(y.reshape(-1))
+
+            if vocabularies is None:
+                vocabularies = [dict() for _ in columns]
+                for column_index in continuous_features:
+                    discretizers[column_index] = EquidensityDiscretizer(max_bins, right=True).fit(
+                        columns[column_index].astype(float64)
+                    )
+
+            # codes are assigned in order of appearance and sorted by value once every chunk has been seen
+            codes = empty((len(columns[0]), len(columns)), dtype=int32)
+            for column_index, column in enumerate(columns):
+                if column_index in discretizers:
+                    codes[:, column_index] = discretizers[column_index].transform(column.astype(float64))
+                else:
+                    unique_values, inverse = _unique_inverse(column)
+                    vocabulary = vocabularies[column_index]
+                    unique_codes = fromiter(
+                        (vocabulary.setdefault(value, len(vocabulary)) for value in unique_values), dtype=int32,
+                        count=len(unique_values)
+                    )
+                    codes[:, column_index] = unique_codes[inverse]
+            chunk_codes.append(codes)
+
+        if vocabularies is None:
+            return cls.from_codes(empty((0, 0), dtype=min_scalar_type(0), order="F"), list())
+
+        values = list()
+        remaps = list()
+        thresholds = dict()
+        for column_index, vocabulary in enumerate(vocabularies):
+            if column_index in discretizers:
+                thresholds[column_index] = discretizers[column_index].bin_edges[0]
+                values.append(list(range(len(thresholds[column_index]) + 1)))
+                remaps.append(None)
+            else:
+                values.append(sorted(vocabulary))
+                remap = empty(len(vocabulary), dtype=int32)
+                remap[[vocabulary[value] for value in values[-1]]] = arange(len(vocabulary))
+                remaps.append(remap)
+
+        largest_code = max((len(column_values) - 1 for column_values in values), default=0)
+        codes = empty((sum(len(chunk) for chunk in chunk_codes), len(values)), dtype=min_scalar_type(largest_code),
+                      order="F")
+        start = 0
+        for chunk in chunk_codes:
+            for column_index, remap in enumerate(remaps):
+                column = chunk[:, column_index]
+                codes[start:start + len(chunk), column_index] = column if remap is None else remap[column]
+            start += len(chunk)
+
+        return cls.from_codes(codes, values, thresholds)
+
+    @classmethod
+    def from_sparse(cls, X, y, continuous_features=(), max_bins=255):
+        """Method for encoding a CSR or CSC sparse matrix of feature values and an array of class labels.
+
+        Only the non-zero values are encoded, so memory use and split counting scale with the number of non-zero values
+        instead of rows times columns. The class label becomes the last column of the dataset.
+
+        :param X: Sparse matrix of feature values.
+        :type X: :py:class:`~scipy.sparse.spmatrix`
+        :param y: Array of class labels, with shape (1, number of rows) or (number of rows,).
+        :type y: :py:class:`~numpy.ndarray`
+        :param continuous_features: Indexes of the features holding continuous values.
+        :type continuous_features: :py:class:`set` or :py:class:`list` or :py:class:`tuple`
+        :param int max_bins: Maximum number of histogram bins per continuous feature.
+        :return: Encoded dataset.
+        :rtype: :class:`EncodedDataset`
+        """
+        X = X.tocsc()
+        if not X.has_sorted_indices:
+            X = X.sorted_indices()
+        number_rows, number_features = X.shape
+        indptr = X.indptr.astype(int64)
+
+        values = list()
+        thresholds = dict()
+        codes = empty(X.nnz, dtype=int64)
+        zero_codes = full(number_features, -1, dtype=int64)
+        for feature_index in range(number_features):
+            start, end = indptr[feature_index], indptr[feature_index + 1]
+            column_data = X.data[start:end]
+            implicit_zeros = end - start < number_rows
 
-        count += 1
+            if feature_index in continuous_features:
+                column = zeros(number_rows)
+                column[X.indices[start:end]] = column_data
+                discretizer = EquidensityDiscretizer(max_bins, right=True).fit(column)
+                thresholds[feature_index] = discretizer.bin_edges[0]
+                values.append(list(range(len(thresholds[feature_index]) + 1)))
+                codes[start:end] = discretizer.transform(column_data)
+                if implicit_zeros:
+                    zero_codes[feature_index] = discretizer.transform(zeros(1))[0]
+            else:
+                column_values = union1d(column_data, [0]) if implicit_zeros else unique(column_data)
+                values.append(column_values.tolist())
+                codes[start:end] = searchsorted(column_values, column_data)
+                if implicit_zeros:
+                    zero_codes[feature_index] = searchsorted(column_values, 0)
+
+        label_values, label_codes = _unique_inverse(asarray(y).reshape(-1))
+        values.append(label_values)
+
+        code_type = min_scalar_type(max(len(column_values) - 1 for column_values in values))
+        sparse_codes = SparseCodes(
+            indptr, X.indices.astype(int64), codes.astype(code_type), zero_codes, label_codes.astype(code_type)
+        )
+        return cls.from_codes(sparse_codes, values, thresholds)
+
+    @classmethod
+    def from_codes(cls, codes, values, thresholds=None):
+        """Method for creating an encoded dataset from an already encoded matrix.
+
+        :param codes: Integer matrix of encoded values with one column per feature.
+        :type codes: :py:class:`~numpy.ndarray` or :class:`SparseCodes`
+        :param list values: List holding the sorted unique values of each column.
+        :param thresholds: Dictionary of continuous feature indexes to histogram bin thresholds.
+        :type thresholds: :py:obj:`None` or :py:class:`dict`
+        :return: Encoded dataset without the original data entries.
+        :rtype: :class:`EncodedDataset`
+        """
+        dataset = cls([])
+        dataset.codes = codes
+        dataset.values = values
+        dataset.thresholds = thresholds if thresholds is not None else dict()
+        dataset.data_list = None
+        return dataset
+
+    def rows(self, indices):
+        """Method for retrieving the original data entries at the given row indexes.
+
+        Data entries are decoded from the encoded matrix when the dataset was created without them, continuous features
+        are then given as their histogram bin.
+
+        :param indices: Row indexes into the dataset.
+        :type indices: :py:class:`~numpy.ndarray`
+        :return: List of data entries.
+        :rtype: :py:class:`list`
+        """
+        if self.data_list is None:
+            columns = [self.codes[indices, column_index] for column_index in range(self.codes.shape[1])]
+            return [
+                [column_values[code] for column_values, code in zip(self.values, row_codes)]
+                for row_codes in zip(*columns)
+            ]
+        return [self.data_list[index] for index in indices]
 
 
 class Node(object):
@@ -79,16 +720,23 @@ class Node(object):
     node has children else the node acts as a leaf and contains a class label.
     """
 
-    def __init__(self, data_list, feature_index_set, splitting_feature_value="", background_frequencies={}, maximum_value=2):
+    def __init__(self, data_list, feature_index_set, splitting_feature_value="", background_frequencies={}, maximum_value=2,
+                 indices=None):
         """Initialization method for class node.
 
-        :param list data_list: List of data values where each data value is a list of feature values.
+        :param data_list: List of data values where each data value is a list of feature values, or an already encoded
+                          dataset.
+        :type data_list: :py:class:`list` or :class:`EncodedDataset`
         :param set feature_index_set: Set of unique feature indexes.
+        :param indices: Row indexes of the dataset contained in the node, defaults to every row.
+        :type indices: :py:obj:`None` or :py:class:`~numpy.ndarray`
         """
-        self.data_list = deepcopy(data_list)
+        self.dataset = data_list if isinstance(data_list, EncodedDataset) else EncodedDataset(data_list)
+        self.indices = arange(len(self.dataset)) if indices is None else indices
         self.feature_index_set = feature_index_set
         self.splitting_feature_value = splitting_feature_value
         self.children_splitting_feature_index = ""
+        self.children_splitting_threshold = None
         self.background_frequencies = background_frequencies
         self.maximum_value = maximum_value
 
@@ -99,10 +747,30 @@ class Node(object):
         self.children_nodes = []
         self.class_label = None
 
+        # seed of the random candidate features of the node, children are seeded from it when the node is split
+        self.random_seed = None
+
     def __len__(self):
         """Overrides len() method for class node.
         """
-        return len(self.data_list)
+        return len(self.indices)
+
+    @property
+    def data_list(self):
+        """List of the data entries contained in the node.
+        """
+        return self.dataset.rows(self.indices)
+
+    def _class_counts(self, class_label_index=-1):
+        """Method for counting the occurrences of each class label code in the node.
+
+        :param int class_label_index: Index of class label value in data point (list).
+        :return: Array of counts indexed by class label code.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        if not len(self):
+            return empty(0, dtype=int32)
+        return bincount(self.dataset.codes[self.indices, class_label_index])
 
     def calc_entropy(self, class_label_index=-1):
         """Method for calculating entropy (shannon entropy) for the node.
@@ -112,18 +780,7 @@ class Node(object):
         :param int class_label_index: Index of class label value in data point (list).
         :return Entropy of class labels in self.
         """
-        feature_value_list = [value[class_label_index] for value in self.data_list]
-        feature_value_set = set(feature_value_list)
-
-        entropy = 0
-        for feature_value in feature_value_set:
-            feature_count = feature_value_list.count(feature_value)
-            if feature_count == 0:
-                pass
-            else:
-                entropy += -1 * feature_count / len(feature_value_list) * log2(feature_count / len(feature_value_list))
-
-        return entropy
+        return float(entropy(self._class_counts(class_label_index)))
 
     def calc_relative_entropy(self, background_frequencies, maximum_value, class_label_index=-1):
         """Method for calculating relative entropy (Kullback-Leibler divergence) for node.
@@ -132,77 +789,326 @@ class Node(object):
         :param dict background_frequencies: Dictionary of background frequencies
         :return Relative entropy of class labels in self.
         """
-        feature_value_list = [value[class_label_index] for value in self.data_list]
-        feature_value_set = set(feature_value_list)
+        class_counts = self._class_counts(class_label_index)
+        class_values = self.dataset.values[class_label_index] if len(self) else []
+        background = array([background_frequencies[feature_value] for feature_value in class_values], dtype=float)
 
-        entropy = 0
-        for feature_value in feature_value_set:
-            feature_count = feature_value_list.count(feature_value)
-            if feature_count == 0:
-                pass
-            else:
-                entropy += feature_count / len(feature_value_list) * log2(
-                    (feature_count / len(feature_value_list)) / (background_frequencies[feature_value])
-                )
+        return float(relative_entropy(class_counts, background, maximum_value))
+
+    def _majority_class_label(self, class_label_index=-1):
+        """Method for determining the most common class label in the node.
+
+        Ties go to the class label first in sorted order, the smallest of the tied labels like before trees were built
+        from encoded datasets, so the label does not depend on the hash seed of the process, such as a worker process
+        building the tree.
+
+        :param int class_label_index: Index of class label value in data point (list).
+        :return: Most common class label.
+        """
+        class_codes = self.dataset.codes[self.indices, class_label_index]
+        # class label codes follow the sorted order of the class labels, argmax picks the lowest of the tied codes
+        return self.dataset.values[class_label_index][argmax(bincount(class_codes))]
 
-        return 1 - entropy / maximum_value
+    def _partition(self, feature_index, split_bin=-1):
+        """Method for partitioning the node's rows by their value for a feature.
+
+        :param int feature_index: Index of the feature to partition by.
+        :param int split_bin: Histogram bin ending the left partition of a continuous feature, -1 partitions by every
+                              value instead.
+        :return: List of (feature value code, row indexes) tuples, ordered by feature value. Threshold partitions use
+                 code 0 for the left and 1 for the right partition.
+        :rtype: :py:class:`list`
+        """
+        if not len(self):
+            return []
+
+        feature_codes = self.dataset.codes[self.indices, feature_index]
+        if split_bin >= 0:
+            left = feature_codes <= split_bin
+            return [(0, self.indices[left]), (1, self.indices[~left])]
+
+        order = argsort(feature_codes, kind="stable")
+        sorted_codes = feature_codes[order]
+        boundaries = flatnonzero(diff(sorted_codes)) + 1
+
+        return [
+            (int(sorted_codes[partition[0]]), self.indices[order[partition]])
+            for partition in split(arange(len(order)), boundaries) if len(partition)
+        ]
+
+    def _feature_gains(self, feature_indexes, class_label_index=-1):
+        """Method for calculating the information gain of splitting the node on each of the given features.
+
+        :param list feature_indexes: Indexes of the candidate features.
+        :param int class_label_index: Index of class label value in data point (list).
+        :return: Tuple of arrays holding the information gain of each feature and the bin ending the left child of the
+                 best threshold of each continuous feature, in the order of feature_indexes.
+        :rtype: :py:class:`tuple`
+        """
+        return _feature_gains(self.dataset, self.indices, feature_indexes, class_label_index)
 
-    def build_tree(self, depth=0, class_label_index=-1):
+    def _make_child(self, feature_index, code, indices, split_bin=-1):
+        """Method for creating the child node holding the rows with a given value of the splitting feature.
+
+        :param int feature_index: Index of the splitting feature.
+        :param int code: Encoded value of the splitting feature, or side of the threshold for continuous features.
+        :param indices: Row indexes of the child node.
+        :type indices: :py:class:`~numpy.ndarray`
+        :param int split_bin: Histogram bin ending the left child of a continuous feature, -1 for categorical features.
+        :return: Child node.
+        :rtype: :class:`Node`
+        """
+        # continuous features can be split again on a different threshold further down the tree
+        if split_bin >= 0:
+            threshold = float(self.dataset.thresholds[feature_index][split_bin])
+            feature_index_set = self.feature_index_set
+            splitting_feature_value = ("<=", threshold) if code == 0 else (">", threshold)
+        else:
+            feature_index_set = self.feature_index_set - {feature_index}
+            splitting_feature_value = self.dataset.values[feature_index][code]
+
+        return Node(
+            self.dataset,
+            feature_index_set,
+            splitting_feature_value,
+            background_frequencies=self.background_frequencies,
+            maximum_value=self.maximum_value,
+            indices=indices
+        )
+
+    def _apply_split(self, feature_index, split_bin=-1):
+        """Method for creating the children nodes of a split.
+
+        :param int feature_index: Index of the splitting feature.
+        :param int split_bin: Histogram bin ending the left child of a continuous feature, -1 for categorical features.
+        :return: None
+        """
+        self.children_splitting_feature_index = feature_index
+        if split_bin >= 0:
+            self.children_splitting_threshold = float(self.dataset.thresholds[feature_index][split_bin])
+
+        self.children_nodes = [
+            self._make_child(feature_index, code, partition_indices, split_bin)
+            for code, partition_indices in self._partition(feature_index, split_bin)
+        ]
+
+    def _split_bin(self):
+        """Method for finding the histogram bin ending the left child of the node's threshold split.
+
+        :return: Histogram bin, -1 when the node is not split on a threshold.
+        :rtype: :py:class:`int`
+        """
+        if self.children_splitting_threshold is None:
+            return -1
+        thresholds = self.dataset.thresholds[self.children_splitting_feature_index]
+        return int(searchsorted(thresholds, self.children_splitting_threshold))
+
+    def build_tree(self, depth=0, class_label_index=-1, n_jobs=None, max_depth=3, min_samples_split=2, min_gain=0.0,
+                   max_features=None, seed=None, callbacks=None):
         """Method for building decision mltools.
 
-        Method uses modified ID3 algorithm to recursively build a decision mltools.
+        Method uses modified ID3 algorithm to recursively build a decision mltools. Continuous features of the encoded
+        dataset are split in two on the histogram threshold with the highest information gain.
+
+        :param int depth: Depth of the node in the tree.
+        :param int class_label_index: Index of class label value in data point (list).
+        :param n_jobs: Number of processes used to build the tree, -1 uses every CPU. The tree is identical to the one
+                       built by a single process, which builds trees of fewer rows than worth sharing with workers.
+        :type n_jobs: :py:obj:`None` or :py:class:`int`
+        :param max_depth: Depth at which nodes become leaves, None grows the tree until the leaves are pure.
+        :type max_depth: :py:obj:`None` or :py:class:`int`
+        :param int min_samples_split: Minimum number of data points a node needs to be split.
+        :param float min_gain: Minimum information gain a split needs, nodes without such a split become leaves.
+        :param max_features: Number of candidate features drawn at random for every split, as in random forests. A
+                             fraction of the features, "sqrt" or "log2" of the number of features, or None to score
+                             every feature.
+        :type max_features: :py:obj:`None` or :py:class:`int` or :py:class:`float` or :py:class:`str`
+        :param seed: Seed of the candidate features drawn for every split, every node draws from its own stream so
+                     the tree does not depend on n_jobs.
+        :type seed: :py:obj:`None` or :py:class:`int` or :py:class:`~numpy.random.SeedSequence`
+        :param callbacks: Callbacks receiving a split event for every split node, except nodes split by the workers of
+                          multiple jobs.
+        :type callbacks: :py:obj:`None` or :py:class:`list`
         """
+        limits = dict(max_depth=max_depth, min_samples_split=min_samples_split, min_gain=min_gain,
+                      max_features=_resolve_max_features(max_features, len(self.feature_index_set)))
+        if limits["max_features"] is not None:
+            self.random_seed = seed if seed is not None else SeedSequence().entropy
+        hooks = CallbackList(callbacks)
+        hooks.on_train_begin(self)
+
+        # small trees are built serially instead of paying for the shared memory and the start of the pool
+        if resolve_n_jobs(n_jobs) > 1 and len(self) >= _PARALLEL_MIN_SAMPLES:
+            self._build_tree_parallel(depth, class_label_index, resolve_n_jobs(n_jobs), limits, hooks)
+        else:
+            self._build(depth, class_label_index, limits, hooks)
+
+        hooks.on_train_end(self)
+
+    def _build(self, depth, class_label_index, limits, hooks):
+        """Method for recursively building the subtree of the node in this process.
+
+        :param int depth: Depth of the node in the tree.
+        :param int class_label_index: Index of class label value in data point (list).
+        :param dict limits: Keyword arguments of :meth:`build_tree` limiting the growth of the tree.
+        :param hooks: Callbacks receiving training events.
+        :type hooks: :class:`~mltools.callbacks.CallbackList`
+        :return: None
+        """
+        self._split(depth, class_label_index, limits, hooks=hooks)
+
+        # recursively build mltools
+        for child_node in self.children_nodes:
+            child_node._build(depth+1, class_label_index, limits, hooks)
+
+    def _split(self, depth, class_label_index, limits, pool=None, n_jobs=1, hooks=None):
+        """Method for either splitting the node into children nodes or assigning it a class label.
+
+        :param int depth: Depth of the node in the tree.
+        :param int class_label_index: Index of class label value in data point (list).
+        :param dict limits: Keyword arguments of :meth:`build_tree` limiting the growth of the tree.
+        :param pool: Process pool used to score the candidate features in parallel.
+        :type pool: :py:obj:`None` or :py:class:`~concurrent.futures.ProcessPoolExecutor`
+        :param int n_jobs: Number of processes in the pool.
+        :param hooks: Callbacks receiving the split event and the time spent scoring candidate features.
+        :type hooks: :py:obj:`None` or :class:`~mltools.callbacks.CallbackList`
+        :return: None
+        """
+        hooks = hooks or _NO_CALLBACKS
 
         # node only contains one class label
-        if len({data[class_label_index] for data in self.data_list}) == 1:
-            self.class_label = self.data_list[0][class_label_index]
+        if count_nonzero(self._class_counts(class_label_index)) == 1:
+            first_code = self.dataset.codes[self.indices[0], class_label_index]
+            self.class_label = self.dataset.values[class_label_index][first_code]
 
         # no more features to split by
         elif not self.feature_index_set:
-            class_labels = [data_point[class_label_index] for data_point in self.data_list]
-            self.class_label = max(set(class_labels), key=class_labels.count)
+            self.class_label = self._majority_class_label(class_label_index)
 
         # continue building mltools
-        elif depth != 3:
-
-            # determine all possible splits
-            possible_splits = dict()
-            for feature_index in self.feature_index_set:
-                feature_values = sorted({data_entry[feature_index] for data_entry in self.data_list})
-                bins = dict()  # dictionary with unique feature values as keys and data points as values
-                copy_data_list = deepcopy(self.data_list)
-                for feature_value in feature_values:
-                    count = 0
-                    while count < len(copy_data_list):
-                        if copy_data_list[count][feature_index] == feature_value:
-                            bins.setdefault(feature_value, list()).append(copy_data_list.pop(count))
-                        else:
-                            count += 1
-
-                # add possible split to list
-                possible_splits[feature_index] = [Node(
-                    bins[k],
-                    self.feature_index_set-{feature_index},
-                    k,
-                    background_frequencies=self.background_frequencies,
-                    maximum_value=self.maximum_value
-                ) for k in bins]
+        elif (limits["max_depth"] is None or depth < limits["max_depth"]) and len(self) >= limits["min_samples_split"]:
 
             # determine optimal feature to split on
-            # selects the list of children (...)[1]) with the minimum average entropy (key=...)
-            self.children_splitting_feature_index, self.children_nodes = min(
-                possible_splits.items(),
-                key=lambda x: sum([len(n)*n.entropy/len(self.data_list) for n in x[1]])
-            )
+            # selects the feature whose children would have the minimum average entropy (maximum information gain),
+            # only the children of the selected feature are created
+            feature_indexes = list(self.feature_index_set)
+            random_state = None if self.random_seed is None else default_rng(self.random_seed)
+            if random_state is not None and len(feature_indexes) > limits["max_features"]:
+                drawn = set(random_state.permutation(sorted(feature_indexes))[:limits["max_features"]].tolist())
+                feature_indexes = [feature_index for feature_index in feature_indexes if feature_index in drawn]
+            hooks.timers.mark()
+            if pool is None:
+                gains, split_bins = self._feature_gains(feature_indexes, class_label_index)
+            else:
+                feature_blocks = [feature_indexes[start::n_jobs] for start in range(min(n_jobs, len(feature_indexes)))]
+                block_results = pool.map(
+                    _score_features, [self.indices] * len(feature_blocks), feature_blocks,
+                    [class_label_index] * len(feature_blocks)
+                )
+                gains = zeros(len(feature_indexes))
+                split_bins = zeros(len(feature_indexes), dtype=int64)
+                for start, (block_gains, block_bins) in enumerate(block_results):
+                    gains[start::n_jobs] = block_gains
+                    split_bins[start::n_jobs] = block_bins
 
-            # recursively build mltools
-            for child_node in self.children_nodes:
-                child_node.build_tree(depth+1, class_label_index)
+            best_position = flatnonzero(gains >= gains.max() - _TIE_TOLERANCE)[0]
+            hooks.timers.lap("split_scoring")
+
+            # no threshold of any continuous feature separates the data or the split is not informative enough
+            if not isfinite(gains[best_position]) or \
+                    (limits["min_gain"] > 0 and gains[best_position] < limits["min_gain"]):
+                self.class_label = self._majority_class_label(class_label_index)
+            else:
+                self._apply_split(feature_indexes[best_position], int(split_bins[best_position]))
+                if random_state is not None:
+                    child_seeds = random_state.integers(0, 1 << 63, size=len(self.children_nodes)).tolist()
+                    for child_node, child_seed in zip(self.children_nodes, child_seeds):
+                        child_node.random_seed = child_seed
+                if hooks:
+                    hooks.on_split(self, {
+                        "depth": depth, "feature": feature_indexes[best_position], "gain": float(gains[best_position]),
+                        "rows": len(self), "children": len(self.children_nodes),
+                    })
 
         # reached maxed depth, assume class label is most common class label present in node
         else:
-            class_labels = [data_point[class_label_index] for data_point in self.data_list]
-            self.class_label = max(set(class_labels), key=class_labels.count)
+            self.class_label = self._majority_class_label(class_label_index)
+
+    def _build_tree_parallel(self, depth, class_label_index, n_jobs, limits, hooks):
+        """Method for building the decision tree with a pool of worker processes.
+
+        The encoded dataset is copied once into shared memory that every worker maps. Large nodes near the root are
+        split in this process with their candidate features scored across the pool, until there are enough large
+        subtrees to hand one to each worker. Workers return the structure of their subtree, which is grafted back onto
+        this tree.
+
+        :param int depth: Depth of the node in the tree.
+        :param int class_label_index: Index of class label value in data point (list).
+        :param int n_jobs: Number of worker processes.
+        :param dict limits: Keyword arguments of :meth:`build_tree` limiting the growth of the tree.
+        :param hooks: Callbacks receiving the events of the nodes split in this process.
+        :type hooks: :class:`~mltools.callbacks.CallbackList`
+        :return: None
+        """
+        shared_codes, codes_spec = _share_codes(self.dataset.codes)
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=n_jobs, initializer=_initialize_worker,
+                    initargs=(codes_spec, self.dataset.values, self.dataset.thresholds)
+            ) as pool:
+                submitted = list()
+                frontier = [(self, depth)]
+                while frontier:
+                    node, node_depth = frontier.pop(0)
+
+                    if len(node) < _PARALLEL_MIN_SAMPLES:
+                        node._build(node_depth, class_label_index, limits, hooks)
+
+                    elif len(frontier) + len(submitted) < n_jobs:
+                        node._split(node_depth, class_label_index, limits, pool, n_jobs, hooks)
+                        frontier.extend((child_node, node_depth + 1) for child_node in node.children_nodes)
+
+                    else:
+                        submitted.append((node, pool.submit(
+                            _build_subtree, node.indices, node.feature_index_set, node_depth, class_label_index,
+                            node.background_frequencies, node.maximum_value, limits, node.random_seed
+                        )))
+
+                for node, future in submitted:
+                    node._graft(future.result())
+        finally:
+            for shared in shared_codes:
+                shared.close()
+
+    def _structure(self):
+        """Method for describing the built tree below the node with nested tuples.
+
+        :return: Tuple of the children splitting feature index, the class label, a list of (feature value code, child
+                 structure) tuples and the threshold bin of continuous splits (-1 otherwise).
+        :rtype: :py:class:`tuple`
+        """
+        children = list()
+        split_bin = self._split_bin()
+        if self.children_nodes and split_bin >= 0:
+            children = [(code, child._structure()) for code, child in enumerate(self.children_nodes)]
+        elif self.children_nodes:
+            feature_values = self.dataset.values[self.children_splitting_feature_index]
+            lookup = {value: code for code, value in enumerate(feature_values)}
+            children = [(lookup[child.splitting_feature_value], child._structure()) for child in self.children_nodes]
+
+        return self.children_splitting_feature_index, self.class_label, children, split_bin
+
+    def _graft(self, structure):
+        """Method for rebuilding the tree below the node from a structure created by :meth:`_structure`.
+
+        :param tuple structure: Structure of the built tree below the node.
+        :return: None
+        """
+        self.children_splitting_feature_index, self.class_label, children, split_bin = structure
+        if children:
+            self._apply_split(self.children_splitting_feature_index, split_bin)
+            for child_node, (_, child_structure) in zip(self.children_nodes, children):
+                child_node._graft(child_structure)
 
     def predict(self, data_value, depth=0):
         """Method to predict class label of a given data point
@@ -214,6 +1120,12 @@ class Node(object):
         if self.class_label:
             return self.class_label
 
+        # node is split on a threshold of a continuous feature
+        elif self.children_nodes and self.children_splitting_threshold is not None:
+            if float(data_value[self.children_splitting_feature_index]) <= self.children_splitting_threshold:
+                return self.children_nodes[0].predict(data_value, depth+1)
+            return self.children_nodes[1].predict(data_value, depth+1)
+
         elif self.children_nodes:
             flag = False
             for child in self.children_nodes:
@@ -224,4 +1136,257 @@ class Node(object):
             if not flag:
                 return None
 
+    def compile(self):
+        """Method for compiling the tree below the node into flat arrays for batched prediction.
+
+        :return: Compiled tree.
+        :rtype: :class:`CompiledTree`
+        """
+        return CompiledTree(self)
+
+    def predict_batch(self, data_values):
+        """Method to predict the class labels of many data points at once.
+
+        The tree is compiled on every call, compile it once with :meth:`compile` when predicting repeatedly.
+
+        :param data_values: List of data points, two dimensional array or sparse matrix with one data point per row.
+        :return: Array of predicted class labels, None where :meth:`predict` would return None.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        return self.compile().predict_batch(data_values)
+
+
+def _unique_inverse(column):
+    """Method for finding the unique values of a column and the position of each value in them.
+
+    :param column: Array of values.
+    :type column: :py:class:`~numpy.ndarray`
+    :return: Tuple of the list of unique values and the array of positions.
+    :rtype: :py:class:`tuple`
+    """
+    try:
+        unique_values, inverse = unique(column, return_inverse=True)
+    except TypeError:
+        # values that cannot be sorted against each other are looked up one by one
+        lookup = dict()
+        inverse = fromiter((lookup.setdefault(value, len(lookup)) for value in column), dtype=int64, count=len(column))
+        return list(lookup), inverse
+
+    return unique_values.tolist(), inverse.reshape(-1)
+
+
+def _encode_column(column, lookup):
+    """Method for encoding a column of feature values with the codes of a compiled tree.
+
+    :param column: Array of feature values.
+    :type column: :py:class:`~numpy.ndarray`
+    :param dict lookup: Dictionary of feature values to codes.
+    :return: Array of codes, -1 for values missing from the lookup.
+    :rtype: :py:class:`~numpy.ndarray`
+    """
+    unique_values, inverse = _unique_inverse(column)
+    unique_codes = fromiter((lookup.get(value, -1) for value in unique_values), dtype=int64, count=len(unique_values))
+    return unique_codes[inverse]
+
+
+class CompiledTree(object):
+    """Decision tree compiled into flat arrays.
+
+    Nodes are numbered breadth first from the root (0). For every node the arrays hold:
+
+        feature[node]: index of the splitting feature, -1 for leaves.
+        child_offset[node]: offset of the node's child lookup table in children.
+        label[node]: position of the node's class label in labels, -1 when the node predicts None.
+
+    The child lookup table of an internal node has one entry per code of its splitting feature, holding the child node
+    for that value or -1 when no training data point had the value. Nodes split on a threshold of a continuous feature
+    have threshold[node] set and a table of two entries, the children for values up to and above the threshold.
+    """
+
+    def __init__(self, root, falsy_labels=False):
+        """Initialization method for class CompiledTree.
+
+        :param root: Root node of a built decision tree.
+        :type root: :class:`Node`
+        :param bool falsy_labels: Also predict falsy class labels such as 0, which :meth:`Node.predict` returns as
+                                  None.
+        """
+        nodes = [root]
+        for node in nodes:
+            nodes.extend(node.children_nodes)
+        node_ids = {id(node): node_id for node_id, node in enumerate(nodes)}
+
+        self.feature = full(len(nodes), -1, dtype=int32)
+        self.child_offset = zeros(len(nodes), dtype=int64)
+        self.label = full(len(nodes), -1, dtype=int32)
+        self.threshold = zeros(len(nodes), dtype=float64)
+        self.is_threshold = zeros(len(nodes), dtype=bool)
+        self.vocabularies = dict()
+        self.continuous_features = list()
+
+        labels = list()
+        label_ids = dict()
+        children = list()
+        table_size = 0
+        for node_id, node in enumerate(nodes):
+            # node is a leaf node, mirrors Node.predict() which returns None for leaves with falsy class labels
+            has_label = node.class_label is not None if falsy_labels else bool(node.class_label)
+            if has_label or not node.children_nodes:
+                if has_label:
+                    if node.class_label not in label_ids:
+                        label_ids[node.class_label] = len(labels)
+                        labels.append(node.class_label)
+                    self.label[node_id] = label_ids[node.class_label]
+                continue
+
+            feature_index = node.children_splitting_feature_index
+            if node.children_splitting_threshold is not None:
+                if feature_index not in self.continuous_features:
+                    self.continuous_features.append(feature_index)
+                self.threshold[node_id] = node.children_splitting_threshold
+                self.is_threshold[node_id] = True
+                table = array([node_ids[id(child)] for child in node.children_nodes], dtype=int32)
+            else:
+                if feature_index not in self.vocabularies:
+                    self.vocabularies[feature_index] = node.dataset.values[feature_index]
+                lookup = {value: code for code, value in enumerate(self.vocabularies[feature_index])}
+
+                table = full(len(self.vocabularies[feature_index]), -1, dtype=int32)
+                for child in node.children_nodes:
+                    table[lookup[child.splitting_feature_value]] = node_ids[id(child)]
+
+            self.feature[node_id] = feature_index
+            self.child_offset[node_id] = table_size
+            children.append(table)
+            table_size += len(table)
+
+        self.children = concatenate(children) if children else zeros(0, dtype=int32)
+        self.labels = empty(len(labels), dtype=object_)
+        for position, class_label in enumerate(labels):
+            self.labels[position] = class_label
+
+    @classmethod
+    def from_arrays(cls, arrays, labels, vocabularies, continuous_features):
+        """Method for creating a compiled tree from its flat arrays, without a root node.
+
+        :param dict arrays: The "feature", "child_offset", "label", "threshold", "is_threshold" and "children" arrays,
+                            used as they are, such as memory-mapped arrays of a model file.
+        :param list labels: Class labels, in the order of their positions.
+        :param dict vocabularies: Values of every categorical splitting feature, in the order of their codes.
+        :param list continuous_features: Indexes of the features split on thresholds.
+        :return: Compiled tree.
+        :rtype: :class:`CompiledTree`
+        """
+        tree = cls.__new__(cls)
+        for name in ("feature", "child_offset", "label", "threshold", "is_threshold", "children"):
+            setattr(tree, name, arrays[name])
+        tree.vocabularies = dict(vocabularies)
+        tree.continuous_features = list(continuous_features)
+        tree.labels = empty(len(labels), dtype=object_)
+        for position, class_label in enumerate(labels):
+            tree.labels[position] = class_label
+        return tree
+
+    def __len__(self):
+        """Overrides len() method for class CompiledTree.
+        """
+        return len(self.feature)
+
+    def predict_batch(self, data_values):
+        """Method to predict the class labels of many data points at once.
+
+        Data points are routed through the tree one level at a time, moving every data point still at an internal node
+        to its child with a single array lookup.
+
+        :param data_values: List of data points, two dimensional array or sparse matrix with one data point per row.
+        :return: Array of predicted class labels, None where :meth:`Node.predict` would return None.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        label_positions = self._route(*_encode_features(data_values, self.vocabularies, self.continuous_features))
+
+        predictions = empty(len(label_positions), dtype=object_)
+        labeled = label_positions >= 0
+        predictions[labeled] = self.labels[label_positions[labeled]]
+        return predictions
+
+    def _route(self, feature_positions, codes, numbers):
+        """Method for routing encoded data points through the tree to the class labels of their leaves.
+
+        :param feature_positions: Array of the row of every feature in codes or numbers, see :func:`_encode_features`.
+        :type feature_positions: :py:class:`~numpy.ndarray`
+        :param codes: Matrix of the codes of the categorical features, one column per data point.
+        :type codes: :py:class:`~numpy.ndarray`
+        :param numbers: Matrix of the values of the continuous features, one column per data point.
+        :type numbers: :py:class:`~numpy.ndarray`
+        :return: Array of the position in labels of every data point's class label, -1 for None.
+        :rtype: :py:class:`~numpy.ndarray`
+        """
+        number_rows = codes.shape[1]
+        nodes = zeros(number_rows, dtype=int64)
+        active = arange(number_rows)
+        while active.size:
+            features = self.feature[nodes[active]]
+            active = active[features >= 0]
+            features = features[features >= 0]
+            current = nodes[active]
+
+            value_codes = empty(len(active), dtype=int64)
+            is_threshold = self.is_threshold[current]
+            value_codes[~is_threshold] = codes[feature_positions[features[~is_threshold]], active[~is_threshold]]
+            # values that are not at most the threshold, including nan, go to the right child like Node.predict()
+            threshold_values = numbers[feature_positions[features[is_threshold]], active[is_threshold]]
+            value_codes[is_threshold] = ~(threshold_values <= self.threshold[current[is_threshold]])
+
+            next_nodes = full(len(active), -1, dtype=int64)
+            known = value_codes >= 0
+            next_nodes[known] = self.children[self.child_offset[current[known]] + value_codes[known]]
+
+            nodes[active] = next_nodes
+            active = active[next_nodes >= 0]
+
+        label_positions = full(number_rows, -1, dtype=int64)
+        reached = nodes >= 0
+        label_positions[reached] = self.label[nodes[reached]]
+        return label_positions
+
+
+def _encode_features(data_values, vocabularies, continuous_features):
+    """Method for encoding the features of data points used by one or more compiled trees.
+
+    :param data_values: List of data points, two dimensional array or sparse matrix with one data point per row.
+    :param dict vocabularies: Values of every categorical feature, in the order of their codes.
+    :param list continuous_features: Indexes of the features split on thresholds.
+    :return: Tuple of the array of the row of every feature in the codes or numbers matrix, the matrix of the codes of
+             the categorical features, -1 for unknown values, and the matrix of the values of the continuous features,
+             each with one column per data point.
+    :rtype: :py:class:`tuple`
+    """
+    if issparse(data_values):
+        data_values = data_values.tocsc()
+    number_rows = data_values.shape[0] if hasattr(data_values, "shape") else len(data_values)
+    categorical_features = list(vocabularies)
+    used_features = categorical_features + list(continuous_features)
+
+    # encode the columns of the categorical features used by the tree, the side of each threshold is stored in the
+    # same matrix as the encoded value once it is known
+    feature_positions = full(max(used_features, default=-1) + 1, -1, dtype=int64)
+    codes = empty((len(vocabularies), number_rows), dtype=int64)
+    numbers = empty((len(continuous_features), number_rows), dtype=float64)
+    for feature_index in used_features:
+        if issparse(data_values):
+            column = data_values[:, [feature_index]].toarray().reshape(-1)
+        elif hasattr(data_values, "shape"):
+            column = asarray(data_values)[:, feature_index]
+        else:
+            column = empty(number_rows, dtype=object_)
+            column[:] = [data_value[feature_index] for data_value in data_values]
+
+        if feature_index in vocabularies:
+            feature_positions[feature_index] = categorical_features.index(feature_index)
+            lookup = {value: code for code, value in enumerate(vocabularies[feature_index])}
+            codes[feature_positions[feature_index]] = _encode_column(column, lookup)
+        else:
+            feature_positions[feature_index] = list(continuous_features).index(feature_index)
+            numbers[feature_positions[feature_index]] = column.astype(float64)
 
+    return feature_positions, codes, numbers
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_fileio
+~~~~~~~~~~~~~~~~~
+
+Tests of the chunked, cached and parallel CSV readers.
+"""
+import tempfile
+from os import listdir, path
+
+import pytest
+from numpy import array_equal, float32, float64, int64, isnan
+
+import mltools.fileio
+
+from mltools.fileio import iter_csv, parse_csv_2, parse_csv_cached, parse_csv_parallel
+
+
+def _write(tmp_path, text):
+    file_path = tmp_path / "data.csv"
+    file_path.write_text(text)
+    return str(file_path)
+
+
+def test_missing_float_values_are_nan(tmp_path):
+    (X, y), = iter_csv(_write(tmp_path, "1,2.5\n4,\n"))
+    assert y is None
+    assert array_equal(X[:, 0], [1, 4])
+    assert X[0, 1] == 2.5 and isnan(X[1, 1])
+
+
+@pytest.mark.parametrize("dtype", [int64, {0: int64, 1: int64}])
+def test_missing_integer_values_raise(tmp_path, dtype):
+    with pytest.raises(ValueError, match="integer columns \\[1\\]"):
+        list(iter_csv(_write(tmp_path, "1,2\n4,\n"), dtype=dtype))
+
+
+def test_missing_values_of_float_columns_with_integer_columns(tmp_path):
+    (X, _), = iter_csv(_write(tmp_path, "1,2.5\n4,\n"), dtype={0: int64})
+    assert X[:, 0].tolist() == [1, 4]
+    assert isnan(X[1, 1])
+
+
+@pytest.mark.parametrize("text", ["1,abc\n4,5\n", "1,abc\n4,\n"])
+def test_invalid_values_raise(tmp_path, text):
+    with pytest.raises(ValueError, match="abc"):
+        list(iter_csv(_write(tmp_path, text)))
+
+
+def test_single_column_file(tmp_path):
+    file_path = _write(tmp_path, "1\n2\n3\n")
+    (X, y), = iter_csv(file_path)
+    assert X.shape == (3, 1) and y is None
+
+    (X, y), = iter_csv(file_path, label_index=0)
+    assert X.shape == (3, 0) and y.tolist() == [[1, 2, 3]]
+
+    X, y = parse_csv_cached(file_path, label_index=0, cache_path=str(tmp_path / "data.mlcache"))
+    assert X.shape == (3, 0) and y.tolist() == [[1, 2, 3]]
+    X, y = parse_csv_cached(file_path, cache_path=str(tmp_path / "all.mlcache"))
+    assert X.tolist() == [[1], [2], [3]] and y is None
+
+
+def test_single_row_final_chunk(tmp_path):
+    chunks = list(iter_csv(_write(tmp_path, "1,2,0\n3,4,1\n5,6,0\n"), chunk_size=2, label_index=-1))
+    assert [X.shape for X, _ in chunks] == [(2, 2), (1, 2)]
+    assert [y.shape for _, y in chunks] == [(1, 2), (1, 1)]
+    assert chunks[1][0].tolist() == [[5, 6]] and chunks[1][1].tolist() == [[0]]
+
+
+@pytest.mark.parametrize("dtype", [float64, float32])
+def test_parallel_matches_parse_csv_2_with_missing_and_invalid_values(tmp_path, monkeypatch, dtype):
+    monkeypatch.setattr(mltools.fileio, "_PARALLEL_MIN_BYTES", 16)
+    lines = ["{},{}.5,{}".format(row, row, row % 2) for row in range(40)]
+    lines[3] = "3,,1"
+    lines[17] = "17,abc,1"
+    lines[31] = "x,31.5,"
+    file_path = _write(tmp_path, "\n".join(lines) + "\n")
+
+    expected = parse_csv_2(file_path, -1, dtype=dtype)
+    result = parse_csv_parallel(file_path, -1, n_jobs=2, dtype=dtype)
+    for expected_values, values in zip(expected, result):
+        assert values.dtype == expected_values.dtype
+        assert array_equal(values, expected_values, equal_nan=True)
+
+
+def _open_descriptors():
+    return len(listdir("/proc/self/fd")) if path.isdir("/proc/self/fd") else None
+
+
+@pytest.mark.parametrize("invalid_line", [b"29,29,29", b"29,\xff"])
+def test_parallel_failure_removes_temporary_file(tmp_path, monkeypatch, invalid_line):
+    monkeypatch.setattr(mltools.fileio, "_PARALLEL_MIN_BYTES", 16)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "temporary"))
+    (tmp_path / "temporary").mkdir()
+    lines = ["{},{}".format(row, row).encode("utf-8") for row in range(40)]
+    lines[29] = invalid_line
+    file_path = tmp_path / "data.csv"
+    file_path.write_bytes(b"\n".join(lines) + b"\n")
+
+    descriptors = _open_descriptors()
+    with pytest.raises(ValueError):
+        parse_csv_parallel(str(file_path), n_jobs=2)
+    assert listdir(str(tmp_path / "temporary")) == []
+    assert _open_descriptors() == descriptors
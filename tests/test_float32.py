@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_float32
+~~~~~~~~~~~~~~~~~~
+
+Tests of the accuracy of float32 models against the same models trained in float64.
+"""
+import numpy
+import pytest
+from numpy import float32, float64
+from numpy.random import default_rng
+
+from mltools import NeuralNetwork, Regression, cross_validate_path
+
+
+@pytest.fixture(scope="module")
+def regression_data():
+    random_state = default_rng(0)
+    X = random_state.normal(size=(2000, 20))
+    y = X.dot(random_state.normal(size=20)) + 0.1 * random_state.normal(size=2000)
+    return X, y
+
+
+@pytest.mark.parametrize("training_type", ["normal", "qr", "cholesky", "lstsq", "linear"])
+def test_regression_thetas(regression_data, training_type):
+    X, y = regression_data
+    models = dict()
+    for dtype in (float64, float32):
+        models[dtype] = Regression(X, y, lam=0.1, alpha=0.05, dtype=dtype)
+        models[dtype].train(training_type, iterations=2000)
+
+    assert models[float32].thetas.dtype == float32
+    assert abs(models[float32].thetas - models[float64].thetas).max() < 1e-6
+    assert models[float32].mean_squared_error() == pytest.approx(models[float64].mean_squared_error(), rel=0.01)
+
+
+def test_cross_validation_mean_squared_errors(regression_data):
+    X, y = regression_data
+    lams = [1, 0.1, 0.01]
+    errors = cross_validate_path(X.astype(float32), y, lams, seed=0)
+    assert errors == pytest.approx(cross_validate_path(X, y, lams, seed=0), rel=0.01)
+
+
+def test_neural_network_accuracy():
+    random_state = default_rng(1)
+    X = random_state.normal(size=(500, 8))
+    Y = (X[:, 0] > 0).astype(float).reshape(1, -1)
+
+    accuracies = dict()
+    for dtype in (float64, float32):
+        # initial weights are drawn from the global random state
+        numpy.random.seed(1)
+        network = NeuralNetwork(X, Y, alpha=0.5, layers=(8, 16, 1), dtype=dtype)
+        network.train(50, batch_size=16)
+        predictions = network.predict(X)
+        assert predictions.dtype == dtype
+        accuracies[dtype] = ((predictions > 0.5) == Y).mean()
+
+    assert accuracies[float32] == accuracies[float64]
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_import_time
+~~~~~~~~~~~~~~~~~~~~~~
+
+Guards the startup budget of ``import mltools``, measured with ``python -X importtime`` in a fresh interpreter.
+"""
+import subprocess
+import sys
+from os import environ, path, pathsep
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+# cumulative import time of the mltools package, the eager imports of earlier versions took about 400 ms
+IMPORT_BUDGET_SECONDS = 0.05
+
+
+def _run(code):
+    """Method for running Python code in a fresh interpreter with ``-X importtime``.
+
+    :param str code: Code to run.
+    :return: Completed process with captured output.
+    :rtype: :py:class:`~subprocess.CompletedProcess`
+    """
+    environment = dict(environ, PYTHONPATH=pathsep.join(filter(None, (ROOT, environ.get("PYTHONPATH")))))
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=environment, capture_output=True,
+                          text=True, check=True)
+
+
+def _cumulative_seconds(stderr, module):
+    """Method for reading the cumulative import time of a module from ``-X importtime`` output.
+
+    :param str stderr: Standard error of the interpreter.
+    :param str module: Name of the imported module.
+    :return: Cumulative import time in seconds.
+    :rtype: :py:class:`float`
+    """
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if line.startswith("import time:") and len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+    raise AssertionError("{} was not imported".format(module))
+
+
+def test_import_within_budget():
+    seconds = min(_cumulative_seconds(_run("import mltools").stderr, "mltools") for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_import_does_not_import_dependencies():
+    result = _run("import sys, mltools; print(' '.join(sorted(set(sys.modules) & {'numpy', 'scipy'})))")
+    assert result.stdout.strip() == ""
+
+
+def test_public_names_import_on_access():
+    result = _run("import mltools; print(mltools.Node.__module__, mltools.tree.__name__)")
+    assert result.stdout.split() == ["mltools.tree", "mltools.tree"]
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_neuralnetwork
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Tests of neural networks trained by worker processes.
+"""
+import numpy
+from numpy import allclose, arange, array_equal, concatenate
+from numpy.random import default_rng
+
+from mltools import NeuralNetwork
+
+
+def _network(X, Y):
+    # initial weights are drawn from the global random state
+    numpy.random.seed(0)
+    return NeuralNetwork(X, Y, alpha=0.5, layers=(4, 6, 1))
+
+
+def test_synchronous_parallel_training_matches_serial_training():
+    random_state = default_rng(0)
+    X = random_state.normal(size=(64, 4))
+    Y = (X[:, 0] > 0).astype(float).reshape(1, -1)
+    batch_size = 8
+
+    # every update of two workers averages batch k of both halves of the data points, which is serial batch k of the
+    # data points reordered to alternate between batches of the two halves
+    order = concatenate([
+        concatenate((arange(start, start + batch_size), arange(start + 32, start + 32 + batch_size)))
+        for start in range(0, 32, batch_size)
+    ])
+    serial = _network(X[order], Y[:, order])
+    serial.train(3, batch_size=2 * batch_size)
+
+    runs = list()
+    for _ in range(2):
+        network = _network(X, Y)
+        network.train(3, batch_size=batch_size, n_jobs=2)
+        runs.append(network.parameters)
+
+    assert allclose(runs[0], serial.parameters, rtol=0, atol=1e-12)
+    assert array_equal(runs[0], runs[1])
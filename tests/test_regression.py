@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_regression
+~~~~~~~~~~~~~~~~~~~~~
+
+Tests of the training types of regression models.
+"""
+import pytest
+from numpy import allclose, column_stack, empty, eye
+from numpy.linalg import lstsq, solve
+from numpy.random import default_rng
+
+from mltools import Regression, cross_validate_path
+
+
+def _linear_data(rows=50, features=4):
+    random_state = default_rng(0)
+    X = random_state.normal(size=(rows, features))
+    return X, X.dot(random_state.normal(size=features)) + 0.1 * random_state.normal(size=rows)
+
+
+@pytest.mark.parametrize("training_type", ["normal", "qr", "cholesky", "lstsq"])
+def test_direct_training_types_solve_least_squares(training_type):
+    X, y = _linear_data()
+    model = Regression(X, y)
+    model.train(training_type)
+    assert allclose(model.thetas, lstsq(X, y, rcond=None)[0], rtol=0, atol=1e-12)
+
+    # the solution of the L2 regularized loss, mean squared error plus lam times the squared norm of thetas
+    model = Regression(X, y, lam=0.1)
+    model.train(training_type)
+    assert allclose(model.thetas, solve(X.T.dot(X) / len(y) + 0.1 * eye(X.shape[1]), X.T.dot(y) / len(y)), rtol=0,
+                    atol=1e-12)
+
+    # a duplicated column makes the problem singular, lstsq returns the minimum norm solution and the other direct
+    # training types fall back to gradient descent
+    X = column_stack((X, X[:, 0]))
+    model = Regression(X, y, alpha=0.05)
+    if training_type == "lstsq":
+        model.train(training_type)
+        assert allclose(model.thetas, lstsq(X, y, rcond=None)[0], rtol=0, atol=1e-12)
+    else:
+        with pytest.warns(RuntimeWarning, match="ill-conditioned"):
+            model.train(training_type, iterations=10)
+        assert len(model.history["loss"]) == 10
+
+@pytest.mark.parametrize("stop_on", ["loss", "gradient"])
+def test_gradient_descent_stops_early_and_records_history(stop_on):
+    X, y = _linear_data()
+    model = Regression(X, y, alpha=0.1)
+    model.train("linear", iterations=10000, tol=1e-8, stop_on=stop_on)
+
+    losses = model.history["loss"]
+    assert 1 < len(losses) < 10000 and len(model.history["time"]) == len(losses)
+    # every loss is computed from the residuals of the gradient, before the update of the iteration
+    assert losses[0] == pytest.approx((y ** 2).mean())
+    assert all(later <= earlier for earlier, later in zip(losses, losses[1:]))
+    assert losses[-1] == pytest.approx(model.mean_squared_error(), rel=1e-6)
+
+    with pytest.raises(ValueError, match="Unknown stopping criterion"):
+        model.train("linear", iterations=10, tol=1e-8, stop_on="thetas")
+
+
+def test_sgd_on_empty_dataset_raises():
+    model = Regression(empty((0, 3)), empty(0))
+    with pytest.raises(ValueError, match="without data points"):
+        model.train("sgd", iterations=10)
+
+
+def test_cross_validate_path_direct_scores_every_alpha():
+    random_state = default_rng(0)
+    X = random_state.normal(size=(100, 4))
+    y = X.dot(random_state.normal(size=4)) + 0.1 * random_state.normal(size=100)
+    lams = [1, 0.1, 0.01]
+
+    scores = cross_validate_path(X, y, lams, alphas=(0.01, 0.001, 0.0001), training_type="lstsq", seed=0)
+    assert scores.shape == (3, len(lams))
+    assert (scores == cross_validate_path(X, y, lams, alphas=(0.01,), training_type="lstsq", seed=0)).all()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_serialization
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Tests of saving models to model files and loading them back.
+"""
+import numpy
+import pytest
+from numpy import array_equal, memmap
+from numpy.random import default_rng
+
+from mltools import EncodedDataset, NeuralNetwork, Node, Regression, load_model, save_model
+
+
+def _models():
+    random_state = default_rng(0)
+    X = random_state.normal(size=(40, 3))
+    y = X.dot(random_state.normal(size=3))
+
+    data_list = [[float(row[0]), "ab"[int(row[1] > 0)], "high" if target > 0 else "low"] for row, target in zip(X, y)]
+    root = Node(EncodedDataset(data_list, continuous_features=(0,)), {0, 1})
+    root.build_tree(max_depth=3)
+
+    regression = Regression(X, y)
+    regression.train("lstsq")
+
+    numpy.random.seed(0)
+    network = NeuralNetwork(X, (y > 0).astype(float).reshape(1, -1), alpha=0.5, layers=(3, 4, 1))
+    network.train(2, batch_size=8)
+
+    return [
+        (root, [data_entry[:-1] for data_entry in data_list] + [[0.0, "c"]]),
+        (regression, X),
+        (network, X),
+    ]
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", None])
+def test_loaded_models_predict_like_saved_models(tmp_path, mmap_mode):
+    for position, (model, data_values) in enumerate(_models()):
+        file_path = str(tmp_path / "model_{}.mlmodel".format(position))
+        save_model(model, file_path)
+        loaded = load_model(file_path, mmap_mode=mmap_mode)
+        assert array_equal(loaded.predict_batch(data_values), model.predict_batch(data_values))
+
+    assert isinstance(loaded.parameters.base, memmap) == (mmap_mode is not None)
+
+
+def test_loading_other_files_raises(tmp_path):
+    file_path = tmp_path / "model.mlmodel"
+    file_path.write_bytes(b"not a model")
+    with pytest.raises(ValueError, match="is not a model file"):
+        load_model(str(file_path))
+
+    save_model(_models()[1][0], str(file_path))
+    # the thetas take the first 24 of the last 64 bytes, the rest is padding to the alignment of the arrays
+    file_path.write_bytes(file_path.read_bytes()[:-48])
+    with pytest.raises(ValueError, match="is truncated"):
+        load_model(str(file_path))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_spawn
+~~~~~~~~~~~~~~~~
+
+Tests of trees and forests built by spawned worker processes, whose hash seeds differ from the parent process.
+"""
+import subprocess
+import sys
+from os import environ, path, pathsep
+
+import pytest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+# builds a tree or a forest with string class labels and many tied leaves serially and with spawned workers, and prints
+# whether the compiled trees and the predictions are identical
+SPAWN_SCRIPT = """
+import multiprocessing
+import sys
+
+from numpy import array_equal
+from numpy.random import default_rng
+
+import mltools.tree
+from mltools import EncodedDataset, Node, RandomForest
+
+TREE_ARRAYS = ("feature", "child_offset", "label", "children")
+
+
+def build_tree(data_list, n_jobs):
+    root = Node(EncodedDataset(data_list), {0, 1, 2})
+    root.build_tree(n_jobs=n_jobs, max_depth=2)
+    return [root.compile()], None
+
+
+def build_forest(data_list, n_jobs):
+    forest = RandomForest(EncodedDataset(data_list), {0, 1, 2}, number_trees=6, max_features=2)
+    forest.build_forest(n_jobs=n_jobs, max_depth=3, seed=0)
+    return forest.trees, forest.predict_batch([data_entry[:-1] for data_entry in data_list]).tolist()
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("spawn")
+    mltools.tree._PARALLEL_MIN_SAMPLES = 50
+    build = {"tree": build_tree, "forest": build_forest}[sys.argv[1]]
+
+    random_state = default_rng(0)
+    data_list = [
+        [int(value) for value in random_state.integers(0, 3, size=3)] + ["label_{}".format(random_state.integers(6))]
+        for _ in range(600)
+    ]
+    (serial_trees, serial_predictions), (parallel_trees, parallel_predictions) = [
+        build(data_list, n_jobs) for n_jobs in (1, 2)
+    ]
+    print(serial_predictions == parallel_predictions and len(serial_trees) == len(parallel_trees) and all(
+        serial_tree.labels.tolist() == parallel_tree.labels.tolist() and
+        all(array_equal(getattr(serial_tree, name), getattr(parallel_tree, name)) for name in TREE_ARRAYS)
+        for serial_tree, parallel_tree in zip(serial_trees, parallel_trees)
+    ))
+"""
+
+
+@pytest.mark.parametrize("model", ["tree", "forest"])
+def test_parallel_build_identical_with_spawned_workers(model):
+    environment = dict(environ, PYTHONPATH=pathsep.join(filter(None, (ROOT, environ.get("PYTHONPATH")))))
+    environment.pop("PYTHONHASHSEED", None)
+    result = subprocess.run([sys.executable, "-c", SPAWN_SCRIPT, model], env=environment, capture_output=True,
+                            text=True, check=True)
+    assert result.stdout.strip() == "True"
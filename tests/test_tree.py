@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests.test_tree
+~~~~~~~~~~~~~~~
+
+Tests of decision trees.
+"""
+import pytest
+from numpy.random import default_rng
+
+import mltools.tree
+from mltools import EncodedDataset, Node
+
+
+@pytest.mark.parametrize("class_labels, expected", [
+    (["b", "a", "b", "a", "c"], "a"),
+    ([2, 1, 2, 1, 0], 1),
+])
+def test_tied_vote_goes_to_smallest_class_label(class_labels, expected):
+    root = Node(EncodedDataset([[index % 2, class_label] for index, class_label in enumerate(class_labels)]), {0})
+    root.build_tree(max_depth=0)
+    assert root.class_label == expected
+
+
+def test_small_tree_with_multiple_jobs_is_built_serially(monkeypatch):
+    def refuse_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started for a small tree")
+
+    monkeypatch.setattr(mltools.tree, "ProcessPoolExecutor", refuse_pool)
+    data_list = [[index % 3, index % 5, index % 2] for index in range(60)]
+    serial = Node(EncodedDataset(data_list), {0, 1})
+    serial.build_tree()
+    parallel = Node(EncodedDataset(data_list), {0, 1})
+    parallel.build_tree(n_jobs=2)
+    for name in ("feature", "child_offset", "label", "children"):
+        assert getattr(parallel.compile(), name).tolist() == getattr(serial.compile(), name).tolist()
+
+
+def test_compiled_tree_matches_node_predictions():
+    random_state = default_rng(2)
+    data_list = [
+        ["abc"[random_state.integers(3)], "xy"[random_state.integers(2)], "no" if random_state.random() < 0.4 else "ok"]
+        for _ in range(80)
+    ]
+    root = Node(EncodedDataset(data_list), {0, 1})
+    root.build_tree(max_depth=None)
+
+    data_values = [data_entry[:-1] for data_entry in data_list] + [["d", "x"], ["a", "z"]]
+    expected = [root.predict(data_value) for data_value in data_values]
+    assert root.compile().predict_batch(data_values).tolist() == expected
+    assert root.predict_batch([["d", "x"]]).tolist() == [None]
+
+
+def test_threshold_split_and_growth_limits():
+    data_list = [[value / 100, "high" if value > 60 else "low"] for value in range(100)]
+    root = Node(EncodedDataset(data_list, continuous_features=(0,)), {0})
+    root.build_tree(max_depth=1)
+    assert root.children_splitting_feature_index == 0
+    assert 0.6 <= root.children_splitting_threshold < 0.61
+    assert [child_node.class_label for child_node in root.children_nodes] == ["low", "high"]
+    assert root.predict_batch([[0.1], [0.95]]).tolist() == ["low", "high"]
+
+    leaf = Node(EncodedDataset(data_list, continuous_features=(0,)), {0})
+    leaf.build_tree(min_samples_split=101)
+    assert leaf.children_nodes == [] and leaf.class_label == "low"